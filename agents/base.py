@@ -1,16 +1,23 @@
-from environments.conclave_env import ConclaveEnv
+from environments.conclave_env import SECRETARY_ID, ConclaveEnv
+from environments.events import CALL_FINISHED, CALL_STARTED, SPEECH
+from environments.feed import SPEECH_DELTA, SPEECH_STARTED
+from environments.tracing import BACKOFF, CALL, PROMPT, QUEUE, REQUEST
+import asyncio
 import json
-from typing import Dict, List, Optional
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 import logging
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
+from llm.client import get_api_key, get_client
+from llm.rate_limit import is_rate_limit_error, is_transient_error, parse_retry_after
+from llm.routing import call_type_of
+from llm.streaming import ToolArgumentStream, stream_completion
+from llm.tokens import estimate_prompt_tokens, estimate_tokens
 
-# Load environment variables from .env file
-load_dotenv()
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletionMessage
 
-max_tokens = 1000
-temperature = 0.5
+# Allowance for the instructions that follow the histories in every prompt
+PROMPT_INSTRUCTION_TOKENS = 400
 
 class Agent:
     def __init__(self, agent_id: int, name: str, background: str, env: ConclaveEnv):
@@ -18,29 +25,63 @@ class Agent:
         self.name = name
         self.background = background
         self.env = env
-        self.vote_history = []
+        self._vote_history_fragments = []
+        self._vote_history_prompt = (0, "")
+        self._stable_system_prompt = None
+        self._fixed_prompt_tokens = None
         self.logger = logging.getLogger(name)
-        
-        api_key = os.environ.get("OPENROUTER_API_KEY")
-        if not api_key:
-            raise ValueError("OpenRouter API key not found")
-            
-        # Initialize OpenAI client with OpenRouter base URL
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=api_key
-        )
 
-    def cast_vote(self) -> None:
-        personal_vote_history = self.promptize_vote_history()
-        ballot_results_history = self.promptize_voting_results_history()
-        discussion_history = self.env.get_discussion_history(self.agent_id)
-        prompt = f"""You are {self.name}. Here is some information about yourself: {self.background}
+        # Fail early if the key is missing; the client itself is built lazily.
+        # Replayed runs never touch the network and need no key.
+        if env.replayer is None:
+            get_api_key()
+
+        # Agents borrow the process-wide pooled client unless one is injected
+        self.client = None
+
+    @property
+    def trace_lane(self) -> str:
+        """Track of this agent's spans in a trace."""
+        return "Secretary" if self.agent_id == SECRETARY_ID else f"Cardinal {self.agent_id}"
+
+    def _persona_prompt(self, candidates: str) -> str:
+        return f"""You are {self.name}. Here is some information about yourself: {self.background}
 You are currently participating in the conclave to decide the next pope. The candidate that secures a 2/3 supermajority of votes wins.
 The candidates are:
-{self.env.list_candidates_for_prompt()}
+{candidates}"""
 
-{personal_vote_history}
+    def build_prompt(self, body: str) -> Union[str, List[Dict]]:
+        """
+        Prepend the agent's persona and the candidate list to a prompt body.
+
+        With the "stable" prompt layout, the persona and a candidate list ordered
+        once per agent form a system message that is identical on every call,
+        so the provider can serve it from its prompt cache. Round-varying
+        history follows in the user message.
+        """
+        with self.env.span("build_prompt", PROMPT, self.trace_lane):
+            if self.env.prompt_layout == "stable":
+                if self._stable_system_prompt is None:
+                    candidates = self.env.list_candidates_for_prompt(seed=self.env.prompt_seed + self.agent_id)
+                    self._stable_system_prompt = self._persona_prompt(candidates)
+                return [
+                    {"role": "system", "content": self._stable_system_prompt},
+                    {"role": "user", "content": body}
+                ]
+            return f"{self._persona_prompt(self.env.list_candidates_for_prompt())}\n\n{body}"
+
+    @staticmethod
+    def prompt_text(prompt: Union[str, List[Dict]]) -> str:
+        if isinstance(prompt, str):
+            return prompt
+        return "\n\n".join(message["content"] for message in prompt)
+
+    def cast_vote(self) -> None:
+        self.env.engine.run(self.cast_vote_async())
+
+    async def cast_vote_async(self) -> None:
+        personal_vote_history, ballot_results_history, discussion_history = self.history_sections()
+        body = f"""{personal_vote_history}
 
 {ballot_results_history}
 
@@ -48,9 +89,7 @@ The candidates are:
 
 Please vote for one of the candidates using the cast_vote tool. Make sure to include both your chosen candidate and a detailed explanation of why you chose them.
         """
-        if (self.agent_id == 0):
-            print(prompt)
-        self.logger.info(prompt)
+        prompt = self.build_prompt(body)
         # Define vote tool
         tools = [
             {
@@ -76,7 +115,7 @@ Please vote for one of the candidates using the cast_vote tool. Make sure to inc
             }
         ]
         try:
-            response = self._invoke_claude(prompt, tools, tool_choice="cast_vote")
+            response = await self._invoke_claude_async(prompt, tools, tool_choice="cast_vote")
 
             # Handle tool call response
             if hasattr(response, 'tool_calls') and response.tool_calls:
@@ -86,22 +125,27 @@ Please vote for one of the candidates using the cast_vote tool. Make sure to inc
                     vote = tool_input.get("candidate")
                     reasoning = tool_input.get("explanation", "No explanation provided.")
 
-                    # Save vote reasoning
-                    self.vote_history.append({
-                        "vote": vote,
-                        "reasoning": reasoning
-                    })
-
-                    if vote is not None and isinstance(vote, int):
-                        self.env.cast_vote(vote)
-                        self.logger.info(f"{self.name} ({self.agent_id}) voted for {self.env.agents[vote].name} ({vote}) because\n{reasoning}")
+                    if isinstance(vote, int) and 0 <= vote < self.env.num_agents:
+                        self.record_vote(vote, reasoning)
                         return
                     else:
-                        raise ValueError("Invalid vote")
+                        raise ValueError(f"Invalid vote {vote!r}")
+            raise ValueError("No cast_vote tool call in the response")
 
         except Exception as e:
-            # Default vote if there's an error
+            # Left without a vote; the env re-asks or records an abstention when the ballot closes
             self.logger.error(f"Error in LlmAgent {self.agent_id} voting: {e}")
+            self.env.vote_failures[self.agent_id] = str(e) or type(e).__name__
+
+    @property
+    def vote_history(self) -> List[Dict]:
+        """This agent's votes, as {"round_index", "vote", "reasoning"} dicts read from the env's ballot store."""
+        return self.env.ballots.vote_history(self.agent_id)
+
+    def record_vote(self, vote: int, reasoning: str) -> None:
+        """Record a validated vote, cast by this agent or on its behalf, e.g. from a batched ballot."""
+        self.env.cast_vote(self.agent_id, vote, reasoning)
+        self.logger.info(f"{self.name} ({self.agent_id}) voted for {self.env.agents[vote].name} ({vote}) because\n{reasoning}")
 
     def speaking_urgency(self) -> Dict[str, any]:
         """
@@ -110,16 +154,13 @@ Please vote for one of the candidates using the cast_vote tool. Make sure to inc
         Returns:
             Dict with urgency_score (1-100) and reasoning
         """
-        personal_vote_history = self.promptize_vote_history()
-        ballot_results_history = self.promptize_voting_results_history()
-        discussion_history = self.env.get_discussion_history(self.agent_id)
+        return self.env.engine.run(self.speaking_urgency_async())
 
-        prompt = f"""You are {self.name}. Here is some information about yourself: {self.background}
-You are currently participating in the conclave to decide the next pope. The candidate that secures a 2/3 supermajority of votes wins.
-The candidates are:
-{self.env.list_candidates_for_prompt()}
+    async def speaking_urgency_async(self) -> Dict[str, any]:
+        """Async version of speaking_urgency."""
+        personal_vote_history, ballot_results_history, discussion_history = self.history_sections()
 
-{personal_vote_history}
+        body = f"""{personal_vote_history}
 
 {ballot_results_history}
 
@@ -138,6 +179,7 @@ Consider factors such as:
 
 Use the evaluate_speaking_urgency tool to provide your urgency score and reasoning.
         """
+        prompt = self.build_prompt(body)
 
         # Define urgency evaluation tool
         tools = [
@@ -165,7 +207,7 @@ Use the evaluate_speaking_urgency tool to provide your urgency score and reasoni
         ]
 
         try:
-            response = self._invoke_claude(prompt, tools, tool_choice="evaluate_speaking_urgency")
+            response = await self._invoke_claude_async(prompt, tools, tool_choice="evaluate_speaking_urgency")
 
             # Handle tool call response
             if hasattr(response, 'tool_calls') and response.tool_calls:
@@ -201,6 +243,106 @@ Use the evaluate_speaking_urgency tool to provide your urgency score and reasoni
                 "reasoning": f"Error during urgency evaluation: {e}"
             }
 
+    async def speaking_urgency_and_vote_async(self) -> Dict[str, any]:
+        """
+        Ask for a provisional vote and the speaking urgency in one request.
+
+        Both questions share the persona, candidates and history of the prompt,
+        so one call replaces a speaking_urgency and a cast_vote call.
+
+        Returns:
+            Dict with agent_id, urgency_score (1-100) and reasoning as returned by
+            speaking_urgency, plus vote and vote_reasoning. vote is None if no
+            valid vote was returned.
+        """
+        personal_vote_history, ballot_results_history, discussion_history = self.history_sections()
+
+        body = f"""{personal_vote_history}
+
+{ballot_results_history}
+
+{discussion_history}
+
+A discussion round is about to begin, followed by the next ballot.
+
+First, decide which candidate you would vote for if the ballot were held now, and explain why.
+
+Then evaluate how urgently you feel the need to speak in the discussion, on a scale from 1-100, where:
+1 = You have nothing important to add at this time
+100 = You have an extremely urgent point that must be heard immediately
+
+Consider factors such as:
+- How strongly do you feel about supporting or opposing specific candidates?
+- Do you need to respond to something said in a previous discussion?
+- Do you have important information or perspectives that haven't been shared yet?
+- Are the voting trends concerning to you?
+
+Use the evaluate_urgency_and_vote tool to provide your vote, your urgency score and your reasoning for both.
+        """
+        prompt = self.build_prompt(body)
+
+        tools = [
+            {
+                "type": "function",
+                "function": {
+                    "name": "evaluate_urgency_and_vote",
+                    "description": "Cast a provisional vote and evaluate how urgently you want to speak",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "candidate": {
+                                "type": "integer",
+                                "description": "The ID of the candidate to vote for"
+                            },
+                            "explanation": {
+                                "type": "string",
+                                "description": "Explain why you chose this candidate"
+                            },
+                            "urgency_score": {
+                                "type": "integer",
+                                "description": "Your urgency score (1-100)"
+                            },
+                            "reasoning": {
+                                "type": "string",
+                                "description": "Explain why you rated your urgency at this level"
+                            }
+                        },
+                        "required": ["candidate", "explanation", "urgency_score", "reasoning"]
+                    }
+                }
+            }
+        ]
+
+        result = {
+            "agent_id": self.agent_id,
+            "urgency_score": 50,
+            "reasoning": "No urgency evaluation received from AI",
+            "vote": None,
+            "vote_reasoning": None
+        }
+        try:
+            response = await self._invoke_claude_async(prompt, tools, tool_choice="evaluate_urgency_and_vote")
+
+            if hasattr(response, 'tool_calls') and response.tool_calls:
+                tool_call = response.tool_calls[0]
+                if tool_call.function.name != 'evaluate_urgency_and_vote':
+                    raise ValueError("Invalid tool use")
+                tool_input = json.loads(tool_call.function.arguments)
+                # Ensure score is in range 1-100
+                result["urgency_score"] = max(1, min(100, int(tool_input.get("urgency_score", 50))))
+                result["reasoning"] = tool_input.get("reasoning", "No reasoning provided.")
+                vote = tool_input.get("candidate")
+                if isinstance(vote, int) and 0 <= vote < self.env.num_agents:
+                    result["vote"] = vote
+                    result["vote_reasoning"] = tool_input.get("explanation", "No explanation provided.")
+                else:
+                    self.logger.warning(f"Invalid provisional vote {vote!r} from LlmAgent {self.agent_id}")
+
+        except Exception as e:
+            self.logger.error(f"Error in LlmAgent {self.agent_id} speaking urgency and vote: {e}")
+            result["reasoning"] = f"Error during urgency evaluation: {e}"
+        return result
+
     def discuss(self, urgency_data: Optional[Dict] = None) -> Optional[Dict]:
         """
         Generate a discussion contribution about the conclave proceedings.
@@ -211,9 +353,11 @@ Use the evaluate_speaking_urgency tool to provide your urgency score and reasoni
         Returns:
             Dict with agent_id and message if successful, None otherwise
         """
-        personal_vote_history = self.promptize_vote_history()
-        ballot_results_history = self.promptize_voting_results_history()
-        discussion_history = self.env.get_discussion_history(self.agent_id)
+        return self.env.engine.run(self.discuss_async(urgency_data))
+
+    async def discuss_async(self, urgency_data: Optional[Dict] = None) -> Optional[Dict]:
+        """Async version of discuss."""
+        personal_vote_history, ballot_results_history, discussion_history = self.history_sections()
 
         # Include speaking urgency information if available
         urgency_context = ""
@@ -224,12 +368,7 @@ Your reasoning was: {urgency_data['reasoning']}
 Keep this urgency level and reasoning in mind as you formulate your response.
 """
 
-        prompt = f"""You are {self.name}. Here is some information about yourself: {self.background}
-You are currently participating in the conclave to decide the next pope. The candidate that secures a 2/3 supermajority of votes wins.
-The candidates are:
-{self.env.list_candidates_for_prompt()}
-
-{personal_vote_history}
+        body = f"""{personal_vote_history}
 
 {ballot_results_history}
 
@@ -245,6 +384,7 @@ Your goal is to influence others based on your beliefs and background. You can:
 
 Be authentic to your character and background. Provide a meaningful contribution of 100-300 words.
         """
+        prompt = self.build_prompt(body)
 
         # Define speak tool
         tools = [
@@ -267,8 +407,21 @@ Be authentic to your character and background. Provide a meaningful contribution
             }
         ]
 
+        stream = None
+        if self.env.stream_speeches:
+            discussion_round = self.env.discussionRound
+
+            def publish_text(text: str) -> None:
+                self.env.publish(SPEECH_DELTA, round=discussion_round, agent_id=self.agent_id, text=text)
+
+            def publish_start() -> None:
+                # Also sent again when a failed attempt is retried, so observers discard its partial text
+                self.env.publish(SPEECH_STARTED, round=discussion_round, agent_id=self.agent_id, name=self.name)
+            stream = ToolArgumentStream("message", publish_text, on_start=publish_start)
+
         try:
-            response = self._invoke_claude(prompt, tools, tool_choice="speak_message")
+            start = time.perf_counter()
+            response = await self._invoke_claude_async(prompt, tools, tool_choice="speak_message", stream=stream)
 
             # Handle tool call response
             if hasattr(response, 'tool_calls') and response.tool_calls:
@@ -279,6 +432,9 @@ Be authentic to your character and background. Provide a meaningful contribution
 
                     # Log the discussion contribution
                     self.logger.info(f"{self.name} ({self.agent_id}) speaks:\n{message}")
+                    first_text_at = stream.first_text_at if stream is not None else None
+                    self.env.emit(SPEECH, round=self.env.discussionRound, agent_id=self.agent_id, message=message,
+                                  time_to_first_text=first_text_at - start if first_text_at is not None else None)
                     print(f"\nCardinal {self.agent_id} - {self.name} speaks:\n{message}\n")
 
                     # Return the discussion contribution
@@ -300,34 +456,214 @@ Be authentic to your character and background. Provide a meaningful contribution
             self.logger.error(f"Error in LlmAgent {self.agent_id} discussion: {e}")
             return None
 
-    def _invoke_claude(self, prompt: str, tools: List[Dict] = [], tool_choice: str = None) -> Dict:
+    async def summarize_discussion_async(self, round_index: int, comments: List[Dict]) -> Optional[str]:
+        """
+        Summarize one discussion round for cardinals who read it in later rounds.
+
+        Returns:
+            The summary, or None if it could not be generated
+        """
+        transcript = "\n\n".join(
+            f"Cardinal {comment['agent_id']} - {self.env.agents[comment['agent_id']].name}:\n{comment['message']}"
+            for comment in comments
+        )
+        prompt = f"""You are {self.name}. {self.background}
+Summarize discussion round {round_index + 1} of the conclave for cardinals who will read it in later rounds.
+Keep who spoke, which candidates each speaker supported or opposed, and their main arguments.
+Use at most {self.env.summary_max_words} words.
+
+Discussion Round {round_index + 1}:
+{transcript}
+
+Use the summarize_discussion tool to provide the summary.
+        """
+
+        tools = [
+            {
+                "type": "function",
+                "function": {
+                    "name": "summarize_discussion",
+                    "description": "Provide a summary of a discussion round",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "summary": {
+                                "type": "string",
+                                "description": f"Summary of the discussion round (at most {self.env.summary_max_words} words)"
+                            }
+                        },
+                        "required": ["summary"]
+                    }
+                }
+            }
+        ]
+
+        try:
+            response = await self._invoke_claude_async(prompt, tools, tool_choice="summarize_discussion")
+
+            if hasattr(response, 'tool_calls') and response.tool_calls:
+                tool_call = response.tool_calls[0]
+                if tool_call.function.name == 'summarize_discussion':
+                    tool_input = json.loads(tool_call.function.arguments)
+                    return tool_input.get("summary") or None
+            raise ValueError("Invalid tool use")
+
+        except Exception as e:
+            self.logger.error(f"Error summarizing discussion round {round_index + 1}: {e}")
+            return None
+
+    def _invoke_claude(self, prompt: Union[str, List[Dict]], tools: List[Dict] = [], tool_choice: str = None) -> Dict:
         """Invoke Claude through OpenRouter."""
-        max_retries = 3
-        retry_count = 0
-        
-        while retry_count < max_retries:
+        return self.env.engine.run(self._invoke_claude_async(prompt, tools, tool_choice))
+
+    async def _invoke_claude_async(self, prompt: Union[str, List[Dict]], tools: List[Dict] = [], tool_choice: str = None,
+                                   max_output_tokens: Optional[int] = None,
+                                   stream: Optional[ToolArgumentStream] = None) -> Dict:
+        """
+        Invoke Claude through OpenRouter. The prompt is a user message or a full message list.
+
+        The model, token allowance and temperature come from the env's router
+        entry for the call type (the forced tool name). With a stream, the
+        response is streamed and the tool-call arguments are fed to it as they
+        arrive; replayed and cached responses arrive whole.
+        """
+        route = self.env.router.route(tool_choice)
+        # Prepare the request parameters
+        request_params = {
+            "model": route.model,
+            "messages": [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt,
+            "max_tokens": max_output_tokens or route.max_tokens,
+            "temperature": route.temperature
+        }
+
+        # Add tools if provided
+        if tools:
+            request_params["tools"] = tools
+
+            # Add tool_choice if specified
+            if tool_choice:
+                request_params["tool_choice"] = {"type": "function", "function": {"name": tool_choice}}
+
+        budget = self.env.prompt_token_budget
+        if budget is not None:
+            prompt_tokens = estimate_prompt_tokens(request_params["messages"])
+            if prompt_tokens > budget:
+                self.logger.warning(f"Prompt of ~{prompt_tokens} tokens exceeds the {budget} token budget")
+
+        with self.env.span(tool_choice or "call", CALL, self.trace_lane, agent_id=self.agent_id, model=route.model):
+            events = self.env.events
+            if events is None:
+                message, _ = await self._complete_async(request_params, tool_choice, stream)
+                return message
+
+            # The writer thread hashes and stores the prompt once; the call events refer to it by hash
+            call_id = events.next_call_id()
+            events.emit(CALL_STARTED, call_id=call_id, agent_id=self.agent_id, call=tool_choice,
+                        model=route.model, prompt=request_params["messages"])
+            start = time.perf_counter()
             try:
-                # Prepare the request parameters
-                request_params = {
-                    "model": "openai/gpt-4o-mini",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": max_tokens,
-                    "temperature": temperature
-                }
-                
-                # Add tools if provided
-                if tools:
-                    request_params["tools"] = tools
-                    
-                    # Add tool_choice if specified
-                    if tool_choice:
-                        request_params["tool_choice"] = {"type": "function", "function": {"name": tool_choice}}
-                
-                response = self.client.chat.completions.create(**request_params)
+                message, source = await self._complete_async(request_params, tool_choice, stream)
+            except Exception as e:
+                events.emit(CALL_FINISHED, call_id=call_id, agent_id=self.agent_id, call=tool_choice, ok=False,
+                            error=str(e), elapsed=time.perf_counter() - start)
+                raise
+            except asyncio.CancelledError:
+                # A deadline or a failed sibling cut the call off; close it so no call is left open
+                events.emit(CALL_FINISHED, call_id=call_id, agent_id=self.agent_id, call=tool_choice, ok=False,
+                            error="cancelled", elapsed=time.perf_counter() - start)
+                raise
+            events.emit(CALL_FINISHED, call_id=call_id, agent_id=self.agent_id, call=tool_choice, ok=True,
+                        source=source, elapsed=time.perf_counter() - start)
+            return message
+
+    async def _complete_async(self, request_params: Dict, tool_choice: Optional[str],
+                              stream: Optional[ToolArgumentStream] = None) -> Tuple["ChatCompletionMessage", str]:
+        """Get the response to a request and where it came from: "replay", "cache" or "api"."""
+        replayer, recorder = self.env.replayer, self.env.recorder
+        trace = replayer if replayer is not None else recorder
+        # Number the call as it is made, so concurrent calls of one agent replay in this order
+        seq = trace.next_seq(self.agent_id, tool_choice) if trace is not None else None
+
+        # Replay a recorded run without touching the network
+        if replayer is not None:
+            message = await replayer.replay(self.agent_id, tool_choice, seq, request_params)
+            self.env.metrics.record_call(tool_choice, request_params["model"], self.agent_id,
+                                         self.env.votingRound + 1, None, 0.0, 0.0, source="replay")
+            return message, "replay"
+
+        # Serve previously paid-for responses from the on-disk cache
+        cache = self.env.response_cache
+        message = None
+        source = "cache"
+        if cache is not None:
+            cache_key = cache.make_key(request_params)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                from openai.types.chat import ChatCompletionMessage
+                message = ChatCompletionMessage.model_validate(cached)
+                self.env.metrics.record_call(tool_choice, request_params["model"], self.agent_id,
+                                             self.env.votingRound + 1, None, 0.0, 0.0, source="cache")
+
+        if message is None:
+            try:
+                message = await self._send_request(request_params, stream)
+            except BaseException as e:
+                # Failures and deadline cancellations replay as such
+                if recorder is not None:
+                    recorder.record_failure(self.agent_id, tool_choice, seq, request_params, e)
+                raise
+            source = "api"
+            if cache is not None:
+                cache.put(cache_key, message.model_dump(exclude_none=True))
+
+        if recorder is not None:
+            recorder.record(self.agent_id, tool_choice, seq, request_params, message)
+        return message, source
+
+    async def _send_request(self, request_params: Dict, stream: Optional[ToolArgumentStream] = None):
+        """
+        Send a chat completion request through the call type's pool and the env's rate limiter.
+
+        Rate limits (429), server errors and connection failures are retried with
+        exponential backoff and jitter, waiting at least as long as any Retry-After
+        header asks for. With a stream, the request is streamed into it.
+        """
+        limiter = self.env.engine.rate_limiter
+        metrics = self.env.metrics
+        call_type = call_type_of(request_params)
+        estimated_tokens = estimate_prompt_tokens(request_params["messages"]) + request_params.get("max_tokens", 0)
+        tracer = self.env.tracer
+        attempt = 0
+        started = time.perf_counter()
+
+        while True:
+            try:
+                client = self.client or get_client()
+                queued = time.perf_counter()
+                async with self.env.router.limit(call_type) as route:
+                    async with self.env.engine.limit(estimated_tokens):
+                        attempt_started = time.perf_counter()
+                        if tracer is not None:
+                            tracer.record("queue", QUEUE, queued, attempt_started)
+                        timeout = route.timeout if route.timeout is not None else self.env.call_timeout
+                        options = {"timeout": timeout} if timeout is not None else {}
+                        if stream is not None:
+                            request = stream_completion(client, request_params, stream, **options)
+                        else:
+                            request = client.chat.completions.create(**request_params, **options)
+                        # The client's timeout bounds each read; this bounds the whole attempt
+                        with self.env.span("request", REQUEST, attempt=attempt + 1):
+                            response = await (asyncio.wait_for(request, timeout) if timeout is not None else request)
+                        latency = time.perf_counter() - attempt_started
                 
                 if not response or not response.choices:
                     raise ValueError("Empty response from API")
-                    
+
+                limiter.on_success()
+                usage = getattr(response, "usage", None)
+                self.env.record_usage(usage)
+                metrics.record_call(call_type, request_params["model"], self.agent_id, self.env.votingRound + 1,
+                                    usage, latency, time.perf_counter() - started)
                 return response.choices[0].message
                 
             except Exception as e:
@@ -342,36 +678,100 @@ Be authentic to your character and background. Provide a meaningful contribution
                     "no credits",
                     "token balance"
                 ]):
+                    metrics.record_error(call_type, e)
                     raise ValueError("OpenRouter tokens are depleted. Please try again later.")
-                
-                # For server errors (500), retry
-                if "500" in error_str or "internal server error" in error_str:
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        self.logger.warning(f"Server error, retrying ({retry_count}/{max_retries})")
-                        continue
-                
-                self.logger.error(f"Error invoking OpenRouter API: {e}")
-                raise
 
-    def promptize_vote_history(self) -> str:
-        if self.vote_history:
-            vote_history_str = "\n".join([f"In round {i+1}, you voted for {self.env.agents[vote['vote']].name} for the following reason:\n{vote['reasoning']}" for i,vote in enumerate(self.vote_history)])
-            return f"Your vote history:\n{vote_history_str}\n"
-        else:
+                retry_after = None
+                if is_rate_limit_error(e):
+                    retry_after = parse_retry_after(e)
+                    limiter.on_rate_limited(retry_after)
+                    reason = "Rate limited"
+                elif is_transient_error(e):
+                    reason = "Timed out" if isinstance(e, asyncio.TimeoutError) else "Server error"
+                else:
+                    self.logger.error(f"Error invoking OpenRouter API: {e}")
+                    metrics.record_error(call_type, e)
+                    raise
+
+                attempt += 1
+                if attempt >= limiter.max_retries:
+                    self.logger.error(f"{reason}, giving up after {attempt} attempts: {e}")
+                    metrics.record_error(call_type, e)
+                    raise
+                metrics.record_retry(call_type, reason.lower().replace(" ", "_"))
+                delay = limiter.backoff_delay(attempt, retry_after)
+                self.logger.warning(f"{reason}, retrying in {delay:.1f}s ({attempt}/{limiter.max_retries})")
+                with self.env.span("backoff", BACKOFF, reason=reason):
+                    await asyncio.sleep(delay)
+
+    @property
+    def fixed_prompt_tokens(self) -> int:
+        """Estimated tokens of the persona, candidate list and instructions of every prompt."""
+        if self._fixed_prompt_tokens is None:
+            persona = self._persona_prompt(self.env.list_candidates_for_prompt(randomize=False))
+            self._fixed_prompt_tokens = estimate_tokens(persona) + PROMPT_INSTRUCTION_TOKENS
+        return self._fixed_prompt_tokens
+
+    def estimate_prompt_tokens(self) -> int:
+        """Local estimate of the input tokens of this agent's next ballot or speech prompt."""
+        return self.fixed_prompt_tokens + sum(estimate_tokens(section) for section in self.history_sections())
+
+    def history_sections(self) -> Tuple[str, str, str]:
+        """
+        Return the personal vote, ballot results and discussion histories for prompts.
+
+        If the env sets a prompt token budget, the oldest rounds of each section
+        are dropped until the whole prompt is estimated to fit in it.
+        """
+        with self.env.span("history_sections", PROMPT, self.trace_lane):
+            sections = (
+                self.promptize_vote_history(),
+                self.promptize_voting_results_history(),
+                self.env.get_discussion_history(self.agent_id)
+            )
+            budget = self.env.prompt_token_budget
+            if budget is None:
+                return sections
+
+            available = budget - self.fixed_prompt_tokens
+            if sum(estimate_tokens(section) for section in sections) <= available:
+                return sections
+
+            # Keep the most recent rounds that fit
+            keep = max(len(self.vote_history), len(self.env.votingHistory), len(self.env.discussionHistory))
+            while keep > 0:
+                keep -= 1
+                sections = (
+                    self.promptize_vote_history(last=keep),
+                    self.env.promptize_voting_results_history(last=keep),
+                    self.env.get_discussion_history(self.agent_id, last=keep)
+                )
+                if sum(estimate_tokens(section) for section in sections) <= available:
+                    break
+            self.logger.info(f"Trimmed prompt history to the last {keep} rounds to fit the {budget} token budget")
+            return sections
+
+    def promptize_vote_history(self, last: Optional[int] = None) -> str:
+        vote_history = self.vote_history
+        if not vote_history:
             return ""
 
-    def promptize_voting_results_history(self) -> str:
-        def promptize_voting_results(results: Dict[str, int]) -> str:
-            voting_results = sorted(results.items(), key=lambda x: x[1], reverse=True)
-            if results:
-                voting_results_str = "\n".join([f"Cardinal {i} - {self.env.agents[i].name}: {votes}" for i, votes in voting_results])
-                return f"\n{voting_results_str}\n"
-            else:
-                return ""
+        # Render only the votes cast since the last call
+        if len(self._vote_history_fragments) > len(vote_history):
+            self._vote_history_fragments = []
+        for i in range(len(self._vote_history_fragments), len(vote_history)):
+            vote = vote_history[i]
+            self._vote_history_fragments.append(
+                f"In round {vote['round_index'] + 1}, you voted for {self.env.agents[vote['vote']].name} for the following reason:\n{vote['reasoning']}"
+            )
+
+        rendered_votes, prompt = self._vote_history_prompt
+        if rendered_votes != len(self._vote_history_fragments):
+            prompt = "Your vote history:\n" + "\n".join(self._vote_history_fragments) + "\n"
+            self._vote_history_prompt = (len(self._vote_history_fragments), prompt)
+        if last is not None and last < len(self._vote_history_fragments):
+            return "Your vote history:\n" + "\n".join(self._vote_history_fragments[-last:]) + "\n" if last > 0 else ""
+        return prompt
 
-        if self.env.votingHistory:
-            voting_results_history_str = "\n".join([f"Round {i+1}: {promptize_voting_results(result)}" for i,result in enumerate(self.env.votingHistory)])
-            return f"Previous ballot results:\n{voting_results_history_str}"
-        else:
-            return ""
+    def promptize_voting_results_history(self) -> str:
+        return self.env.promptize_voting_results_history()
@@ -0,0 +1,214 @@
+"""
+Vectorized metrics over whole ensembles of conclaves.
+
+Runs are loaded into one padded runs x ballots x electors int16 array, -1
+where an elector did not vote or a run had already ended, so every metric
+is a handful of NumPy operations over all runs at once rather than a loop
+over runs and rounds.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from environments.ballots import ABSTAINED
+
+# File of an ensemble directory, as written by environments.ensemble.EnsembleStore.
+# Not imported from there so analysis does not load the LLM stack.
+RESULTS_FILE = "results.jsonl"
+
+
+class Runs:
+    """
+    Individual ballots of many conclaves.
+
+    Attributes:
+        votes: runs x ballots x electors array of candidate ids, ABSTAINED
+               where an elector did not vote or the run had ended
+        lengths: Number of ballots of each run
+        winners: Elected candidate of each run, -1 if none
+        seeds: Seed of each run, where known
+    """
+
+    def __init__(self, matrices: Iterable[np.ndarray], winners: Optional[Iterable[Optional[int]]] = None,
+                 seeds: Optional[Iterable[int]] = None, num_candidates: Optional[int] = None):
+        matrices = [np.asarray(matrix, dtype=np.int16) for matrix in matrices]
+        # A run that ended before its first ballot has an empty, one-dimensional matrix
+        num_electors = max((matrix.shape[1] for matrix in matrices if matrix.ndim == 2), default=0) or 1
+        matrices = [matrix if matrix.ndim == 2 else matrix.reshape(-1, num_electors) for matrix in matrices]
+        self.lengths = np.array([matrix.shape[0] for matrix in matrices], dtype=np.int64)
+        num_ballots = int(self.lengths.max()) if len(matrices) else 0
+        num_electors = max((matrix.shape[1] for matrix in matrices), default=0)
+        self.votes = np.full((len(matrices), num_ballots, num_electors), ABSTAINED, dtype=np.int16)
+        for index, matrix in enumerate(matrices):
+            self.votes[index, :matrix.shape[0], :matrix.shape[1]] = matrix
+        self.winners = np.array([-1 if w is None else w for w in winners] if winners is not None
+                                else [-1] * len(matrices), dtype=np.int64)
+        self.seeds = list(seeds) if seeds is not None else list(range(len(matrices)))
+        self.num_candidates = num_candidates or max(num_electors, int(self.votes.max(initial=-1)) + 1)
+
+    @classmethod
+    def from_results(cls, results: Iterable[Dict]) -> "Runs":
+        """Runs of ensemble result records; records without a ballot matrix are skipped."""
+        results = [result for result in results if "ballot_matrix" in result]
+        num_electors = max((len(row) for result in results for row in result["ballot_matrix"]), default=0) or 1
+        return cls([np.array(result["ballot_matrix"], dtype=np.int16).reshape(-1, num_electors)
+                    for result in results],
+                   winners=[result["winner"] for result in results],
+                   seeds=[result["seed"] for result in results])
+
+    @classmethod
+    def from_ensemble(cls, directory: str) -> "Runs":
+        """Load the runs of an ensemble directory (or its results.jsonl)."""
+        path = os.path.join(directory, RESULTS_FILE) if os.path.isdir(directory) else directory
+        results = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write
+                    break
+        return cls.from_results(results)
+
+    @property
+    def num_runs(self) -> int:
+        return self.votes.shape[0]
+
+    @property
+    def active(self) -> np.ndarray:
+        """runs x ballots mask of the ballots each run actually held."""
+        return np.arange(self.votes.shape[1])[None, :] < self.lengths[:, None]
+
+
+def tallies(runs: Runs) -> np.ndarray:
+    """runs x ballots x candidates array of the votes each candidate received."""
+    num_runs, num_ballots, _ = runs.votes.shape
+    ballot_index = np.arange(num_runs * num_ballots).reshape(num_runs, num_ballots, 1)
+    voted = runs.votes != ABSTAINED
+    flat = np.broadcast_to(ballot_index, runs.votes.shape)[voted] * runs.num_candidates + runs.votes[voted]
+    counts = np.bincount(flat, minlength=num_runs * num_ballots * runs.num_candidates)
+    return counts.reshape(num_runs, num_ballots, runs.num_candidates)
+
+
+def win_probabilities(runs: Runs) -> np.ndarray:
+    """Share of all runs won by each candidate; runs without a winner count in the denominator."""
+    if not runs.num_runs:
+        return np.zeros(runs.num_candidates)
+    elected = runs.winners[runs.winners >= 0]
+    return np.bincount(elected, minlength=runs.num_candidates) / runs.num_runs
+
+
+def time_to_consensus(runs: Runs) -> np.ndarray:
+    """Number of elected runs by ballots needed, indexed by ballot count."""
+    return np.bincount(runs.lengths[runs.winners >= 0], minlength=runs.votes.shape[1] + 1)
+
+
+def transition_matrix(runs: Runs, normalize: bool = False) -> np.ndarray:
+    """
+    candidates x candidates counts of electors voting for row candidate in one
+    ballot and column candidate in the next, over all consecutive ballot pairs.
+
+    Args:
+        normalize: Divide each row by its total, giving transition probabilities
+    """
+    before, after = runs.votes[:, :-1], runs.votes[:, 1:]
+    both = (before != ABSTAINED) & (after != ABSTAINED)
+    flat = before[both].astype(np.int64) * runs.num_candidates + after[both]
+    counts = np.bincount(flat, minlength=runs.num_candidates ** 2).reshape(runs.num_candidates, runs.num_candidates)
+    if not normalize:
+        return counts
+    totals = counts.sum(axis=1, keepdims=True)
+    return np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
+
+
+def leader_margins(runs: Runs) -> np.ndarray:
+    """
+    runs x ballots array of the leader's lead over the runner-up as a share of
+    the votes cast, NaN for ballots a run did not hold.
+    """
+    counts = tallies(runs)
+    if counts.shape[2] < 2:
+        return np.full(counts.shape[:2], np.nan)
+    top_two = np.partition(counts, -2, axis=2)[:, :, -2:]
+    cast = counts.sum(axis=2)
+    margins = np.divide(top_two[:, :, 1] - top_two[:, :, 0], cast, out=np.zeros(cast.shape), where=cast > 0)
+    margins[~runs.active] = np.nan
+    return margins
+
+
+def covote_matrix(runs: Runs) -> np.ndarray:
+    """
+    electors x electors share of the ballots both electors voted in where they
+    voted for the same candidate.
+    """
+    num_electors = runs.votes.shape[2]
+    ballots = runs.votes.reshape(-1, num_electors)
+    voted = (ballots != ABSTAINED).astype(np.float32)
+    shared = voted.T @ voted
+    same = np.zeros((num_electors, num_electors), dtype=np.float32)
+    for candidate in np.unique(ballots[ballots != ABSTAINED]):
+        chose = ballots == candidate
+        rows = chose.any(axis=1)
+        supporters = chose[rows].astype(np.float32)
+        same += supporters.T @ supporters
+    return np.divide(same, shared, out=np.zeros_like(same), where=shared > 0)
+
+
+def voting_blocs(covote: np.ndarray, threshold: float = 0.6, min_size: int = 2) -> List[np.ndarray]:
+    """
+    Groups of electors linked by co-voting at least threshold of the time.
+
+    Blocs are the connected components of the thresholded co-voting graph,
+    found by propagating the smallest elector id through it. Returned largest
+    first.
+    """
+    num_electors = covote.shape[0]
+    adjacency = covote >= threshold
+    np.fill_diagonal(adjacency, True)
+    labels = np.arange(num_electors)
+    while True:
+        propagated = np.where(adjacency, labels[None, :], num_electors).min(axis=1)
+        if np.array_equal(propagated, labels):
+            break
+        labels = propagated
+    blocs = [np.flatnonzero(labels == label) for label in np.unique(labels)]
+    return sorted((bloc for bloc in blocs if len(bloc) >= min_size), key=len, reverse=True)
+
+
+def summarize(runs: Runs, names: Optional[Dict[int, str]] = None, top: int = 10,
+              bloc_threshold: float = 0.6) -> str:
+    """Plain-text summary of an ensemble."""
+    names = names or {}
+    label = lambda candidate: f"Cardinal {candidate}" + (f" - {names[candidate]}" if candidate in names else "")
+    elected = runs.winners >= 0
+    lines = [f"{runs.num_runs} conclaves, {int(elected.sum())} elected a pope"]
+    if elected.any():
+        ballots = runs.lengths[elected]
+        lines.append(f"Ballots to election: median {np.median(ballots):.0f}, mean {ballots.mean():.1f}, "
+                     f"max {ballots.max()}")
+    probabilities = win_probabilities(runs)
+    for candidate in np.argsort(probabilities)[::-1][:top]:
+        if probabilities[candidate] > 0:
+            lines.append(f"{label(int(candidate))}: {probabilities[candidate]:.1%}")
+
+    margins = leader_margins(runs)
+    if margins.size and not np.isnan(margins).all():
+        first = margins[:, 0]
+        held = np.flatnonzero(runs.lengths > 0)
+        lines.append(f"Leader margin: {np.nanmean(first):.1%} on the first ballot, "
+                     f"{np.nanmean(margins[held, runs.lengths[held] - 1]):.1%} on the last")
+
+    transitions = transition_matrix(runs)
+    moved = transitions.sum() - np.trace(transitions)
+    if transitions.sum():
+        lines.append(f"Vote changes between consecutive ballots: {moved / transitions.sum():.1%}")
+
+    blocs = voting_blocs(covote_matrix(runs), threshold=bloc_threshold)
+    lines.append(f"{len(blocs)} voting blocs co-voting at least {bloc_threshold:.0%} of the time")
+    for bloc in blocs[:5]:
+        members = ", ".join(str(elector) for elector in bloc[:12]) + (", ..." if len(bloc) > 12 else "")
+        lines.append(f"  {len(bloc)} electors: {members}")
+    return "\n".join(lines)
@@ -0,0 +1,107 @@
+"""
+Batch plots of an ensemble, rendered to PNG files with matplotlib.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from analytics.metrics import (Runs, covote_matrix, leader_margins, time_to_consensus, transition_matrix,
+                               voting_blocs, win_probabilities)
+
+
+def _label(candidate: int, names: Dict[int, str]) -> str:
+    return names.get(candidate, f"Cardinal {candidate}")
+
+
+def _save(fig, path: str) -> str:
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    plt.close(fig)
+    return path
+
+
+def plot_win_probabilities(runs: Runs, path: str, names: Optional[Dict[int, str]] = None, top: int = 15) -> str:
+    probabilities = win_probabilities(runs)
+    candidates = [c for c in np.argsort(probabilities)[::-1][:top] if probabilities[c] > 0]
+    fig, ax = plt.subplots(figsize=(8, 0.4 * max(len(candidates), 4) + 1))
+    ax.barh([_label(int(c), names or {}) for c in candidates][::-1], probabilities[candidates][::-1])
+    ax.set_xlabel("Win probability")
+    ax.set_title(f"Winners of {runs.num_runs} conclaves")
+    return _save(fig, path)
+
+
+def plot_time_to_consensus(runs: Runs, path: str) -> str:
+    counts = time_to_consensus(runs)
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.bar(np.arange(len(counts)), counts)
+    ax.set_xlabel("Ballots to election")
+    ax.set_ylabel("Conclaves")
+    ax.set_title(f"Time to consensus ({int((runs.winners < 0).sum())} conclaves without a winner)")
+    return _save(fig, path)
+
+
+def plot_leader_margins(runs: Runs, path: str) -> str:
+    """Median leader margin by ballot with the 10th-90th percentile band over runs."""
+    margins = leader_margins(runs)
+    ballots = np.arange(1, margins.shape[1] + 1)
+    held = ~np.isnan(margins).all(axis=0)
+    low, median, high = np.nanpercentile(margins[:, held], [10, 50, 90], axis=0)
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.fill_between(ballots[held], low, high, alpha=0.3, label="10th-90th percentile")
+    ax.plot(ballots[held], median, label="Median")
+    ax.set_xlabel("Ballot")
+    ax.set_ylabel("Leader margin (share of votes)")
+    ax.legend()
+    return _save(fig, path)
+
+
+def plot_transitions(runs: Runs, path: str, names: Optional[Dict[int, str]] = None, top: int = 12) -> str:
+    """Row-normalized vote transitions between the most-voted candidates."""
+    transitions = transition_matrix(runs)
+    candidates = np.argsort(transitions.sum(axis=1))[::-1][:top]
+    sub = transitions[np.ix_(candidates, candidates)].astype(float)
+    totals = sub.sum(axis=1, keepdims=True)
+    sub = np.divide(sub, totals, out=np.zeros_like(sub), where=totals > 0)
+    labels = [_label(int(c), names or {}) for c in candidates]
+    fig, ax = plt.subplots(figsize=(9, 8))
+    image = ax.imshow(sub, cmap="viridis", vmin=0, vmax=1)
+    ax.set_xticks(range(len(labels)), labels, rotation=90)
+    ax.set_yticks(range(len(labels)), labels)
+    ax.set_xlabel("Vote in next ballot")
+    ax.set_ylabel("Vote in ballot")
+    fig.colorbar(image, ax=ax, label="Share of votes")
+    return _save(fig, path)
+
+
+def plot_covoting(runs: Runs, path: str, threshold: float = 0.6) -> str:
+    """Co-voting matrix with electors ordered by bloc."""
+    covote = covote_matrix(runs)
+    blocs = voting_blocs(covote, threshold=threshold, min_size=1)
+    order = np.concatenate(blocs) if blocs else np.arange(covote.shape[0])
+    fig, ax = plt.subplots(figsize=(8, 7))
+    image = ax.imshow(covote[np.ix_(order, order)], cmap="magma", vmin=0, vmax=1)
+    ax.set_xlabel("Elector (ordered by bloc)")
+    ax.set_ylabel("Elector (ordered by bloc)")
+    fig.colorbar(image, ax=ax, label="Share of ballots voting alike")
+    return _save(fig, path)
+
+
+def render_report(runs: Runs, directory: str, names: Optional[Dict[int, str]] = None,
+                  bloc_threshold: float = 0.6) -> List[str]:
+    """Render every plot of an ensemble into a directory and return their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = [
+        plot_win_probabilities(runs, os.path.join(directory, "win_probabilities.png"), names),
+        plot_time_to_consensus(runs, os.path.join(directory, "time_to_consensus.png")),
+        plot_transitions(runs, os.path.join(directory, "transitions.png"), names),
+        plot_covoting(runs, os.path.join(directory, "covoting.png"), bloc_threshold)
+    ]
+    if runs.votes.shape[1]:
+        paths.append(plot_leader_margins(runs, os.path.join(directory, "leader_margins.png")))
+    return paths
@@ -0,0 +1,49 @@
+"""
+Summarize and plot a stored ensemble. Run from the repository root:
+
+    python -m analytics.report ensembles/default --plots reports/default
+"""
+
+import argparse
+import os
+import time
+from typing import Dict
+
+from analytics.metrics import Runs, summarize
+from environments.roster import ROSTER_FILE, load_roster
+
+
+def load_names(roster: str) -> Dict[int, str]:
+    """Cardinal names by agent id, which is the row of the roster."""
+    if not os.path.exists(roster):
+        return {}
+    return {cardinal.agent_id: cardinal.name for cardinal in load_roster(roster)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vote flows, convergence and voting blocs of an ensemble")
+    parser.add_argument("ensemble", nargs="?", default="ensembles/default",
+                        help="Ensemble directory (or its results.jsonl)")
+    parser.add_argument("--plots", help="Directory to render the plots into")
+    parser.add_argument("--roster", default=ROSTER_FILE, help="CSV of cardinal names")
+    parser.add_argument("--bloc-threshold", type=float, default=0.6,
+                        help="Share of ballots two electors must vote alike in to share a bloc")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    runs = Runs.from_ensemble(args.ensemble)
+    if not runs.num_runs:
+        print(f"No runs with a ballot matrix in {args.ensemble}")
+        return
+    names = load_names(args.roster)
+    print(summarize(runs, names, bloc_threshold=args.bloc_threshold))
+    if args.plots:
+        # Imported here so a text summary does not need matplotlib
+        from analytics.plots import render_report
+        for path in render_report(runs, args.plots, names, bloc_threshold=args.bloc_threshold):
+            print(f"Wrote {path}")
+    print(f"Analysed {runs.num_runs} conclaves in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Local OpenAI-compatible stand-in for OpenRouter, for benchmarks and offline tests.
+
+Answers POST .../chat/completions with a valid tool call for whichever tool the
+request forces (cast_vote, evaluate_speaking_urgency, speak_message), after a
+configurable latency. A fraction of requests can be answered with 429 (with a
+Retry-After header) or 500 to exercise retry paths.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+CANDIDATE_PATTERN = re.compile(r"^Cardinal (\d+):", re.MULTILINE)
+BATCH_CARDINAL_PATTERN = re.compile(r"^=== Cardinal (\d+):", re.MULTILINE)
+
+
+class _Server(ThreadingHTTPServer):
+    # Hundreds of agents connect at once; the default backlog of 5 would refuse them
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+@dataclass
+class FakeServerConfig:
+    # Latency is drawn from a lognormal distribution with this median (ms) and sigma
+    latency_ms: float = 800.0
+    latency_sigma: float = 0.3
+    # Probability of answering with a 429 / 500 instead of a completion
+    rate_limit_rate: float = 0.0
+    error_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class FakeServerStats:
+    requests: int = 0
+    completions: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+    prompt_chars: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+
+
+class FakeOpenRouter:
+    """Threaded HTTP server answering chat completion requests with fake tool calls."""
+
+    def __init__(self, config: Optional[FakeServerConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeServerConfig()
+        self.stats = FakeServerStats()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def start(self) -> "FakeOpenRouter":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until interrupted."""
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOpenRouter":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _draw(self) -> Dict:
+        """Decide the fate and latency of one request."""
+        with self._lock:
+            latency = self.config.latency_ms * self._rng.lognormvariate(0, self.config.latency_sigma)
+            roll = self._rng.random()
+            return {
+                "latency_ms": latency,
+                "rate_limited": roll < self.config.rate_limit_rate,
+                "error": self.config.rate_limit_rate <= roll < self.config.rate_limit_rate + self.config.error_rate,
+                "rng": random.Random(self._rng.random())
+            }
+
+    def _tool_arguments(self, tool_name: str, prompt: str, rng: random.Random) -> Dict:
+        if tool_name == "evaluate_speaking_urgency":
+            return {"urgency_score": rng.randint(1, 100), "reasoning": "Benchmark urgency."}
+        if tool_name == "speak_message":
+            return {"message": " ".join(["Brothers, we must discern wisely."] * rng.randint(5, 20))}
+        if tool_name in ("cast_vote", "cast_votes", "evaluate_urgency_and_vote"):
+            candidates = [int(c) for c in CANDIDATE_PATTERN.findall(prompt)] or [0]
+
+            def pick() -> int:
+                # Skew towards low ids so that benchmark conclaves eventually converge
+                return min(rng.choice(candidates), rng.choice(candidates))
+
+            if tool_name == "cast_votes":
+                return {"votes": [
+                    {"cardinal_id": int(c), "candidate": pick(), "explanation": "Benchmark vote."}
+                    for c in BATCH_CARDINAL_PATTERN.findall(prompt)
+                ]}
+            if tool_name == "evaluate_urgency_and_vote":
+                return {"candidate": pick(), "explanation": "Benchmark vote.",
+                        "urgency_score": rng.randint(1, 100), "reasoning": "Benchmark urgency."}
+            return {"candidate": pick(), "explanation": "Benchmark vote."}
+        return {}
+
+    def completion(self, request: Dict, rng: random.Random) -> Dict:
+        prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+        tool_choice = request.get("tool_choice") or {}
+        tool_name = tool_choice.get("function", {}).get("name") if isinstance(tool_choice, dict) else None
+        if tool_name is None and request.get("tools"):
+            tool_name = request["tools"][0]["function"]["name"]
+
+        message = {"role": "assistant", "content": None}
+        if tool_name:
+            message["tool_calls"] = [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": tool_name, "arguments": json.dumps(self._tool_arguments(tool_name, prompt, rng))}
+            }]
+        else:
+            message["content"] = "Benchmark response."
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(json.dumps(message)) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_name else "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Dict, headers: Optional[Dict] = None) -> None:
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                start = time.perf_counter()
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+
+                fate = server._draw()
+                with server._lock:
+                    server.stats.requests += 1
+                    server.stats.prompt_chars += sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+                time.sleep(fate["latency_ms"] / 1000)
+
+                if fate["rate_limited"]:
+                    with server._lock:
+                        server.stats.rate_limited += 1
+                    self._send_json(429, {"error": {"message": "Rate limit exceeded", "code": 429}},
+                                    headers={"Retry-After": str(server.config.retry_after)})
+                elif fate["error"]:
+                    with server._lock:
+                        server.stats.errors += 1
+                    self._send_json(500, {"error": {"message": "Internal server error", "code": 500}})
+                else:
+                    body = server.completion(request, fate["rng"])
+                    with server._lock:
+                        server.stats.completions += 1
+                        server.stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+                    self._send_json(200, body)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake OpenRouter server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.3)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeServerConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate
+    )
+    server = FakeOpenRouter(config, port=args.port)
+    print(f"Serving fake OpenRouter at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Throughput benchmark for ConclaveEnv against a local fake OpenRouter server.
+
+Runs single_round.py, multi_round.py and discussion_round.py style workloads
+and reports rounds/sec, p50/p99 call latency per call type and wall time per
+phase. Run from the repository root:
+
+    python -m benchmarks.run_benchmark --workload all --agents 133
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from agents.base import Agent
+from benchmarks.fake_openrouter import FakeOpenRouter, FakeServerConfig
+from environments.conclave_env import ConclaveEnv
+from environments.roster import load_roster, seat_cardinals
+from llm.rate_limit import RateLimiter
+from llm.routing import ModelRouter
+
+WORKLOADS = ("single", "multi", "discussion")
+
+
+class TimedAgent(Agent):
+    """Agent that records the wall time of every request it sends, by call type."""
+
+    def __init__(self, *args, latency_log: Dict[str, List[float]], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latency_log = latency_log
+
+    async def _send_request(self, request_params: Dict, stream=None):
+        call_type = request_params.get("tool_choice", {}).get("function", {}).get("name", "other")
+        start = time.perf_counter()
+        try:
+            return await super()._send_request(request_params, stream)
+        finally:
+            self.latency_log[call_type].append((time.perf_counter() - start) * 1000)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def build_env(num_agents: int, max_concurrency: int, latency_log: Dict[str, List[float]],
+              rpm: Optional[float] = None, tpm: Optional[float] = None) -> ConclaveEnv:
+    env = ConclaveEnv(max_concurrency=max_concurrency,
+                      rate_limiter=RateLimiter(max_concurrency, rpm=rpm, tpm=tpm),
+                      router=ModelRouter.from_environ())
+    seat_cardinals(env, load_roster(limit=num_agents), TimedAgent, latency_log=latency_log)
+    return env
+
+
+def run_workload(workload: str, args: argparse.Namespace, server: FakeOpenRouter) -> Dict:
+    latency_log: Dict[str, List[float]] = defaultdict(list)
+    phase_times: Dict[str, List[float]] = defaultdict(list)
+    env = build_env(args.agents, args.concurrency, latency_log, rpm=args.rpm, tpm=args.tpm)
+    requests_before = server.stats.requests
+    rounds = 1 if workload == "single" else args.rounds
+
+    def timed(phase: str, fn, *fn_args, **fn_kwargs):
+        start = time.perf_counter()
+        result = fn(*fn_args, **fn_kwargs)
+        phase_times[phase].append(time.perf_counter() - start)
+        return result
+
+    start = time.perf_counter()
+    # Keep the env's per-round printouts out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(rounds):
+            if workload == "discussion" and args.fused:
+                timed("fused_round", env.run_fused_round,
+                      num_speakers=args.speakers, batch_size=args.vote_batch_size)
+                continue
+            if workload == "discussion":
+                timed("discussion", env.run_discussion_round,
+                      num_speakers=args.speakers, random_selection=args.random_selection)
+            timed("voting", env.run_voting_round, batch_size=args.vote_batch_size)
+    wall = time.perf_counter() - start
+    env.engine.close()
+
+    return {
+        "workload": workload,
+        "agents": env.num_agents,
+        "rounds": rounds,
+        "wall_s": round(wall, 3),
+        "rounds_per_s": round(rounds / wall, 4) if wall else 0.0,
+        "requests": server.stats.requests - requests_before,
+        "rate_limited": env.engine.rate_limiter.rate_limited,
+        "final_concurrency_limit": int(env.engine.rate_limiter.concurrency_limit),
+        "phase_wall_s": {
+            phase: {"mean": round(sum(times) / len(times), 3), "max": round(max(times), 3)}
+            for phase, times in phase_times.items()
+        },
+        "call_latency_ms": {
+            call_type: {
+                "count": len(values),
+                "p50": round(percentile(values, 50), 1),
+                "p99": round(percentile(values, 99), 1)
+            }
+            for call_type, values in latency_log.items()
+        }
+    }
+
+
+def print_report(result: Dict) -> None:
+    print(f"\n=== {result['workload']} ({result['agents']} agents, {result['rounds']} rounds) ===")
+    print(f"Wall time: {result['wall_s']:.2f}s  |  rounds/sec: {result['rounds_per_s']:.3f}  |  requests: {result['requests']}")
+    print(f"429s: {result['rate_limited']}  |  final concurrency limit: {result['final_concurrency_limit']}")
+    for phase, times in result["phase_wall_s"].items():
+        print(f"  phase {phase:<12} mean {times['mean']:.2f}s  max {times['max']:.2f}s")
+    for call_type, stats in result["call_latency_ms"].items():
+        print(f"  call  {call_type:<26} n={stats['count']:<5} p50 {stats['p50']:.0f}ms  p99 {stats['p99']:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ConclaveEnv against a fake OpenRouter server")
+    parser.add_argument("--workload", choices=WORKLOADS + ("all",), default="all")
+    parser.add_argument("--agents", type=int, default=133)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--speakers", type=int, default=5)
+    parser.add_argument("--random-selection", action="store_true",
+                        help="Pick discussion speakers randomly instead of polling urgency")
+    parser.add_argument("--fused", action="store_true",
+                        help="Poll urgency and a provisional vote in one call per cardinal (discussion workload)")
+    parser.add_argument("--vote-batch-size", type=int, default=None, help="Cardinals per batched ballot request")
+    parser.add_argument("--concurrency", type=int, default=256, help="Engine in-flight request limit")
+    parser.add_argument("--rpm", type=float, default=None, help="Client-side requests-per-minute limit")
+    parser.add_argument("--tpm", type=float, default=None, help="Client-side tokens-per-minute limit")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Median fake request latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="Lognormal sigma of the latency")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    config = FakeServerConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+
+    results = []
+    with FakeOpenRouter(config) as server:
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+        workloads = WORKLOADS if args.workload == "all" else (args.workload,)
+        for workload in workloads:
+            result = run_workload(workload, args, server)
+            print_report(result)
+            results.append(result)
+
+        print(f"\nServer: {server.stats.completions} completions, {server.stats.rate_limited} rate limited, "
+              f"{server.stats.errors} errors")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from environments.budget import Budget
+from environments.ensemble import DEFAULT_MAX_BALLOTS, MODES, EnsembleStore, run_ensemble
+from llm.client import load_dotenv_once
+from llm.engine import DEFAULT_MAX_CONCURRENCY
+import argparse
+import logging
+import datetime
+import os
+
+timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+# Ensure the logs directory exists
+os.makedirs('logs', exist_ok=True)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(f"logs/ensemble_{timestamp}.log"),
+        # logging.StreamHandler()
+    ]
+)
+
+# Create a logger for your module
+logger = logging.getLogger(__name__)
+
+def main():
+    load_dotenv_once()
+    parser = argparse.ArgumentParser(description="Run many independent conclaves and aggregate their outcomes")
+    parser.add_argument("--runs", type=int, default=100, help="Number of conclaves (seeds seed..seed+runs-1)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first conclave")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Worker processes")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="LLM requests in flight across all workers")
+    parser.add_argument("--mode", choices=MODES, default="discussion",
+                        help="multi: ballots only; discussion: a discussion round before every ballot")
+    parser.add_argument("--max-ballots", type=int, default=DEFAULT_MAX_BALLOTS,
+                        help="Give up on a conclave without a winner after this many ballots")
+    parser.add_argument("--output", default="ensembles/default",
+                        help="Directory of the results store; rerunning with the same directory resumes")
+    args = parser.parse_args()
+
+    config = {
+        "mode": args.mode,
+        "max_ballots": args.max_ballots,
+        "max_in_flight": args.max_in_flight,
+        "rpm": float(os.environ["CONCLAVE_RPM"]) if os.environ.get("CONCLAVE_RPM") else None,
+        "tpm": float(os.environ["CONCLAVE_TPM"]) if os.environ.get("CONCLAVE_TPM") else None,
+        "prompt_layout": os.environ.get("CONCLAVE_PROMPT_LAYOUT", "inline"),
+        "discussion_summary_horizon": int(os.environ["CONCLAVE_SUMMARY_HORIZON"]) if os.environ.get("CONCLAVE_SUMMARY_HORIZON") else None,
+        "prompt_token_budget": int(os.environ["CONCLAVE_PROMPT_TOKEN_BUDGET"]) if os.environ.get("CONCLAVE_PROMPT_TOKEN_BUDGET") else None,
+        "vote_batch_size": int(os.environ["CONCLAVE_VOTE_BATCH_SIZE"]) if os.environ.get("CONCLAVE_VOTE_BATCH_SIZE") else None,
+        "pipeline": os.environ.get("CONCLAVE_PIPELINE", "") not in ("", "0"),
+        "fused": os.environ.get("CONCLAVE_FUSED_URGENCY", "") not in ("", "0"),
+        "events_dir": os.environ.get("CONCLAVE_EVENTS"),
+        "trace_dir": os.environ.get("CONCLAVE_TRACE"),
+        "call_timeout": float(os.environ["CONCLAVE_CALL_TIMEOUT"]) if os.environ.get("CONCLAVE_CALL_TIMEOUT") else None,
+        "ballot_deadline": float(os.environ["CONCLAVE_BALLOT_DEADLINE"]) if os.environ.get("CONCLAVE_BALLOT_DEADLINE") else None,
+        # Token, cost, ballot and time caps of each conclave
+        "budget": Budget.from_environ().config()
+    }
+    store = EnsembleStore(args.output)
+    seeds = range(args.seed, args.seed + args.runs)
+    logger.info(f"Running {args.runs} conclaves with {args.workers} workers, config: {config}")
+
+    def report(result):
+        print(f"Seed {result['seed']}: winner {result['winner']} ({result['winner_name']}) "
+              f"after {result['ballots']} ballots [{len(store.results)}/{args.runs}]")
+
+    run_ensemble(store, seeds, config, workers=args.workers,
+                 log_prefix=f"logs/ensemble_{timestamp}", on_result=report)
+
+    summary = store.summary()
+    logger.info(f"Ensemble results:\n{summary}")
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Columnar store of individual ballots.
+
+Every ballot of a conclave is one row of an int16 rounds x electors matrix
+holding the candidate each elector voted for, or ABSTAINED. Each elector
+writes only its own cell of the open round, so votes need no lock, and
+tallies, supermajority checks and historical queries are NumPy operations
+over rows and columns. The reasoning behind each vote is kept out of line,
+in one dict per round, so the matrix stays a few hundred bytes per ballot.
+Electors who could not cast a valid vote are recorded as explicit
+abstentions, with the reason, alongside the reasoning.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Matrix cell of an elector who has not (validly) voted in a round
+ABSTAINED = -1
+INITIAL_ROUNDS = 16
+
+
+class BallotStore:
+    """
+    Individual votes of every ballot, as a round x elector matrix.
+
+    Rows [0, rounds) are closed ballots and row `rounds` is the ballot in
+    progress. The matrix grows by doubling when more rounds or electors are
+    needed.
+    """
+
+    def __init__(self, num_electors: int = 0):
+        self._votes = np.full((INITIAL_ROUNDS, max(num_electors, 1)), ABSTAINED, dtype=np.int16)
+        self.num_electors = num_electors
+        self.rounds = 0
+        self.reasoning: List[Dict[int, str]] = [{}]
+        # Electors of each round who abstained, with the reason
+        self.abstentions: List[Dict[int, str]] = [{}]
+
+    def _ensure(self, num_rounds: int, num_electors: int) -> None:
+        capacity_rounds, capacity_electors = self._votes.shape
+        if num_rounds <= capacity_rounds and num_electors <= capacity_electors:
+            return
+        rounds = capacity_rounds if num_rounds <= capacity_rounds else max(num_rounds, capacity_rounds * 2)
+        electors = capacity_electors if num_electors <= capacity_electors else max(num_electors, capacity_electors * 2)
+        grown = np.full((rounds, electors), ABSTAINED, dtype=np.int16)
+        grown[:capacity_rounds, :capacity_electors] = self._votes
+        self._votes = grown
+
+    def record(self, elector_id: int, candidate: int, reasoning: Optional[str] = None) -> None:
+        """Cast an elector's vote in the open ballot."""
+        self._ensure(self.rounds + 1, elector_id + 1)
+        self.num_electors = max(self.num_electors, elector_id + 1)
+        self._votes[self.rounds, elector_id] = candidate
+        self.abstentions[self.rounds].pop(elector_id, None)
+        if reasoning is not None:
+            self.reasoning[self.rounds][elector_id] = reasoning
+
+    def record_abstention(self, elector_id: int, reason: str) -> None:
+        """Record that an elector cast no valid vote in the open ballot, and why."""
+        self._ensure(self.rounds + 1, elector_id + 1)
+        self.num_electors = max(self.num_electors, elector_id + 1)
+        self._votes[self.rounds, elector_id] = ABSTAINED
+        self.reasoning[self.rounds].pop(elector_id, None)
+        self.abstentions[self.rounds][elector_id] = reason
+
+    def missing(self, elector_ids: List[int]) -> List[int]:
+        """The electors among elector_ids without a vote in the open ballot."""
+        row = self.row(self.rounds)
+        return [elector_id for elector_id in elector_ids
+                if elector_id >= len(row) or row[elector_id] == ABSTAINED]
+
+    def clear_open_round(self) -> None:
+        self._votes[self.rounds] = ABSTAINED
+        self.reasoning[self.rounds] = {}
+        self.abstentions[self.rounds] = {}
+
+    def close_round(self) -> np.ndarray:
+        """Close the open ballot and return its tally."""
+        tally = self.tally(self.rounds)
+        self.rounds += 1
+        self._ensure(self.rounds + 1, self.num_electors)
+        self.reasoning.append({})
+        self.abstentions.append({})
+        return tally
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Closed ballots as a rounds x electors view."""
+        return self._votes[:self.rounds, :self.num_electors]
+
+    def row(self, round_index: int) -> np.ndarray:
+        """Votes of one ballot; round_index == rounds is the open ballot."""
+        return self._votes[round_index, :self.num_electors]
+
+    def tally(self, round_index: int, num_candidates: Optional[int] = None) -> np.ndarray:
+        """Votes received by each candidate in one ballot."""
+        row = self.row(round_index)
+        return np.bincount(row[row != ABSTAINED], minlength=num_candidates or self.num_electors)
+
+    def tallies(self, num_candidates: Optional[int] = None) -> np.ndarray:
+        """Rounds x candidates matrix of votes received in every closed ballot."""
+        num_candidates = num_candidates or self.num_electors
+        matrix = self.matrix
+        rounds = np.repeat(np.arange(matrix.shape[0]), matrix.shape[1])
+        candidates = matrix.ravel().astype(np.int64)
+        voted = candidates != ABSTAINED
+        counts = np.zeros((matrix.shape[0], num_candidates), dtype=np.int64)
+        np.add.at(counts, (rounds[voted], candidates[voted]), 1)
+        return counts
+
+    @staticmethod
+    def counts(tally: np.ndarray) -> Dict[int, int]:
+        """A tally as a {candidate: votes} dict of the candidates who received votes."""
+        return {int(candidate): int(tally[candidate]) for candidate in np.flatnonzero(tally)}
+
+    def supermajority_winner(self, tally: np.ndarray, num_electors: Optional[int] = None) -> Optional[int]:
+        """The candidate with more than 2/3 of the electors' votes, if any."""
+        if not len(tally):
+            return None
+        top = int(np.argmax(tally))
+        return top if tally[top] > (num_electors or self.num_electors) * 2 / 3 else None
+
+    def elector_votes(self, elector_id: int, include_open: bool = True) -> np.ndarray:
+        """One elector's vote in every ballot, ABSTAINED where they did not vote."""
+        end = self.rounds + 1 if include_open else self.rounds
+        if not 0 <= elector_id < self._votes.shape[1]:
+            return np.full(end, ABSTAINED, dtype=np.int16)
+        return self._votes[:end, elector_id]
+
+    def vote_history(self, elector_id: int) -> List[Dict]:
+        """
+        An elector's votes, including the open ballot, as {"round_index", "vote", "reasoning"}
+        dicts; ballots they abstained in are skipped, so round_index labels each vote.
+        """
+        votes = self.elector_votes(elector_id)
+        return [
+            {"round_index": int(round_index), "vote": int(votes[round_index]),
+             "reasoning": self.reasoning[round_index].get(elector_id, "")}
+            for round_index in np.flatnonzero(votes != ABSTAINED)
+        ]
+
+    def switchers(self) -> np.ndarray:
+        """Electors whose vote in the last closed ballot differs from the one before."""
+        if self.rounds < 2:
+            return np.array([], dtype=np.int64)
+        previous, last = self.matrix[-2], self.matrix[-1]
+        return np.flatnonzero((previous != last) & (previous != ABSTAINED) & (last != ABSTAINED))
+
+    def load_rounds(self, rows: List[List[int]], reasoning: List[Dict[int, str]],
+                    abstentions: Optional[List[Dict[int, str]]] = None) -> None:
+        """Append closed ballots, e.g. when resuming from a checkpoint."""
+        abstentions = abstentions or [{} for _ in rows]
+        for row, round_reasoning, round_abstentions in zip(rows, reasoning, abstentions):
+            self._ensure(self.rounds + 2, len(row))
+            self.num_electors = max(self.num_electors, len(row))
+            self._votes[self.rounds, :len(row)] = row
+            self.reasoning[self.rounds] = dict(round_reasoning)
+            self.abstentions[self.rounds] = dict(round_abstentions)
+            self.close_round()
+
+    @property
+    def nbytes(self) -> int:
+        return self._votes.nbytes
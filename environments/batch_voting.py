@@ -0,0 +1,124 @@
+"""
+Batched ballots: several cardinals vote in a single LLM request.
+
+The shared part of the prompt (instructions, candidate list and ballot results)
+is sent once per batch, followed by one section per cardinal with their
+persona and personal history. The response is a single cast_votes tool call
+that is validated and split back into per-cardinal votes.
+"""
+
+import json
+from typing import Dict, List, Tuple
+
+# Completion tokens allowed per cardinal in a batch
+TOKENS_PER_BATCHED_VOTE = 300
+
+CAST_VOTES_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "cast_votes",
+        "description": "Cast one vote for each of the listed cardinals",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "votes": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "cardinal_id": {
+                                "type": "integer",
+                                "description": "The ID of the cardinal casting this vote"
+                            },
+                            "candidate": {
+                                "type": "integer",
+                                "description": "The ID of the candidate this cardinal votes for"
+                            },
+                            "explanation": {
+                                "type": "string",
+                                "description": "Why this cardinal chose this candidate, in their own voice"
+                            }
+                        },
+                        "required": ["cardinal_id", "candidate", "explanation"]
+                    }
+                }
+            },
+            "required": ["votes"]
+        }
+    }
+}
+
+
+def build_batch_prompt(env, agents: List) -> str:
+    """Render one prompt asking for the votes of all the given agents."""
+    sections = []
+    for agent in agents:
+        personal_vote_history, _, discussion_history = agent.history_sections()
+        sections.append(f"""=== Cardinal {agent.agent_id}: {agent.name} ===
+Background: {agent.background}
+
+{personal_vote_history}
+{discussion_history}""")
+
+    cardinal_ids = ", ".join(str(agent.agent_id) for agent in agents)
+    # With the stable layout every batch lists the candidates in one seeded order,
+    # so batched prompts share a cacheable prefix like the per-agent ones do
+    candidates = (env.list_candidates_for_prompt(seed=env.prompt_seed) if env.prompt_layout == "stable"
+                  else env.list_candidates_for_prompt())
+    return f"""You are simulating {len(agents)} cardinals participating in the conclave to decide the next pope. The candidate that secures a 2/3 supermajority of votes wins.
+The candidates are:
+{candidates}
+
+{env.promptize_voting_results_history()}
+
+Each cardinal below votes independently, based only on their own background and history.
+
+{chr(10).join(sections)}
+
+Use the cast_votes tool to cast exactly one vote for each of the cardinals above (IDs {cardinal_ids}). Make sure to include for each the chosen candidate and a detailed explanation in that cardinal's voice of why they chose them.
+    """
+
+
+def parse_batch_votes(response, agents: List, num_candidates: int) -> Tuple[Dict[int, Tuple[int, str]], List[str]]:
+    """
+    Validate a cast_votes response and split it per cardinal.
+
+    Returns:
+        A mapping of agent_id to (candidate, explanation) for every valid vote,
+        and a list of problems found. Cardinals missing from the mapping need
+        to vote individually.
+    """
+    problems = []
+    if not (hasattr(response, 'tool_calls') and response.tool_calls):
+        return {}, ["no tool call in response"]
+    tool_call = response.tool_calls[0]
+    if tool_call.function.name != 'cast_votes':
+        return {}, [f"unexpected tool {tool_call.function.name}"]
+    try:
+        entries = json.loads(tool_call.function.arguments).get("votes")
+    except (json.JSONDecodeError, AttributeError) as e:
+        return {}, [f"malformed arguments: {e}"]
+    if not isinstance(entries, list):
+        return {}, ["votes is not a list"]
+
+    expected = {agent.agent_id for agent in agents}
+    votes = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            problems.append(f"malformed entry {entry!r}")
+            continue
+        cardinal_id = entry.get("cardinal_id")
+        candidate = entry.get("candidate")
+        if cardinal_id not in expected:
+            problems.append(f"vote for unexpected cardinal {cardinal_id!r}")
+        elif cardinal_id in votes:
+            problems.append(f"duplicate vote for cardinal {cardinal_id}")
+        elif not isinstance(candidate, int) or not 0 <= candidate < num_candidates:
+            problems.append(f"invalid candidate {candidate!r} for cardinal {cardinal_id}")
+        else:
+            votes[cardinal_id] = (candidate, entry.get("explanation") or "No explanation provided.")
+
+    missing = expected - set(votes)
+    if missing:
+        problems.append(f"no valid vote for cardinals {sorted(missing)}")
+    return votes, problems
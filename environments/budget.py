@@ -0,0 +1,208 @@
+"""
+Budget guard for a conclave run.
+
+A deadlocked conclave would otherwise keep voting, and paying, forever.
+Budget caps the tokens, estimated dollars, ballots and wall time of a run.
+Before every round it estimates the round's tokens and cost by counting the
+prompts locally, degrades rounds as the budget runs low (fewer speakers,
+summarized discussion history, then the cheapest priced model), drops the
+discussion when only a ballot still fits, and otherwise stops the run with a
+snapshot checkpoint it can be resumed from.
+
+    CONCLAVE_MAX_COST=2.50 CONCLAVE_MAX_ROUNDS=20 uv run discussion_round.py
+"""
+
+import logging
+import os
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Below this share of any budget left, rounds get fewer speakers and summarized history
+DEGRADE_SHARE = 0.5
+# Below this share, calls to pricier models go to the cheapest priced model
+CHEAP_SHARE = 0.25
+# Agents whose prompts are counted to estimate a round
+ESTIMATE_SAMPLE = 5
+# Discussion rounds kept verbatim in prompts once history is summarized to save tokens
+DEGRADED_SUMMARY_HORIZON = 1
+
+
+class RoundPlan(NamedTuple):
+    """What the next round may do: run at all, and with how many speakers (0: a ballot only)."""
+    proceed: bool
+    num_speakers: int
+    tokens: int = 0
+    cost: float = 0.0
+    reason: str = ""
+
+
+class Budget:
+    """
+    Limits of a run; None leaves a limit unset.
+
+    Args:
+        max_tokens: Prompt and completion tokens of the conclave, counted across resumed runs
+        max_cost: Estimated USD spent by this run
+        max_rounds: Ballots of the conclave
+        max_seconds: Wall time of this run
+        fallback_model: Model every call switches to when the budget runs low;
+                        defaults to the cheapest model with a price
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost: Optional[float] = None,
+                 max_rounds: Optional[int] = None, max_seconds: Optional[float] = None,
+                 fallback_model: Optional[str] = None):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.max_rounds = max_rounds
+        self.max_seconds = max_seconds
+        self.fallback_model = fallback_model
+        self.started = time.monotonic()
+        # Degradations applied so far, in order
+        self.degradations = []
+        self._first_round: Optional[int] = None
+
+    @classmethod
+    def from_environ(cls) -> "Budget":
+        """Build a budget from CONCLAVE_MAX_TOKENS, CONCLAVE_MAX_COST, CONCLAVE_MAX_ROUNDS and CONCLAVE_MAX_SECONDS."""
+        return cls(
+            max_tokens=int(os.environ["CONCLAVE_MAX_TOKENS"]) if os.environ.get("CONCLAVE_MAX_TOKENS") else None,
+            max_cost=float(os.environ["CONCLAVE_MAX_COST"]) if os.environ.get("CONCLAVE_MAX_COST") else None,
+            max_rounds=int(os.environ["CONCLAVE_MAX_ROUNDS"]) if os.environ.get("CONCLAVE_MAX_ROUNDS") else None,
+            max_seconds=float(os.environ["CONCLAVE_MAX_SECONDS"]) if os.environ.get("CONCLAVE_MAX_SECONDS") else None,
+            fallback_model=os.environ.get("CONCLAVE_BUDGET_FALLBACK_MODEL")
+        )
+
+    def config(self) -> Dict:
+        """The limits that are set, as keyword arguments of Budget (e.g. for ensemble workers)."""
+        fields = {"max_tokens": self.max_tokens, "max_cost": self.max_cost, "max_rounds": self.max_rounds,
+                  "max_seconds": self.max_seconds, "fallback_model": self.fallback_model}
+        return {field: value for field, value in fields.items() if value is not None}
+
+    def spent(self, env) -> Dict[str, float]:
+        usage = env.token_usage
+        return {
+            "tokens": usage["prompt_tokens"] + usage["completion_tokens"],
+            "cost": env.metrics.total_cost(),
+            "rounds": env.votingRound,
+            "seconds": time.monotonic() - self.started
+        }
+
+    def _limits(self) -> Dict[str, Optional[float]]:
+        return {"tokens": self.max_tokens, "cost": self.max_cost, "rounds": self.max_rounds, "seconds": self.max_seconds}
+
+    def remaining_share(self, env) -> float:
+        """Share left of the most used-up token, cost or time limit; 1.0 without such limits."""
+        spent = self.spent(env)
+        # Degrading rounds does not make them fewer, so the round limit is left out
+        shares = [max(0.0, 1 - spent[name] / limit) for name, limit in self._limits().items()
+                  if limit and name != "rounds"]
+        return min(shares, default=1.0)
+
+    def estimate_round(self, env, num_speakers: int, polls_urgency: bool = False) -> Tuple[int, float]:
+        """
+        Estimated tokens and cost of a round: a ballot of every agent, plus the speeches
+        and, when speakers are chosen by urgency, an urgency poll of every agent.
+
+        Prompt tokens are counted locally on a sample of the agents' next prompts.
+        Completion tokens are the mean so far of each call type, or its route's
+        full allowance before any call of the type has completed.
+        """
+        agents = env.agents
+        sample = agents[::max(1, len(agents) // ESTIMATE_SAMPLE)][:ESTIMATE_SAMPLE]
+        prompt_tokens = sum(agent.estimate_prompt_tokens() for agent in sample) // max(1, len(sample))
+        calls = {"cast_vote": env.num_agents}
+        if num_speakers:
+            calls["speak_message"] = num_speakers
+            if polls_urgency:
+                calls["evaluate_speaking_urgency"] = env.num_agents
+
+        metrics = env.metrics
+        tokens, cost = 0, 0.0
+        for call_type, count in calls.items():
+            route = env.router.route(call_type)
+            completed = metrics.calls.get((call_type, "api"), 0)
+            completion_tokens = (metrics.tokens.get((call_type, "completion"), 0) // completed if completed
+                                 else route.max_tokens)
+            tokens += count * (prompt_tokens + completion_tokens)
+            cost += count * metrics.call_cost(route.model, prompt_tokens, completion_tokens, 0)
+        return tokens, cost
+
+    def plan_round(self, env, num_speakers: int, polls_urgency: bool = False) -> RoundPlan:
+        """
+        Decide whether and how the next round runs, degrading the env as the budget runs low.
+
+        Args:
+            num_speakers: Speakers of a full round; 0 for ballots only
+            polls_urgency: Whether speakers are chosen by polling every agent's urgency
+        """
+        if self._first_round is None:
+            self._first_round = env.votingRound
+        spent = self.spent(env)
+        for name, limit in self._limits().items():
+            if limit is not None and spent[name] >= limit:
+                return RoundPlan(False, 0, reason=f"the {name} budget of {limit:g} is used up ({spent[name]:g})")
+
+        rounds_run = env.votingRound - self._first_round
+        if self.max_seconds is not None and rounds_run:
+            seconds_per_round = spent["seconds"] / rounds_run
+            if spent["seconds"] + seconds_per_round > self.max_seconds:
+                return RoundPlan(False, 0, reason=f"another round (~{seconds_per_round:.0f}s) would exceed "
+                                                  f"the {self.max_seconds:g}s time budget")
+
+        share = self.remaining_share(env)
+        if num_speakers and share < DEGRADE_SHARE:
+            num_speakers = max(1, num_speakers // 2)
+            self._degrade("half the speakers in every discussion round")
+            self._summarize_history(env)
+        if share < CHEAP_SHARE:
+            self._use_cheapest_model(env)
+
+        # Drop the discussion before giving up on a round
+        for speakers in dict.fromkeys((num_speakers, 0)):
+            tokens, cost = self.estimate_round(env, speakers, polls_urgency)
+            fits = ((self.max_tokens is None or spent["tokens"] + tokens <= self.max_tokens) and
+                    (self.max_cost is None or spent["cost"] + cost <= self.max_cost))
+            if fits:
+                return RoundPlan(True, speakers, tokens, cost)
+        return RoundPlan(False, 0, tokens, cost,
+                         reason=f"the next ballot (~{tokens} tokens, ~${cost:.4f}) would exceed the budget")
+
+    def stop(self, env, plan: RoundPlan) -> None:
+        """End the run cleanly: log why and compact the checkpoint into a snapshot to resume from."""
+        logger.warning(f"Stopping after ballot {env.votingRound}: {plan.reason}")
+        print(f"Stopping after ballot {env.votingRound}: {plan.reason}")
+        if env.checkpointer is not None:
+            env.checkpointer.write_snapshot(env)
+
+    def _summarize_history(self, env) -> None:
+        horizon = env.discussion_summary_horizon
+        if horizon is None or horizon > DEGRADED_SUMMARY_HORIZON:
+            env.discussion_summary_horizon = DEGRADED_SUMMARY_HORIZON
+            self._degrade(f"discussion history summarized beyond the last {DEGRADED_SUMMARY_HORIZON} round")
+
+    def _use_cheapest_model(self, env) -> None:
+        prices = env.metrics.prices
+
+        def price(name: str) -> Optional[float]:
+            return prices[name][0] + prices[name][1] if name in prices else None
+
+        model = self.fallback_model or min(prices, key=price, default=None)
+        if model is None:
+            return
+
+        def pricier(current: str) -> bool:
+            # Without both prices, only a fallback model that was asked for replaces the route's
+            if price(current) is None or price(model) is None:
+                return self.fallback_model is not None
+            return price(current) > price(model)
+
+        if env.router.use_model(model, replace=pricier):
+            self._degrade(f"calls sent to the cheaper {model}")
+
+    def _degrade(self, description: str) -> None:
+        if description not in self.degradations:
+            self.degradations.append(description)
+            logger.warning(f"Budget running low: {description}")
@@ -0,0 +1,230 @@
+"""
+Crash-safe checkpoints of a running conclave.
+
+A checkpoint directory holds a full snapshot (snapshot.json) and an
+append-only log of per-round deltas (deltas.jsonl). After every ballot or
+discussion round only what changed since the last save is appended and
+fsynced, so saving stays cheap however long the conclave runs. Every
+compact_every deltas the state is folded into a new snapshot, written to a
+temporary file and atomically renamed over the old one. Deltas carry a
+sequence number and the snapshot records the last one it contains, so a
+crash at any point leaves a consistent state that loses at most the round
+in progress.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 2
+SNAPSHOT_FILE = "snapshot.json"
+DELTAS_FILE = "deltas.jsonl"
+
+
+def _dumps(data: Dict) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def _encode_ballots(ballots: List[Dict[int, int]]) -> List[Dict[str, int]]:
+    return [{str(candidate): votes for candidate, votes in ballot.items()} for ballot in ballots]
+
+
+def _decode_ballots(ballots: List[Dict[str, int]]) -> List[Dict[int, int]]:
+    return [{int(candidate): votes for candidate, votes in ballot.items()} for ballot in ballots]
+
+
+def _encode_votes(store, start: int) -> Dict:
+    """Individual votes and their reasoning of the closed ballots from start on."""
+    return {
+        "rows": store.matrix[start:].tolist(),
+        "reasoning": [{str(elector): text for elector, text in store.reasoning[i].items()}
+                      for i in range(start, store.rounds)],
+        "abstentions": [{str(elector): reason for elector, reason in store.abstentions[i].items()}
+                        for i in range(start, store.rounds)]
+    }
+
+
+def _decode_reasoning(reasoning: List[Dict[str, str]]) -> List[Dict[int, str]]:
+    return [{int(elector): text for elector, text in entry.items()} for entry in reasoning]
+
+
+class Checkpointer:
+    """
+    Saves the env after every round and restores it on resume.
+
+    The checkpoint covers the ballot and discussion histories, discussion
+    summaries, the winner, token usage and the individual votes of every
+    closed ballot. Votes cast in a ballot still in progress are not saved.
+    Discussion participation is rebuilt from the discussion history.
+    """
+
+    def __init__(self, directory: str, compact_every: int = 10):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compact_every = compact_every
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.deltas_path = os.path.join(directory, DELTAS_FILE)
+        self._start_over()
+
+    def _start_over(self) -> None:
+        self.seq = 0
+        self._deltas_since_snapshot = 0
+        # How much of each history has already been persisted
+        self._saved_ballots = 0
+        self._saved_discussions = 0
+        self._saved_summaries: set = set()
+
+    @classmethod
+    def from_environ(cls, default_directory: str) -> "Checkpointer":
+        """Build a checkpointer in CONCLAVE_CHECKPOINT_DIR, or default_directory if it is unset."""
+        return cls(os.environ.get("CONCLAVE_CHECKPOINT_DIR", default_directory))
+
+    def exists(self) -> bool:
+        return os.path.exists(self.snapshot_path) or os.path.exists(self.deltas_path)
+
+    def reset(self) -> None:
+        """Discard any previous checkpoint in the directory."""
+        for path in (self.snapshot_path, self.deltas_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._start_over()
+
+    def save_round(self, env) -> None:
+        """Persist what changed since the last save, compacting into a snapshot when due."""
+        self.seq += 1
+        if self._deltas_since_snapshot + 1 >= self.compact_every:
+            self.write_snapshot(env)
+            return
+        self._append_delta(self._delta(env))
+        self._deltas_since_snapshot += 1
+
+    def write_snapshot(self, env) -> None:
+        """Atomically replace the snapshot with the full state of env and clear the delta log."""
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "seq": self.seq,
+            "votingRound": env.votingRound,
+            "discussionRound": env.discussionRound,
+            "winner": env.winner,
+            "token_usage": env.token_usage,
+            "votingHistory": _encode_ballots(env.votingHistory),
+            "discussionHistory": env.discussionHistory,
+            "discussionSummaries": {str(i): summary for i, summary in env.discussionSummaries.items()},
+            "votes": _encode_votes(env.ballots, 0)
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".snapshot-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(_dumps(state))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # Deltas up to seq are now in the snapshot; a crash before this
+        # truncation is harmless because load() skips them by sequence number
+        with open(self.deltas_path, "w", encoding="utf-8") as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self._mark_saved(env)
+        self._deltas_since_snapshot = 0
+
+    def _delta(self, env) -> Dict:
+        delta = {
+            "seq": self.seq,
+            "votingRound": env.votingRound,
+            "discussionRound": env.discussionRound,
+            "winner": env.winner,
+            "token_usage": env.token_usage,
+            "votingHistory": _encode_ballots(env.votingHistory[self._saved_ballots:]),
+            "discussionHistory": env.discussionHistory[self._saved_discussions:],
+            "discussionSummaries": {
+                str(i): summary for i, summary in env.discussionSummaries.items() if i not in self._saved_summaries
+            },
+            "votes": _encode_votes(env.ballots, self._saved_ballots)
+        }
+        self._mark_saved(env)
+        return delta
+
+    def _mark_saved(self, env) -> None:
+        self._saved_ballots = len(env.votingHistory)
+        self._saved_discussions = len(env.discussionHistory)
+        self._saved_summaries = set(env.discussionSummaries)
+
+    def _append_delta(self, delta: Dict) -> None:
+        with open(self.deltas_path, "a", encoding="utf-8") as f:
+            f.write(_dumps(delta) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self, env) -> bool:
+        """
+        Restore env and its agents from the checkpoint.
+
+        The agents must already be in env.agents, in the same order as when the
+        checkpoint was written. Returns False if there is no checkpoint.
+        """
+        if not self.exists():
+            return False
+
+        state = {"seq": 0}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") != CHECKPOINT_VERSION:
+                raise ValueError(f"Unsupported checkpoint version {state.get('version')!r}")
+            self._apply(env, state)
+
+        self.seq = state["seq"]
+        self._deltas_since_snapshot = 0
+        for delta in self._read_deltas():
+            if delta["seq"] <= self.seq:
+                continue
+            self._apply(env, delta)
+            self.seq = delta["seq"]
+            self._deltas_since_snapshot += 1
+
+        env.agent_discussion_participation = {}
+        for round_index, comments in enumerate(env.discussionHistory):
+            for comment in comments:
+                env.agent_discussion_participation.setdefault(comment["agent_id"], []).append(round_index)
+        # Fold the deltas into a fresh snapshot, which also drops any torn line
+        self.write_snapshot(env)
+        logger.info(f"Resumed from checkpoint {self.directory}: {env.votingRound} ballots, "
+                    f"{env.discussionRound} discussion rounds")
+        return True
+
+    def _read_deltas(self) -> List[Dict]:
+        if not os.path.exists(self.deltas_path):
+            return []
+        deltas = []
+        with open(self.deltas_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    deltas.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write; that round is lost
+                    logger.warning(f"Ignoring incomplete checkpoint delta in {self.deltas_path}")
+                    break
+        return deltas
+
+    @staticmethod
+    def _apply(env, state: Dict) -> None:
+        """Apply a snapshot to a fresh env, or a delta on top of an already restored one."""
+        env.votingRound = state["votingRound"]
+        env.discussionRound = state["discussionRound"]
+        env.winner = state["winner"]
+        env.token_usage = dict(state["token_usage"])
+        env.votingHistory.extend(_decode_ballots(state["votingHistory"]))
+        env.discussionHistory.extend(state["discussionHistory"])
+        for round_index, summary in state["discussionSummaries"].items():
+            env.discussionSummaries[int(round_index)] = summary
+            env._summary_version += 1
+        env.ballots.load_rounds(state["votes"]["rows"], _decode_reasoning(state["votes"]["reasoning"]),
+                                _decode_reasoning(state["votes"].get("abstentions", [])))
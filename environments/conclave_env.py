@@ -1,59 +1,414 @@
+import asyncio
+import contextlib
 import logging
 import random
-import threading
-from concurrent.futures import ThreadPoolExecutor
-from tqdm import tqdm
-from typing import Dict, List, Optional
+import time
+from typing import Callable, Dict, List, Optional
+from environments.ballots import BallotStore
+from environments.checkpoint import Checkpointer
+from environments.events import BALLOT, TALLY, WINNER, EventStream
+from environments.feed import DISCUSSION_STARTED, FEED_EVENTS, ProgressFeed
+from environments.speaker_selection import UrgencySampler
+from environments.tracing import PHASE, PHASES_LANE, ROUND, TALLY as TALLY_SPAN, Tracer
+from environments.batch_voting import CAST_VOTES_TOOL, TOKENS_PER_BATCHED_VOTE, build_batch_prompt, parse_batch_votes
+from llm.cache import BYPASS, ResponseCache
+from llm.engine import AsyncEngine, DEFAULT_MAX_CONCURRENCY
+from llm.metrics import CallMetrics
+from llm.rate_limit import RateLimiter
+from llm.replay import TraceRecorder, TraceReplayer
+from llm.routing import ModelRouter
 
 logger = logging.getLogger(__name__)
 
+PROMPT_LAYOUTS = ("inline", "stable")
+
+# agent_id of the non-voting secretary that writes discussion summaries
+SECRETARY_ID = -1
+
+# Cardinals packed into each request of the pass that re-asks cardinals without a valid vote
+REASK_BATCH_SIZE = 8
+# Share of the ballot deadline given to the first pass; the re-ask pass gets the rest
+FIRST_PASS_SHARE = 0.75
+# A ballot in which fewer electors than this share voted cannot elect a pope
+MIN_TURNOUT = 0.5
+
 class ConclaveEnv:
-    def __init__(self, num_agents: int = 3):
+    def __init__(self, num_agents: int = 3, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 response_cache: Optional[ResponseCache] = None,
+                 recorder: Optional[TraceRecorder] = None,
+                 replayer: Optional[TraceReplayer] = None,
+                 prompt_layout: str = "inline",
+                 prompt_seed: int = 0,
+                 discussion_summary_horizon: Optional[int] = None,
+                 summary_max_words: int = 120,
+                 prompt_token_budget: Optional[int] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 checkpointer: Optional[Checkpointer] = None,
+                 urgency_sampler: Optional[UrgencySampler] = None,
+                 router: Optional[ModelRouter] = None,
+                 events: Optional[EventStream] = None,
+                 feed: Optional[ProgressFeed] = None,
+                 stream_speeches: Optional[bool] = None,
+                 call_timeout: Optional[float] = None,
+                 ballot_deadline: Optional[float] = None,
+                 reask_batch_size: int = REASK_BATCH_SIZE,
+                 metrics: Optional[CallMetrics] = None,
+                 tracer: Optional[Tracer] = None):
         self.num_agents = num_agents
         self.agents = []
         self.votingRound = 0
         self.votingHistory = []
-        self.votingBuffer = {}
-        self.voting_lock = threading.Lock()
+        # Individual votes of every ballot; each agent writes only its own slot
+        self.ballots = BallotStore(num_agents)
         self.winner = None
         self.discussionHistory = []
         self.discussionRound = 0
         # Track which agents participated in which discussion rounds
         self.agent_discussion_participation = {}
+        # Prompt fragments rendered once per round and shared by all agents
+        self._ballot_fragments = []
+        self._ballot_history_prompt = (0, "")
+        self._discussion_fragments = []
+        self._agent_discussion_prompts = {}
+        # Event loop and rate limiter shared by all agents
+        self.engine = AsyncEngine(max_concurrency=max_concurrency, rate_limiter=rate_limiter)
+        # Optional on-disk cache consulted before every LLM call
+        self.response_cache = response_cache
+        # Optional trace recording of every response, or offline replay of one
+        self.recorder = recorder
+        self.replayer = replayer
+        # "inline" puts everything in one user message with a freshly shuffled
+        # candidate list; "stable" keeps a cacheable per-agent system prefix
+        if prompt_layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"Unknown prompt layout {prompt_layout!r}, expected one of {PROMPT_LAYOUTS}")
+        # Inline prompts reshuffle the candidates on every call, so identical runs would
+        # never share a cache key; a response cache gets the stable layout's seeded order
+        if prompt_layout == "inline" and response_cache is not None and response_cache.mode != BYPASS:
+            logger.warning("The response cache needs reproducible prompts; using the stable prompt layout")
+            prompt_layout = "stable"
+        self.prompt_layout = prompt_layout
+        self.prompt_seed = prompt_seed
+        # Discussion rounds older than the horizon are replaced in prompts by a
+        # summary written once by the secretary and shared by every participant
+        self.discussion_summary_horizon = discussion_summary_horizon
+        self.summary_max_words = summary_max_words
+        self.discussionSummaries = {}
+        self._summary_version = 0
+        self._secretary = None
+        # Upper bound on the estimated input tokens of every agent prompt
+        self.prompt_token_budget = prompt_token_budget
+        # Token usage reported by the provider, including prompt-cache hits
+        self.token_usage = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+        # Optional crash-safe save of the state after every round
+        self.checkpointer = checkpointer
+        # Optional sampling of a subset of agents for urgency-based speaker selection
+        self.urgency_sampler = urgency_sampler
+        # Model, token allowance, temperature, timeout and in-flight pool per call type
+        self.router = router or ModelRouter()
+        # Optional structured event stream, written off the hot path by its own thread
+        self.events = events
+        # Optional live feed of round progress; speeches are streamed token by token when it is on
+        self.feed = feed
+        self.stream_speeches = feed is not None if stream_speeches is None else stream_speeches
+        # Seconds allowed for each request attempt (unless its route sets a timeout) and for
+        # collecting the votes of a ballot; cardinals without a valid vote are re-asked in
+        # batches of reask_batch_size, and those who still have none abstain
+        self.call_timeout = call_timeout
+        self.ballot_deadline = ballot_deadline
+        self.reask_batch_size = reask_batch_size
+        # Why each cardinal failed to vote in the ballot in progress, if they did
+        self.vote_failures: Dict[int, str] = {}
+        # Tokens, cost, latency, retries and errors of every LLM call; served at /metrics of the feed
+        self.metrics = metrics or CallMetrics()
+        if feed is not None:
+            feed.metrics = self.metrics
+        # Optional span tracing of rounds, phases and calls, viewable in Perfetto
+        self.tracer = tracer
+
+    def cast_vote(self, agent_id: int, candidate_id: int, reasoning: Optional[str] = None) -> None:
+        """Record an agent's vote in the ballot in progress."""
+        self.ballots.record(agent_id, candidate_id, reasoning)
+        self.emit(BALLOT, round=self.votingRound + 1, agent_id=agent_id, vote=candidate_id, reasoning=reasoning)
+
+    def emit(self, event_type: str, **fields) -> None:
+        """Emit an event to the event stream and the live feed, if there are any."""
+        if self.events is not None:
+            self.events.emit(event_type, **fields)
+        if self.feed is not None and event_type in FEED_EVENTS:
+            self.feed.publish(event_type, **fields)
+
+    def publish(self, event_type: str, **fields) -> None:
+        """Publish a progress event to the live feed only, if there is one."""
+        if self.feed is not None:
+            self.feed.publish(event_type, **fields)
+
+    def span(self, name: str, cat: str, lane: Optional[str] = None, **args):
+        """Trace the enclosed block as a span, if tracing is on."""
+        if self.tracer is None:
+            return contextlib.nullcontext()
+        return self.tracer.span(name, cat, lane, **args)
+
+    @property
+    def votingBuffer(self) -> Dict[int, int]:
+        """Votes per candidate in the ballot in progress."""
+        return BallotStore.counts(self.ballots.tally(self.ballots.rounds, self.num_agents))
+
+    def record_usage(self, usage) -> None:
+        """Accumulate the usage block of a chat completion response."""
+        if usage is None:
+            return
+        self.token_usage["requests"] += 1
+        self.token_usage["prompt_tokens"] += usage.prompt_tokens or 0
+        self.token_usage["completion_tokens"] += usage.completion_tokens or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.token_usage["cached_tokens"] += (getattr(details, "cached_tokens", None) or 0) if details else 0
+
+    def usage_summary(self) -> str:
+        usage = self.token_usage
+        cached_share = usage["cached_tokens"] / usage["prompt_tokens"] if usage["prompt_tokens"] else 0.0
+        return (f"{usage['requests']} requests, {usage['prompt_tokens']} prompt tokens "
+                f"({usage['cached_tokens']} cached, {cached_share:.1%}), {usage['completion_tokens']} completion tokens")
+
+    def run_voting_round(self, batch_size: Optional[int] = None) -> bool:
+        """
+        Run a ballot and check for a 2/3 supermajority.
+
+        Args:
+            batch_size: If greater than 1, pack this many cardinals into each LLM
+                        request. Cardinals whose vote is missing or invalid in the
+                        batch response vote individually instead.
+        """
+        return self.engine.run(self.run_voting_round_async(batch_size))
 
-    def cast_vote(self, candidate_id: int) -> None:
-        with self.voting_lock:
-            self.votingBuffer[candidate_id] = self.votingBuffer.get(candidate_id, 0) + 1
+    async def run_voting_round_async(self, batch_size: Optional[int] = None) -> bool:
+        with self.span("voting_round", ROUND, round=self.votingRound + 1):
+            self._open_ballot()
+            await self._collect_votes_async(self.agents, batch_size)
+            return await self._finish_ballot_async()
 
-    def run_voting_round(self) -> bool:
-        self.votingBuffer.clear()
-        with ThreadPoolExecutor(max_workers=min(8, self.num_agents)) as executor:
-            futures = [executor.submit(agent.cast_vote) for agent in self.agents]
-            # Wait for all futures to complete
-            for future in tqdm(futures, desc="Collecting Votes", total=len(futures)):
-                future.result()  # This blocks until the task completes
+    def _open_ballot(self) -> None:
+        self.ballots.clear_open_round()
+        self.vote_failures = {}
 
+    def _pass_deadline(self, share: float) -> Optional[float]:
+        return self.ballot_deadline * share if self.ballot_deadline is not None else None
+
+    async def _collect_votes_async(self, agents: List, batch_size: Optional[int] = None,
+                                   desc: str = "Collecting Votes", deadline: Optional[float] = None) -> None:
+        """
+        Have the given agents cast their votes into the ballot in progress.
+
+        Args:
+            deadline: Seconds to wait for the votes; defaults to the first-pass
+                      share of the ballot deadline. Requests still pending then
+                      are cancelled and their cardinals are left without a vote.
+        """
+        if batch_size is not None and batch_size > 1:
+            batches = [agents[i:i + batch_size] for i in range(0, len(agents), batch_size)]
+            collect = self.engine.gather([self._cast_votes_in_batch_async(batch) for batch in batches],
+                                         desc=f"{desc} (batched)")
+        else:
+            collect = self.engine.gather([agent.cast_vote_async() for agent in agents], desc=desc)
+
+        with self.span(desc, PHASE, PHASES_LANE, round=self.votingRound + 1, agents=len(agents)):
+            deadline = deadline if deadline is not None else self._pass_deadline(FIRST_PASS_SHARE)
+            if deadline is None:
+                await collect
+                return
+            try:
+                await asyncio.wait_for(collect, deadline)
+            except asyncio.TimeoutError:
+                missing = self.ballots.missing([agent.agent_id for agent in agents])
+                logger.warning(f"{desc}: {len(missing)} of {len(agents)} votes still missing after the {deadline:.0f}s deadline")
+                for agent_id in missing:
+                    self.vote_failures.setdefault(agent_id, f"no vote within the {deadline:.0f}s deadline")
+
+    async def _finish_ballot_async(self) -> bool:
+        """
+        Re-ask the cardinals without a valid vote, record the rest as abstentions
+        and close the ballot.
+        """
+        missing = self.ballots.missing([agent.agent_id for agent in self.agents])
+        if missing:
+            logger.warning(f"{len(missing)} cardinals have no valid vote, asking them again: "
+                           + "; ".join(f"{agent_id}: {self.vote_failures.get(agent_id, 'no vote')}" for agent_id in missing))
+            await self._collect_votes_async([self.agents[agent_id] for agent_id in missing],
+                                            self.reask_batch_size if len(missing) > 1 else None,
+                                            desc="Re-asking Missing Votes",
+                                            deadline=self._pass_deadline(1 - FIRST_PASS_SHARE))
+            for agent_id in self.ballots.missing(missing):
+                reason = self.vote_failures.get(agent_id, "no vote")
+                self.ballots.record_abstention(agent_id, reason)
+                logger.warning(f"Cardinal {agent_id} abstains in ballot {self.votingRound + 1}: {reason}")
+        with self.span("tally", TALLY_SPAN, round=self.votingRound + 1):
+            return self._close_ballot()
+
+    def _close_ballot(self) -> bool:
+        """Close the ballot in progress and check for a 2/3 supermajority."""
+        abstentions = len(self.ballots.abstentions[self.ballots.rounds])
+        tally = self.ballots.close_round()
         self.votingRound += 1
-        self.votingHistory.append(self.votingBuffer.copy())
-        voting_results = sorted(self.votingBuffer.items(), key=lambda x: x[1], reverse=True)
+        results = BallotStore.counts(tally)
+        self.votingHistory.append(results)
+        self.emit(TALLY, round=self.votingRound, counts=results, total=int(tally.sum()), abstentions=abstentions)
+        voting_results = sorted(results.items(), key=lambda x: x[1], reverse=True)
         voting_results_str = "\n".join([f"Cardinal {i} - {self.agents[i].name}: {votes}" for i, votes in voting_results])
         logger.info(f"Voting round {self.votingRound} completed.\n{voting_results_str}")
-        logger.info(f"Total votes: {sum(self.votingBuffer.values())}")
+        logger.info(f"Total votes: {int(tally.sum())}, abstentions: {abstentions}")
+        logger.info(f"Token usage so far: {self.usage_summary()}")
         print(f"Voting round {self.votingRound} completed.\n{voting_results_str}")
-        print(f"Total votes: {sum(self.votingBuffer.values())}")
-        threshold = self.num_agents * 2 / 3
-        print(f"most votes: {voting_results[0][1]}, threshold: {threshold}")
+        print(f"Total votes: {int(tally.sum())}" + (f", abstentions: {abstentions}" if abstentions else ""))
+        # Abstaining electors are left out of the 2/3 supermajority, unless too few voted
+        electors_voting = self.num_agents - abstentions
+        threshold = electors_voting * 2 / 3
+        print(f"most votes: {int(tally.max()) if len(tally) else 0}, threshold: {threshold}")
 
         # if the top candidate has more than 2/3 of the votes
-        if voting_results[0][1] > threshold:
-            top_candidate = voting_results[0][0]
+        top_candidate = None
+        if electors_voting >= self.num_agents * MIN_TURNOUT:
+            top_candidate = self.ballots.supermajority_winner(tally, electors_voting)
+        else:
+            logger.warning(f"Only {electors_voting} of {self.num_agents} electors voted; the ballot cannot elect a pope")
+        if top_candidate is not None:
             self.winner = top_candidate
+            self.emit(WINNER, round=self.votingRound, candidate=top_candidate)
             print(f"Cardinal {top_candidate} wins!")
+            self.save_checkpoint()
             return True
 
-        self.votingBuffer.clear()
+        self.save_checkpoint()
         return False
 
+    def save_checkpoint(self) -> None:
+        """Persist the round just completed, if checkpointing is enabled."""
+        if self.checkpointer is not None:
+            self.checkpointer.save_round(self)
+
+    async def _cast_votes_in_batch_async(self, agents: List) -> None:
+        """Collect the votes of several agents with one request, falling back to individual calls."""
+        prompt = build_batch_prompt(self, agents)
+        try:
+            response = await self.secretary._invoke_claude_async(
+                prompt, [CAST_VOTES_TOOL], tool_choice="cast_votes",
+                max_output_tokens=TOKENS_PER_BATCHED_VOTE * len(agents)
+            )
+            votes, problems = parse_batch_votes(response, agents, self.num_agents)
+        except Exception as e:
+            votes, problems = {}, [f"request failed: {e}"]
+
+        for agent in agents:
+            if agent.agent_id in votes:
+                agent.record_vote(*votes[agent.agent_id])
+
+        fallback = [agent for agent in agents if agent.agent_id not in votes]
+        if problems:
+            logger.warning(f"Batch of {len(agents)} votes had problems ({'; '.join(problems)}); "
+                           f"{len(fallback)} cardinals will vote individually")
+        if fallback:
+            await asyncio.gather(*[agent.cast_vote_async() for agent in fallback])
+
+    def run_pipelined_round(self, num_speakers: int = 5, random_selection: bool = False,
+                            batch_size: Optional[int] = None) -> bool:
+        """
+        Run a discussion round followed by a ballot, overlapping the two.
+
+        A cardinal only sees the discussion rounds they spoke in, so the ballot
+        prompts of this round's non-speakers do not depend on its speeches.
+        Their votes are collected as soon as the speakers are chosen, while the
+        speeches are still being generated; only the speakers vote after the
+        discussion. Discussion rounds summarized at the end of this round still
+        appear verbatim in the non-speakers' ballot prompts.
+
+        Returns:
+            True if the ballot elected a pope
+        """
+        return self.engine.run(self.run_pipelined_round_async(num_speakers, random_selection, batch_size))
+
+    async def run_pipelined_round_async(self, num_speakers: int = 5, random_selection: bool = False,
+                                        batch_size: Optional[int] = None) -> bool:
+        """Async version of run_pipelined_round."""
+        with self.span("pipelined_round", ROUND, round=self.votingRound + 1):
+            self._open_ballot()
+            early_ballots = []
+            selected_speakers = []
+            # Both passes share the first-pass deadline, counted from the opening of the ballot
+            first_pass = self._pass_deadline(FIRST_PASS_SHARE)
+            first_pass_ends = time.monotonic() + first_pass if first_pass is not None else None
+
+            def time_left() -> Optional[float]:
+                return max(0.0, first_pass_ends - time.monotonic()) if first_pass_ends is not None else None
+
+            def start_non_speaker_ballots(speakers: List) -> None:
+                selected_speakers.extend(speakers)
+                speaker_ids = {agent.agent_id for agent in speakers}
+                non_speakers = [agent for agent in self.agents if agent.agent_id not in speaker_ids]
+                early_ballots.append(asyncio.ensure_future(
+                    self._collect_votes_async(non_speakers, batch_size, desc="Collecting Non-Speaker Votes",
+                                              deadline=time_left())
+                ))
+
+            # The ballot's checkpoint covers the discussion too; saving in between
+            # would persist the non-speakers' votes without their ballot
+            try:
+                await self.run_discussion_round_async(num_speakers, random_selection,
+                                                      on_speakers_selected=start_non_speaker_ballots,
+                                                      checkpoint=False)
+            except BaseException:
+                # Stop the non-speakers' votes from filling a ballot that will never be closed
+                for ballot in early_ballots:
+                    ballot.cancel()
+                await asyncio.gather(*early_ballots, return_exceptions=True)
+                raise
+            await asyncio.gather(*early_ballots, self._collect_votes_async(selected_speakers, batch_size,
+                                                                           desc="Collecting Speaker Votes",
+                                                                           deadline=time_left()))
+            return await self._finish_ballot_async()
+
+    def run_fused_round(self, num_speakers: int = 5, batch_size: Optional[int] = None) -> bool:
+        """
+        Run an urgency-selected discussion round and a ballot with one fused call per agent.
+
+        Every agent answers a single request with a provisional vote and its
+        speaking urgency. The non-speakers' ballot prompts would not depend on
+        the discussion, so their provisional votes are cast as their ballot;
+        the speakers, and any agent without a valid provisional vote, vote
+        again after the discussion.
+
+        Returns:
+            True if the ballot elected a pope
+        """
+        return self.engine.run(self.run_fused_round_async(num_speakers, batch_size))
+
+    async def run_fused_round_async(self, num_speakers: int = 5, batch_size: Optional[int] = None) -> bool:
+        """Async version of run_fused_round."""
+        with self.span("fused_round", ROUND, round=self.votingRound + 1):
+            self._open_ballot()
+            logger.info(f"Evaluating speaking urgency and provisional votes for discussion round {self.discussionRound + 1}")
+            with self.span("Evaluating Urgency and Votes", PHASE, PHASES_LANE, round=self.votingRound + 1):
+                fused = await self.engine.gather(
+                    [agent.speaking_urgency_and_vote_async() for agent in self.agents],
+                    desc="Evaluating Urgency and Votes"
+                )
+            provisional_votes = {result['agent_id']: result for result in fused if result['vote'] is not None}
+            revoters = []
+
+            def cast_provisional_votes(speakers: List) -> None:
+                speaker_ids = {agent.agent_id for agent in speakers}
+                for agent in self.agents:
+                    result = provisional_votes.get(agent.agent_id)
+                    if agent.agent_id in speaker_ids or result is None:
+                        revoters.append(agent)
+                    else:
+                        agent.record_vote(result['vote'], result['vote_reasoning'])
+
+            # The ballot's checkpoint covers the discussion too
+            await self.run_discussion_round_async(num_speakers, random_selection=False,
+                                                  on_speakers_selected=cast_provisional_votes,
+                                                  checkpoint=False, urgency_scores=fused)
+            logger.info(f"{len(self.agents) - len(revoters)} provisional votes cast, {len(revoters)} cardinals vote again")
+            await self._collect_votes_async(revoters, batch_size, desc="Collecting Speaker Votes")
+            return await self._finish_ballot_async()
+
     def run_discussion_round(self, num_speakers: int = 5, random_selection: bool = False) -> None:
         """
         Run a discussion round where agents can speak about candidates or their own position.
@@ -64,6 +419,29 @@ class ConclaveEnv:
             random: If True, selects speakers randomly instead of based on urgency.
                    If False, agents with higher speaking urgency are prioritized.
         """
+        self.engine.run(self.run_discussion_round_async(num_speakers, random_selection))
+
+    async def run_discussion_round_async(self, num_speakers: int = 5, random_selection: bool = False,
+                                         on_speakers_selected: Optional[Callable[[List], None]] = None,
+                                         checkpoint: bool = True,
+                                         urgency_scores: Optional[List[Dict]] = None) -> None:
+        """
+        Async version of run_discussion_round.
+
+        Args:
+            urgency_scores: Urgency results already collected for this round, used
+                            instead of polling every agent when selecting by urgency
+            on_speakers_selected: Called with the selected speakers before their
+                                  speeches are requested
+            checkpoint: If False, leave saving this round to the caller
+        """
+        with self.span("discussion_round", ROUND, round=self.discussionRound + 1):
+            await self._run_discussion_round_async(num_speakers, random_selection, on_speakers_selected,
+                                                   checkpoint, urgency_scores)
+
+    async def _run_discussion_round_async(self, num_speakers: int, random_selection: bool,
+                                          on_speakers_selected: Optional[Callable[[List], None]],
+                                          checkpoint: bool, urgency_scores: Optional[List[Dict]]) -> None:
         self.discussionRound += 1
         round_comments = []
 
@@ -103,14 +481,17 @@ class ConclaveEnv:
             logger.info(f"Evaluating speaking urgency for discussion round {self.discussionRound}")
 
             # Collect speaking urgency from all agents
-            urgency_scores = []
-            with ThreadPoolExecutor(max_workers=min(8, self.num_agents)) as executor:
-                futures = [executor.submit(agent.speaking_urgency) for agent in self.agents]
-                # Wait for all futures to complete
-                for future in tqdm(futures, desc="Evaluating Speaking Urgency", total=len(futures)):
-                    result = future.result()  # This blocks until the task completes
-                    if result:
-                        urgency_scores.append(result)
+            sampled = urgency_scores is None and self.urgency_sampler is not None
+            if urgency_scores is None:
+                with self.span("Evaluating Speaking Urgency", PHASE, PHASES_LANE, round=self.discussionRound):
+                    if sampled:
+                        urgency_scores = await self.urgency_sampler.poll_async(self)
+                    else:
+                        results = await self.engine.gather(
+                            [agent.speaking_urgency_async() for agent in self.agents],
+                            desc="Evaluating Speaking Urgency"
+                        )
+                        urgency_scores = [result for result in results if result]
 
             # Sort agents by urgency score (highest to lowest)
             sorted_agents = sorted(urgency_scores, key=lambda x: x['urgency_score'], reverse=True)
@@ -129,36 +510,34 @@ class ConclaveEnv:
             else:
                 # Take the top N agents by urgency score
                 selected_agent_ids = [score['agent_id'] for score in sorted_agents[:num_speakers]]
+            if sampled:
+                self.urgency_sampler.record_selection(self, selected_agent_ids, urgency_scores)
 
             # Get the corresponding agent objects
             speakers = [self.agents[agent_id] for agent_id in selected_agent_ids]
 
         logger.info(f"Starting discussion round {self.discussionRound} with {len(speakers)} speakers")
+        self.publish(DISCUSSION_STARTED, round=self.discussionRound, speakers=[agent.agent_id for agent in speakers])
+        if on_speakers_selected is not None:
+            on_speakers_selected(speakers)
 
         # Collect discussions from selected speakers
-        futures = []
-        with ThreadPoolExecutor(max_workers=min(8, len(speakers))) as executor:
-            # Create a list to store agent-urgency pairs
-            agent_urgency_pairs = []
-
-            # Match each selected agent with their urgency data
-            for agent in speakers:
-                agent_id = agent.agent_id
-                # Find the corresponding urgency data
-                urgency_data = None
-                for score in urgency_scores:
-                    if score['agent_id'] == agent_id:
-                        urgency_data = score
-                        break
-
-                # Submit the discuss task with the urgency data
-                futures.append(executor.submit(agent.discuss, urgency_data))
-
-            # Wait for all futures to complete
-            for future in tqdm(futures, desc="Collecting Discussion", total=len(futures)):
-                result = future.result()  # This blocks until the task completes
-                if result:
-                    round_comments.append(result)
+        coros = []
+        # Match each selected agent with their urgency data
+        for agent in speakers:
+            agent_id = agent.agent_id
+            # Find the corresponding urgency data
+            urgency_data = None
+            for score in urgency_scores:
+                if score['agent_id'] == agent_id:
+                    urgency_data = score
+                    break
+
+            coros.append(agent.discuss_async(urgency_data))
+
+        with self.span("Collecting Discussion", PHASE, PHASES_LANE, round=self.discussionRound, speakers=len(coros)):
+            results = await self.engine.gather(coros, desc="Collecting Discussion")
+        round_comments.extend(result for result in results if result)
 
         self.discussionHistory.append(round_comments)
 
@@ -176,6 +555,11 @@ class ConclaveEnv:
             for comment in round_comments
         ])
         logger.info(f"Discussion round {self.discussionRound} completed.\n{discussion_str}")
+
+        if self.discussion_summary_horizon is not None:
+            await self.summarize_old_discussion_rounds_async()
+        if checkpoint:
+            self.save_checkpoint()
         print(f"\nDiscussion round {self.discussionRound} completed:")
         print("=" * 60)
         for comment in round_comments:
@@ -184,51 +568,136 @@ class ConclaveEnv:
             print(f"{comment['message']}")
         print("=" * 60)
 
-    def list_candidates_for_prompt(self, randomize: bool = True) -> str:
+    def list_candidates_for_prompt(self, randomize: bool = True, seed: Optional[int] = None) -> str:
+        """List the candidates, shuffled unless randomize is False.
+
+        A seed gives a fixed order that does not touch the global RNG.
+        """
         indices = list(range(self.num_agents))
-        if randomize:
+        if seed is not None:
+            random.Random(seed).shuffle(indices)
+        elif randomize:
             random.shuffle(indices)
         candidates = [f"Cardinal {i}: {self.agents[i].name}" for i in indices]
         result = "\n".join(candidates)
         return result
 
-    def get_discussion_history(self, agent_id: Optional[int] = None) -> str:
+    @staticmethod
+    def _extend_fragments(fragments: List[str], history: List, render) -> None:
+        """Render prompt fragments for history entries added since the last call."""
+        if len(fragments) > len(history):
+            # History was replaced rather than appended to; start over
+            del fragments[:]
+        for index in range(len(fragments), len(history)):
+            fragments.append(render(index, history[index]))
+
+    def _render_ballot_round(self, index: int, results: Dict[int, int]) -> str:
+        voting_results = sorted(results.items(), key=lambda x: x[1], reverse=True)
+        if not results:
+            return f"Round {index + 1}: "
+        voting_results_str = "\n".join([f"Cardinal {i} - {self.agents[i].name}: {votes}" for i, votes in voting_results])
+        return f"Round {index + 1}: \n{voting_results_str}\n"
+
+    def promptize_voting_results_history(self, last: Optional[int] = None) -> str:
+        """Return the results of all previous ballots for prompts.
+
+        Each round is rendered once and the joined text is shared by every agent.
+
+        Args:
+            last: If provided, only include this many of the most recent ballots.
+        """
+        if not self.votingHistory:
+            return ""
+
+        self._extend_fragments(self._ballot_fragments, self.votingHistory, self._render_ballot_round)
+        if last is not None and last < len(self._ballot_fragments):
+            return "Previous ballot results:\n" + "\n".join(self._ballot_fragments[-last:]) if last > 0 else ""
+        rendered_rounds, prompt = self._ballot_history_prompt
+        if rendered_rounds != len(self._ballot_fragments):
+            prompt = "Previous ballot results:\n" + "\n".join(self._ballot_fragments)
+            self._ballot_history_prompt = (len(self._ballot_fragments), prompt)
+        return prompt
+
+    def _render_discussion_round(self, index: int, comments: List[Dict]) -> str:
+        summary = self.discussionSummaries.get(index)
+        if summary is not None:
+            return f"Discussion Round {index + 1} (summary):\n{summary}\n\n"
+        round_str = f"Discussion Round {index + 1}:\n"
+        for comment in comments:
+            comment_agent_id = comment['agent_id']
+            round_str += f"Cardinal {comment_agent_id} - {self.agents[comment_agent_id].name}:\n{comment['message']}\n\n"
+        return round_str + "\n"
+
+    def get_discussion_history(self, agent_id: Optional[int] = None, last: Optional[int] = None) -> str:
         """Return formatted discussion history for prompts.
-        
+
+        Each discussion round is rendered once (or replaced by its summary once
+        it falls behind the summary horizon); an agent's history is rebuilt
+        only when the rounds it participated in or their summaries change.
+
         Args:
             agent_id: If provided, only return discussions this agent participated in.
                      If None, return all discussions (original behavior).
+            last: If provided, only include this many of the most recent rounds.
         """
         if not self.discussionHistory:
             return ""
 
+        self._extend_fragments(self._discussion_fragments, self.discussionHistory, self._render_discussion_round)
+
         # If no agent_id provided, return all discussions (backward compatibility)
         if agent_id is None:
-            history_str = ""
-            for round_num, comments in enumerate(self.discussionHistory):
-                round_str = f"Discussion Round {round_num + 1}:\n"
-                for comment in comments:
-                    comment_agent_id = comment['agent_id']
-                    round_str += f"Cardinal {comment_agent_id} - {self.agents[comment_agent_id].name}:\n{comment['message']}\n\n"
-                history_str += round_str + "\n"
-            return history_str
-
-        # Return only discussions this agent participated in
-        if agent_id not in self.agent_discussion_participation:
-            return ""
-        
-        participated_rounds = self.agent_discussion_participation[agent_id]
-        if not participated_rounds:
-            return ""
-
-        history_str = ""
-        for round_index in participated_rounds:
-            if round_index < len(self.discussionHistory):
-                comments = self.discussionHistory[round_index]
-                round_str = f"Discussion Round {round_index + 1}:\n"
-                for comment in comments:
-                    comment_agent_id = comment['agent_id']
-                    round_str += f"Cardinal {comment_agent_id} - {self.agents[comment_agent_id].name}:\n{comment['message']}\n\n"
-                history_str += round_str + "\n"
-
-        return history_str
+            rounds = range(len(self._discussion_fragments))
+        else:
+            # Return only discussions this agent participated in
+            participated_rounds = self.agent_discussion_participation.get(agent_id)
+            if not participated_rounds:
+                return ""
+            rounds = [i for i in participated_rounds if i < len(self._discussion_fragments)]
+
+        if last is not None:
+            return "".join(self._discussion_fragments[i] for i in list(rounds)[max(0, len(rounds) - last):]) if last > 0 else ""
+        if agent_id is None:
+            return "".join(self._discussion_fragments)
+
+        key = (tuple(rounds), self._summary_version)
+        cached = self._agent_discussion_prompts.get(agent_id)
+        if cached is None or cached[0] != key:
+            cached = (key, "".join(self._discussion_fragments[i] for i in rounds))
+            self._agent_discussion_prompts[agent_id] = cached
+        return cached[1]
+
+    @property
+    def secretary(self):
+        """Non-voting agent that writes the shared discussion summaries."""
+        if self._secretary is None:
+            from agents.base import Agent
+            self._secretary = Agent(
+                agent_id=SECRETARY_ID,
+                name="Secretary of the Conclave",
+                background="You are the impartial secretary of the conclave and do not vote.",
+                env=self
+            )
+        return self._secretary
+
+    async def summarize_old_discussion_rounds_async(self) -> None:
+        """Summarize every discussion round that has fallen behind the summary horizon."""
+        cutoff = len(self.discussionHistory) - self.discussion_summary_horizon
+        pending = [i for i in range(max(0, cutoff)) if i not in self.discussionSummaries and self.discussionHistory[i]]
+        if not pending:
+            return
+
+        with self.span("Summarizing Discussion", PHASE, PHASES_LANE, round=self.discussionRound, rounds=len(pending)):
+            summaries = await self.engine.gather(
+                [self.secretary.summarize_discussion_async(i, self.discussionHistory[i]) for i in pending],
+                desc="Summarizing Discussion"
+            )
+        self._extend_fragments(self._discussion_fragments, self.discussionHistory, self._render_discussion_round)
+        for round_index, summary in zip(pending, summaries):
+            if not summary:
+                # Keep the verbatim round; it will be retried after the next round
+                continue
+            self.discussionSummaries[round_index] = summary
+            self._discussion_fragments[round_index] = self._render_discussion_round(round_index, [])
+            self._summary_version += 1
+            logger.info(f"Summarized discussion round {round_index + 1}:\n{summary}")
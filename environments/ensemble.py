@@ -0,0 +1,339 @@
+"""
+Monte Carlo ensembles of independent conclaves.
+
+One conclave yields one winner; the outcome distribution needs many. An
+ensemble runs each conclave with its own seed in a process pool. The workers
+share one multiprocessing semaphore that caps the LLM requests in flight
+across the whole pool, so adding workers does not multiply the load on the
+provider. Each finished run is appended to an EnsembleStore (results.jsonl)
+as soon as it completes, and a restarted ensemble skips the seeds already
+in the store. Workers keep their per-round printouts to themselves, and a
+worker that dies is replaced by a fresh pool with fresh request slots.
+"""
+
+import concurrent.futures
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, List, Optional
+
+from environments.budget import Budget
+from environments.checkpoint import _decode_ballots, _encode_ballots
+from environments.conclave_env import ConclaveEnv
+from environments.events import EventStream
+from environments.roster import ROSTER_FILE, load_roster, seat_cardinals
+from environments.speaker_selection import UrgencySampler
+from environments.tracing import Tracer
+from llm.metrics import CallMetrics
+from llm.rate_limit import RateLimiter
+from llm.routing import ModelRouter
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FILE = "results.jsonl"
+MODES = ("multi", "discussion")
+DEFAULT_MAX_BALLOTS = 30
+# Times a pool whose worker died is replaced before the remaining runs are given up
+MAX_POOL_RESTARTS = 3
+
+
+class _WorkerSlots:
+    """
+    The pool's request semaphore as seen by one worker.
+
+    It counts the slots the worker holds, so that slots still held when a run
+    ends (e.g. by requests abandoned when the run failed) can be given back
+    before the worker takes its next run.
+    """
+
+    def __init__(self, semaphore):
+        self._semaphore = semaphore
+        self._held = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, block: bool = True, timeout: Optional[float] = None) -> bool:
+        acquired = self._semaphore.acquire(block, timeout)
+        if acquired:
+            with self._lock:
+                self._held += 1
+        return acquired
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._held:
+                # Already given back by release_all
+                return
+            self._held -= 1
+        self._semaphore.release()
+
+    def release_all(self) -> int:
+        """Give back every slot still held; returns how many there were."""
+        with self._lock:
+            held, self._held = self._held, 0
+        for _ in range(held):
+            self._semaphore.release()
+        return held
+
+
+# Semaphore shared by every worker of the pool, set by _init_worker
+_shared_slots: Optional[_WorkerSlots] = None
+
+
+def _init_worker(shared_slots, log_prefix: Optional[str]) -> None:
+    global _shared_slots
+    _shared_slots = _WorkerSlots(shared_slots)
+    if log_prefix:
+        # One log per worker, since the records of parallel conclaves would interleave in a shared file
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            handlers=[logging.FileHandler(f"{log_prefix}_worker{os.getpid()}.log")],
+            force=True
+        )
+
+
+def shared_slots():
+    """The cross-process request semaphore of the current ensemble worker, if any."""
+    return _shared_slots
+
+
+def _run_in_worker(run_fn: Callable[[int, Dict], Dict], seed: int, config: Dict) -> Dict:
+    """Run one conclave in a pool worker, with its printouts silenced and its request slots given back."""
+    try:
+        # The per-round printouts of parallel runs would interleave; the worker logs keep them
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return run_fn(seed, config)
+    finally:
+        leaked = _shared_slots.release_all() if _shared_slots is not None else 0
+        if leaked:
+            logger.warning(f"Conclave with seed {seed} left {leaked} request slots held; gave them back")
+
+
+def play_conclave(env: ConclaveEnv, mode: str = "discussion", max_ballots: int = DEFAULT_MAX_BALLOTS,
+                  num_speakers: int = 5, vote_batch_size: Optional[int] = None, pipeline: bool = False,
+                  fused: bool = False, budget: Optional[Budget] = None) -> None:
+    """
+    Run ballots, preceded by a discussion round in discussion mode, until a winner or max_ballots.
+
+    With pipeline, non-speakers vote while the speeches are generated (see
+    ConclaveEnv.run_pipelined_round). With fused, speakers are selected by
+    urgency, polled together with a provisional vote (see
+    ConclaveEnv.run_fused_round). With a budget, every round is planned by it
+    and the conclave ends without a winner when the budget is used up.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown ensemble mode {mode!r}, expected one of {MODES}")
+    # Speakers are picked at random unless a sampler makes urgency polling affordable
+    random_selection = env.urgency_sampler is None
+    while env.winner is None and env.votingRound < max_ballots:
+        speakers = num_speakers if mode == "discussion" else 0
+        if budget is not None:
+            plan = budget.plan_round(env, speakers, polls_urgency=fused or not random_selection)
+            if not plan.proceed:
+                budget.stop(env, plan)
+                return
+            speakers = plan.num_speakers
+        if speakers and fused:
+            env.run_fused_round(num_speakers=speakers, batch_size=vote_batch_size)
+            continue
+        if speakers and pipeline:
+            env.run_pipelined_round(num_speakers=speakers, random_selection=random_selection,
+                                    batch_size=vote_batch_size)
+            continue
+        if speakers:
+            env.run_discussion_round(num_speakers=speakers, random_selection=random_selection)
+        env.run_voting_round(batch_size=vote_batch_size)
+
+
+def conclave_result(seed: int, env: ConclaveEnv, elapsed: float) -> Dict:
+    """Summarize a finished conclave as one ensemble record."""
+    return {
+        "seed": seed,
+        "winner": env.winner,
+        "winner_name": env.agents[env.winner].name if env.winner is not None else None,
+        "ballots": env.votingRound,
+        "discussion_rounds": env.discussionRound,
+        "trajectory": _encode_ballots(env.votingHistory),
+        # Rounds x electors, -1 where an elector did not vote
+        "ballot_matrix": env.ballots.matrix.tolist(),
+        "token_usage": env.token_usage,
+        # Calls, tokens, cost, retries, errors and latency by call type
+        "call_metrics": env.metrics.summary(),
+        "elapsed": elapsed
+    }
+
+
+def run_conclave(seed: int, config: Dict) -> Dict:
+    """
+    Run one conclave over the cardinal roster and return its ensemble record.
+
+    The seed fixes speaker selection, candidate ordering and the stable prompt
+    prefix. Runs inside a pool worker, where requests draw on the pool's
+    shared in-flight budget.
+    """
+    random.seed(seed)
+    max_in_flight = config["max_in_flight"]
+    env = ConclaveEnv(
+        max_concurrency=max_in_flight,
+        rate_limiter=RateLimiter(max_in_flight, rpm=config.get("rpm"), tpm=config.get("tpm"),
+                                 shared_slots=shared_slots()),
+        prompt_layout=config.get("prompt_layout", "inline"),
+        prompt_seed=seed,
+        discussion_summary_horizon=config.get("discussion_summary_horizon"),
+        prompt_token_budget=config.get("prompt_token_budget"),
+        call_timeout=config.get("call_timeout"),
+        ballot_deadline=config.get("ballot_deadline"),
+        urgency_sampler=UrgencySampler.from_environ(),
+        router=ModelRouter.from_environ(),
+        metrics=CallMetrics.from_environ(),
+        # One event stream and trace per run, so workers never share a file
+        events=EventStream(os.path.join(config["events_dir"], f"seed_{seed}")) if config.get("events_dir") else None,
+        tracer=(Tracer(os.path.join(config["trace_dir"], f"seed_{seed}"), name=f"Conclave seed {seed}")
+                if config.get("trace_dir") else None)
+    )
+    seat_cardinals(env, load_roster(config.get("roster", ROSTER_FILE)))
+
+    start = time.perf_counter()
+    try:
+        play_conclave(env, mode=config.get("mode", "discussion"),
+                      max_ballots=config.get("max_ballots", DEFAULT_MAX_BALLOTS),
+                      num_speakers=config.get("num_speakers", 5),
+                      vote_batch_size=config.get("vote_batch_size"),
+                      pipeline=config.get("pipeline", False),
+                      fused=config.get("fused", False),
+                      budget=Budget(**config["budget"]) if config.get("budget") else None)
+    finally:
+        env.engine.close()
+        if env.events is not None:
+            env.events.close()
+        if env.tracer is not None:
+            env.tracer.close()
+    return conclave_result(seed, env, time.perf_counter() - start)
+
+
+class EnsembleStore:
+    """
+    Append-only store of ensemble results, one JSON line per finished conclave.
+
+    Every record is fsynced as it arrives, so an interrupted ensemble keeps
+    all the runs that completed and can be resumed by seed.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, RESULTS_FILE)
+        self.results: List[Dict] = []
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.results.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-write; that run is lost
+                        logger.warning(f"Ignoring incomplete ensemble result in {self.path}")
+                        break
+
+    def completed_seeds(self) -> set:
+        return {result["seed"] for result in self.results}
+
+    def add(self, result: Dict) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, separators=(",", ":"), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.results.append(result)
+
+    def trajectories(self) -> List[List[Dict[int, int]]]:
+        """Per-run ballot results, as in ConclaveEnv.votingHistory."""
+        return [_decode_ballots(result["trajectory"]) for result in self.results]
+
+    def win_counts(self) -> Counter:
+        return Counter(result["winner"] for result in self.results if result["winner"] is not None)
+
+    def win_probabilities(self) -> Dict[int, float]:
+        """Share of all runs won by each cardinal; runs without a winner count in the denominator."""
+        if not self.results:
+            return {}
+        return {candidate: wins / len(self.results) for candidate, wins in self.win_counts().most_common()}
+
+    def ballot_counts(self) -> Counter:
+        """Number of elected runs by ballots needed."""
+        return Counter(result["ballots"] for result in self.results if result["winner"] is not None)
+
+    def summary(self, top: int = 10) -> str:
+        names = {result["winner"]: result["winner_name"] for result in self.results if result["winner"] is not None}
+        undecided = sum(1 for result in self.results if result["winner"] is None)
+        lines = [f"{len(self.results)} conclaves, {undecided} without a winner"]
+        for candidate, probability in list(self.win_probabilities().items())[:top]:
+            lines.append(f"Cardinal {candidate} - {names[candidate]}: {probability:.1%}")
+        ballots = sorted(self.ballot_counts().items())
+        if ballots:
+            lines.append("Ballots to election: " + ", ".join(f"{n}: {count}" for n, count in ballots))
+        # Records written before call metrics were kept have none
+        cost = sum(totals["cost"] for result in self.results for totals in result.get("call_metrics", {}).values())
+        if cost:
+            lines.append(f"Estimated cost: ${cost:.4f} (${cost / len(self.results):.4f} per conclave)")
+        return "\n".join(lines)
+
+
+def run_ensemble(store: EnsembleStore, seeds: Iterable[int], config: Dict, workers: int,
+                 run_fn: Callable[[int, Dict], Dict] = run_conclave, log_prefix: Optional[str] = None,
+                 on_result: Optional[Callable[[Dict], None]] = None) -> int:
+    """
+    Run one conclave per seed across a process pool and stream results into the store.
+
+    Seeds already in the store are skipped. All workers share
+    config["max_in_flight"] request slots. A run that fails is logged and left
+    out of the store, so it is retried when the ensemble is resumed. If a
+    worker dies, the runs it took down with the pool are run again in a new
+    pool, up to MAX_POOL_RESTARTS times.
+
+    Returns:
+        The number of runs added to the store
+    """
+    done = store.completed_seeds()
+    pending = [seed for seed in seeds if seed not in done]
+    if not pending:
+        return 0
+
+    context = multiprocessing.get_context()
+    added = 0
+    for restart in range(MAX_POOL_RESTARTS + 1):
+        # A dead worker takes the slots it held with it, so every pool gets a fresh semaphore
+        slots = context.BoundedSemaphore(config["max_in_flight"])
+        interrupted = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=context,
+                                                    initializer=_init_worker, initargs=(slots, log_prefix)) as pool:
+            futures = {pool.submit(_run_in_worker, run_fn, seed, config): seed for seed in pending}
+            for future in concurrent.futures.as_completed(futures):
+                seed = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    interrupted.append(seed)
+                    continue
+                except Exception as e:
+                    logger.error(f"Conclave with seed {seed} failed: {e}")
+                    continue
+                store.add(result)
+                added += 1
+                logger.info(f"Conclave with seed {seed} finished after {result['ballots']} ballots, "
+                            f"winner: {result['winner']} ({len(store.results)} runs stored)")
+                if on_result is not None:
+                    on_result(result)
+        if not interrupted:
+            break
+        pending = sorted(interrupted)
+        if restart == MAX_POOL_RESTARTS:
+            logger.error(f"A worker died; giving up on {len(pending)} conclaves after {restart} pool restarts")
+        else:
+            logger.warning(f"A worker died; running {len(pending)} interrupted conclaves in a new pool")
+    return added
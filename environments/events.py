@@ -0,0 +1,232 @@
+"""
+Structured event stream of a conclave.
+
+Every LLM call, vote, speech, tally and winner is emitted as a typed event.
+Emitting only timestamps the event and puts it on a queue; a dedicated
+writer thread serializes the events in batches to gzip-compressed JSONL.
+Prompts are hashed on the writer thread and stored once in a separate file,
+so call events carry only the prompt hash. The events can be read back with
+read_events or exported to Parquet:
+
+    python -m environments.events events/run1 --parquet events/run1.parquet
+"""
+
+import argparse
+import atexit
+import gzip
+import hashlib
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EVENTS_FILE = "events.jsonl"
+PROMPTS_FILE = "prompts.jsonl"
+
+# Event types
+CALL_STARTED = "call_started"
+CALL_FINISHED = "call_finished"
+BALLOT = "ballot"
+SPEECH = "speech"
+TALLY = "tally"
+WINNER = "winner"
+EVENT_TYPES = (CALL_STARTED, CALL_FINISHED, BALLOT, SPEECH, TALLY, WINNER)
+
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Queue item that stops the writer thread
+_STOP = object()
+
+
+def prompt_hash(prompt) -> str:
+    """Short fingerprint of a prompt, a string or a list of chat messages."""
+    encoded = prompt if isinstance(prompt, str) else json.dumps(prompt, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class EventStream:
+    """
+    Writes events to <directory>/events.jsonl(.gz) from a background thread.
+
+    Args:
+        directory: Directory of the event and prompt files; an existing stream is appended to
+        compress: gzip the files
+        batch_size: Most events serialized per write
+        flush_interval: Seconds between flushes of the files while events arrive
+    """
+
+    def __init__(self, directory: str, compress: bool = True, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        os.makedirs(directory, exist_ok=True)
+        suffix = ".gz" if compress else ""
+        self.directory = directory
+        self.events_path = os.path.join(directory, EVENTS_FILE + suffix)
+        self.prompts_path = os.path.join(directory, PROMPTS_FILE + suffix)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {"events": 0, "prompts": 0, "batches": 0}
+        self._queue = queue.SimpleQueue()
+        self._call_ids = itertools.count()
+        self._seen_prompts = set(_read_prompts(self.prompts_path)) if os.path.exists(self.prompts_path) else set()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="conclave-events", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_environ(cls) -> Optional["EventStream"]:
+        """Build a stream from CONCLAVE_EVENTS (directory), or None if it is unset."""
+        directory = os.environ.get("CONCLAVE_EVENTS")
+        return cls(directory) if directory else None
+
+    def emit(self, event_type: str, **fields) -> None:
+        """Queue an event; never blocks on I/O."""
+        fields["type"] = event_type
+        fields["ts"] = time.time()
+        self._queue.put(fields)
+
+    def next_call_id(self) -> int:
+        """Id pairing a call_started event with its call_finished event."""
+        return next(self._call_ids)
+
+    def close(self) -> None:
+        """Write the remaining events and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self) -> None:
+        with _open(self.events_path, "a") as events, _open(self.prompts_path, "a") as prompts:
+            last_flush = time.monotonic()
+            stopping = False
+            while not stopping:
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    events.flush()
+                    prompts.flush()
+                    last_flush = time.monotonic()
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if any(event is _STOP for event in batch):
+                    batch = batch[:next(i for i, event in enumerate(batch) if event is _STOP)]
+                    stopping = True
+                try:
+                    self._write_batch(batch, events, prompts)
+                except Exception as e:
+                    # Losing events must never take the conclave down with it
+                    logger.error(f"Could not write {len(batch)} events to {self.events_path}: {e}")
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    events.flush()
+                    prompts.flush()
+                    last_flush = time.monotonic()
+
+    def _write_batch(self, batch: List[Dict], events, prompts) -> None:
+        lines = []
+        prompt_lines = []
+        for event in batch:
+            prompt = event.pop("prompt", None)
+            if prompt is not None:
+                digest = prompt_hash(prompt)
+                event["prompt_hash"] = digest
+                if digest not in self._seen_prompts:
+                    self._seen_prompts.add(digest)
+                    prompt_lines.append(json.dumps({"hash": digest, "prompt": prompt}, ensure_ascii=False))
+            lines.append(json.dumps(event, separators=(",", ":"), ensure_ascii=False))
+        if prompt_lines:
+            prompts.write("\n".join(prompt_lines) + "\n")
+        if lines:
+            events.write("\n".join(lines) + "\n")
+        self.stats["events"] += len(lines)
+        self.stats["prompts"] += len(prompt_lines)
+        self.stats["batches"] += 1
+
+
+def _existing(directory: str, name: str) -> str:
+    for path in (os.path.join(directory, name + ".gz"), os.path.join(directory, name)):
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No {name} in {directory}")
+
+
+def _read_lines(path: str) -> Iterator[Dict]:
+    with _open(path, "r") as f:
+        try:
+            for line in f:
+                yield json.loads(line)
+        except (json.JSONDecodeError, EOFError, gzip.BadGzipFile):
+            # A run that died mid-write leaves a torn final line or gzip member
+            logger.warning(f"Stopped reading {path} at an incomplete record")
+
+
+def _read_prompts(path: str) -> Dict[str, object]:
+    return {entry["hash"]: entry["prompt"] for entry in _read_lines(path)}
+
+
+def read_events(directory: str, event_type: Optional[str] = None) -> Iterator[Dict]:
+    """Events of a stream in the order they were emitted, optionally of one type."""
+    for event in _read_lines(_existing(directory, EVENTS_FILE)):
+        if event_type is None or event["type"] == event_type:
+            yield event
+
+
+def read_prompts(directory: str) -> Dict[str, object]:
+    """Prompts of a stream by hash."""
+    return _read_prompts(_existing(directory, PROMPTS_FILE))
+
+
+def export_parquet(directory: str, path: Optional[str] = None) -> str:
+    """
+    Write the events of a stream to one Parquet file (needs pyarrow or fastparquet).
+
+    Nested fields such as tally counts are stored as JSON strings.
+    """
+    import pandas as pd
+
+    events = [
+        {key: json.dumps(value) if isinstance(value, (dict, list)) else value for key, value in event.items()}
+        for event in read_events(directory)
+    ]
+    path = path or os.path.join(directory, "events.parquet")
+    pd.DataFrame(events).to_parquet(path, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize or export a conclave event stream")
+    parser.add_argument("directory", help="Event stream directory (CONCLAVE_EVENTS of the run)")
+    parser.add_argument("--parquet", nargs="?", const="", default=None,
+                        help="Export to Parquet (default <directory>/events.parquet)")
+    args = parser.parse_args()
+
+    counts = {}
+    for event in read_events(args.directory):
+        counts[event["type"]] = counts.get(event["type"], 0) + 1
+    for event_type, count in sorted(counts.items()):
+        print(f"{event_type}: {count}")
+    if args.parquet is not None:
+        print(f"Wrote {export_parquet(args.directory, args.parquet or None)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Live progress feed of a conclave over server-sent events.
+
+ProgressFeed runs a small HTTP server on a background thread. Observers
+connect to /events (an EventSource stream) and receive round progress,
+votes, tallies and speeches as they happen, including the text of each
+speech while it is being generated; / serves a page that displays them.
+New observers first receive the recent history, so they can join mid-round.
+
+    CONCLAVE_FEED_PORT=8765 uv run discussion_round.py
+    curl -N http://127.0.0.1:8765/events
+    curl http://127.0.0.1:8765/metrics
+"""
+
+import collections
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Feed-only event types; ballot, speech, tally and winner events of the event stream are also published
+DISCUSSION_STARTED = "discussion_started"
+SPEECH_STARTED = "speech_started"
+SPEECH_DELTA = "speech_delta"
+FEED_EVENTS = {"ballot", "speech", "tally", "winner", DISCUSSION_STARTED, SPEECH_STARTED, SPEECH_DELTA}
+
+DEFAULT_HISTORY = 1000
+KEEPALIVE_INTERVAL = 15.0
+
+_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Conclave</title>
+<style>body{font-family:sans-serif;max-width:60em;margin:auto}pre{white-space:pre-wrap}</style></head>
+<body><h1>Conclave</h1><div id="status"></div><div id="log"></div>
+<script>
+const log = document.getElementById("log"), status = document.getElementById("status"), speeches = {};
+const source = new EventSource("/events");
+function add(text) { const p = document.createElement("pre"); p.textContent = text; log.prepend(p); return p; }
+source.addEventListener("discussion_started", e => { const d = JSON.parse(e.data);
+  status.textContent = `Discussion round ${d.round}: speakers ${d.speakers.join(", ")}`; });
+source.addEventListener("speech_started", e => { const d = JSON.parse(e.data);
+  speeches[d.agent_id] = add(`Cardinal ${d.agent_id} (round ${d.round}):\\n`); });
+source.addEventListener("speech_delta", e => { const d = JSON.parse(e.data);
+  (speeches[d.agent_id] || (speeches[d.agent_id] = add(`Cardinal ${d.agent_id}:\\n`))).textContent += d.text; });
+source.addEventListener("tally", e => { const d = JSON.parse(e.data);
+  const top = Object.entries(d.counts).sort((a, b) => b[1] - a[1]).slice(0, 5);
+  add(`Ballot ${d.round}: ` + top.map(([c, v]) => `Cardinal ${c}: ${v}`).join(", ")); });
+source.addEventListener("winner", e => { const d = JSON.parse(e.data); status.textContent = `Cardinal ${d.candidate} is elected`; });
+</script></body></html>
+"""
+
+
+class ProgressFeed:
+    """
+    Publishes conclave events to server-sent-event subscribers.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on; 0 picks a free port (see .port)
+        history: Number of recent events replayed to new subscribers
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, history: int = DEFAULT_HISTORY):
+        self._history: Deque[str] = collections.deque(maxlen=history)
+        self._subscribers: List[queue.SimpleQueue] = []
+        self._lock = threading.Lock()
+        # Optional CallMetrics served in the Prometheus text format at /metrics
+        self.metrics = None
+        self._server = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="conclave-feed", daemon=True)
+        self._thread.start()
+        logger.info(f"Progress feed at http://{self.host}:{self.port}/")
+
+    @classmethod
+    def from_environ(cls) -> Optional["ProgressFeed"]:
+        """Build a feed listening on CONCLAVE_FEED_PORT (and CONCLAVE_FEED_HOST), or None if unset."""
+        port = os.environ.get("CONCLAVE_FEED_PORT")
+        if not port:
+            return None
+        return cls(host=os.environ.get("CONCLAVE_FEED_HOST", "127.0.0.1"), port=int(port))
+
+    def publish(self, event_type: str, **fields) -> None:
+        """Send an event to every subscriber; never blocks on a slow one."""
+        fields["ts"] = time.time()
+        message = f"event: {event_type}\ndata: {json.dumps(fields, ensure_ascii=False)}\n\n"
+        with self._lock:
+            self._history.append(message)
+            for subscriber in self._subscribers:
+                subscriber.put(message)
+
+    def subscribe(self) -> queue.SimpleQueue:
+        subscriber = queue.SimpleQueue()
+        with self._lock:
+            for message in self._history:
+                subscriber.put(message)
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.SimpleQueue) -> None:
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    @property
+    def num_subscribers(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def close(self) -> None:
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.put(None)
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _handler_for(feed: ProgressFeed):
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/events":
+                self._stream()
+            elif self.path == "/metrics" and feed.metrics is not None:
+                body = feed.metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif self.path == "/":
+                body = _PAGE.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self.send_error(404)
+
+        def _stream(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            subscriber = feed.subscribe()
+            try:
+                while True:
+                    try:
+                        message = subscriber.get(timeout=KEEPALIVE_INTERVAL)
+                    except queue.Empty:
+                        message = ": keepalive\n\n"
+                    if message is None:
+                        break
+                    self.wfile.write(message.encode("utf-8"))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                feed.unsubscribe(subscriber)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return FeedHandler
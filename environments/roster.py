@@ -0,0 +1,47 @@
+"""
+Roster of cardinal electors.
+
+The roster is read with the csv module and kept for the life of the process,
+so entry scripts and ensemble workers build their agents without importing
+pandas and without parsing the file more than once.
+"""
+
+import csv
+import functools
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+ROSTER_FILE = "cardinal_electors_2025.csv"
+
+
+class Cardinal(NamedTuple):
+    agent_id: int
+    name: str
+    background: str
+
+
+@functools.lru_cache(maxsize=None)
+def _read_roster(path: str) -> Tuple[Cardinal, ...]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return tuple(Cardinal(agent_id, row["Name"], row["Background"])
+                     for agent_id, row in enumerate(csv.DictReader(f)))
+
+
+def load_roster(path: str = ROSTER_FILE, limit: Optional[int] = None) -> List[Cardinal]:
+    """The cardinals of a roster CSV in file order, optionally only the first `limit`."""
+    return list(_read_roster(path)[:limit])
+
+
+def seat_cardinals(env, roster: List[Cardinal], agent_class: Optional[Callable] = None, **agent_kwargs) -> None:
+    """
+    Add an agent for every cardinal of the roster to env.
+
+    Args:
+        agent_class: Agent class to instantiate; defaults to agents.base.Agent
+        agent_kwargs: Extra keyword arguments of every agent
+    """
+    if agent_class is None:
+        from agents.base import Agent as agent_class
+    env.agents.extend(agent_class(agent_id=cardinal.agent_id, name=cardinal.name, background=cardinal.background,
+                                  env=env, **agent_kwargs)
+                      for cardinal in roster)
+    env.num_agents = len(env.agents)
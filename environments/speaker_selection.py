@@ -0,0 +1,128 @@
+"""
+Sampled urgency polling for urgency-based speaker selection.
+
+Choosing a handful of speakers by asking all cardinals for their speaking
+urgency costs one request per cardinal per discussion round. An
+UrgencySampler polls only a subset of k cardinals each round and lets the
+other cardinals compete with the score they gave when last polled, decayed
+by the number of rounds since. Subsets are drawn either at random or
+targeted at cardinals whose vote just changed and the front-runners of the
+last ballot.
+"""
+
+import logging
+import os
+import random
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("random", "targeted")
+
+
+class UrgencySampler:
+    """
+    Polls the speaking urgency of k cardinals per discussion round.
+
+    Args:
+        strategy: "random" polls k cardinals chosen uniformly; "targeted" polls
+                  the front-runners of the last ballot and cardinals whose vote
+                  changed in it first, filling up with random cardinals
+        sample_size: Number of cardinals polled per round (k)
+        decay: Factor applied per round to a score carried over from an
+               earlier poll; 0 only considers cardinals polled this round
+        front_runners: Number of leading candidates of the last ballot the
+                       targeted strategy polls
+    """
+
+    def __init__(self, strategy: str = "random", sample_size: int = 20, decay: float = 0.8, front_runners: int = 3):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown urgency sampling strategy {strategy!r}, expected one of {STRATEGIES}")
+        if sample_size < 1:
+            raise ValueError("sample_size must be at least 1")
+        self.strategy = strategy
+        self.sample_size = sample_size
+        self.decay = decay
+        self.front_runners = front_runners
+        # Last polled score of each agent and the discussion round it was polled in
+        self._scores: Dict[int, Dict] = {}
+        self.stats = {"rounds": 0, "polled": 0, "saved": 0, "speakers_from_poll": 0, "speakers_from_memory": 0}
+
+    @classmethod
+    def from_environ(cls) -> Optional["UrgencySampler"]:
+        """
+        Build a sampler from CONCLAVE_URGENCY_SAMPLING (strategy), CONCLAVE_URGENCY_SAMPLE_SIZE
+        and CONCLAVE_URGENCY_DECAY. Returns None when no strategy is set.
+        """
+        strategy = os.environ.get("CONCLAVE_URGENCY_SAMPLING")
+        if not strategy:
+            return None
+        sample_size = os.environ.get("CONCLAVE_URGENCY_SAMPLE_SIZE")
+        decay = os.environ.get("CONCLAVE_URGENCY_DECAY")
+        return cls(strategy, sample_size=int(sample_size) if sample_size else 20,
+                   decay=float(decay) if decay else 0.8)
+
+    def select_agents_to_poll(self, env) -> List:
+        """Choose the agents whose urgency is polled this round."""
+        agents = list(env.agents)
+        if self.sample_size >= len(agents):
+            return agents
+        if self.strategy == "random":
+            return random.sample(agents, self.sample_size)
+
+        chosen: List[int] = []
+        if env.votingHistory:
+            last_ballot = sorted(env.votingHistory[-1].items(), key=lambda x: x[1], reverse=True)
+            chosen.extend(candidate for candidate, _ in last_ballot[:self.front_runners])
+        chosen.extend(int(agent_id) for agent_id in env.ballots.switchers())
+        chosen = list(dict.fromkeys(agent_id for agent_id in chosen if 0 <= agent_id < len(agents)))
+        if len(chosen) > self.sample_size:
+            chosen = random.sample(chosen, self.sample_size)
+        taken = set(chosen)
+        rest = [agent.agent_id for agent in agents if agent.agent_id not in taken]
+        chosen.extend(random.sample(rest, self.sample_size - len(chosen)))
+        return [env.agents[agent_id] for agent_id in chosen]
+
+    async def poll_async(self, env) -> List[Dict]:
+        """
+        Poll a sample of agents and return urgency results for every eligible agent.
+
+        Agents polled in an earlier round are included with their last score
+        multiplied by decay once per round since.
+        """
+        polled = self.select_agents_to_poll(env)
+        results = await env.engine.gather([agent.speaking_urgency_async() for agent in polled],
+                                          desc="Evaluating Sampled Speaking Urgency")
+        round_index = env.discussionRound
+        for result in results:
+            if result:
+                self._scores[result['agent_id']] = dict(result, round=round_index)
+
+        scores = []
+        for agent_id, entry in self._scores.items():
+            age = round_index - entry['round']
+            if age and not self.decay:
+                continue
+            score = dict(entry, fresh=age == 0)
+            score['urgency_score'] = round(entry['urgency_score'] * self.decay ** age, 1)
+            scores.append(score)
+
+        self.stats["rounds"] += 1
+        self.stats["polled"] += len(polled)
+        self.stats["saved"] += len(env.agents) - len(polled)
+        logger.info(f"Polled the speaking urgency of {len(polled)} of {len(env.agents)} cardinals "
+                    f"({self.strategy} sampling), {len(scores) - len(polled)} carried over from earlier rounds")
+        return scores
+
+    def record_selection(self, env, selected_ids: List[int], scores: List[Dict]) -> None:
+        """Log how the selected speakers compare with the scores they were chosen from."""
+        by_agent = {score['agent_id']: score for score in scores}
+        selected = [by_agent[agent_id] for agent_id in selected_ids if agent_id in by_agent]
+        fresh = sum(1 for score in selected if score.get('fresh'))
+        self.stats["speakers_from_poll"] += fresh
+        self.stats["speakers_from_memory"] += len(selected) - fresh
+        mean_selected = sum(score['urgency_score'] for score in selected) / len(selected) if selected else 0.0
+        mean_all = sum(score['urgency_score'] for score in scores) / len(scores) if scores else 0.0
+        logger.info(f"Selected {len(selected)} speakers ({fresh} freshly polled) with mean urgency "
+                    f"{mean_selected:.1f} against {mean_all:.1f} over {len(scores)} scored cardinals; "
+                    f"{self.stats['saved']} urgency calls saved so far")
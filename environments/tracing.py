@@ -0,0 +1,249 @@
+"""
+Hierarchical tracing of rounds, phases and LLM calls.
+
+Tracer writes spans as Chrome trace events (the JSON array format) that
+chrome://tracing and https://ui.perfetto.dev open directly. Rounds, phases
+(urgency polling, speeches, vote collection, re-asks, summaries) and tallies
+are drawn on their own tracks, and every call on the track of the cardinal
+who made it, split into prompt building, the wait for a request slot, each
+network attempt and retry backoff. The straggler call that gates each phase
+can also be printed:
+
+    python -m environments.tracing traces/run1
+"""
+
+import argparse
+import atexit
+import contextlib
+import contextvars
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = "trace.json"
+
+# Tracks of spans not made by a cardinal
+ROUNDS_LANE = "Rounds"
+PHASES_LANE = "Phases"
+
+# Span categories
+ROUND = "round"
+PHASE = "phase"
+TALLY = "tally"
+CALL = "call"
+PROMPT = "prompt"
+QUEUE = "queue"
+REQUEST = "request"
+BACKOFF = "backoff"
+
+
+class _Active(NamedTuple):
+    tracer: "Tracer"
+    span_id: int
+    tid: int
+
+
+# Innermost open span of the running task; asyncio tasks inherit it from the code that created them
+_current: contextvars.ContextVar[Optional[_Active]] = contextvars.ContextVar("conclave_span", default=None)
+
+
+class Tracer:
+    """
+    Writes spans to <directory>/trace.json as Chrome trace events.
+
+    A span opened with a lane goes on that lane's track, or on an extra track
+    of the lane while another span occupies it, so concurrent spans never
+    overlap on one track; a span without a lane goes on its parent's track.
+    Events are written as spans end, one per line, and flushed after every
+    round; the closing bracket the format makes optional is written on close,
+    so an interrupted run still leaves a readable trace.
+
+    Args:
+        directory: Directory of the trace file; an existing trace is overwritten
+        name: Process name shown by the trace viewer
+    """
+
+    def __init__(self, directory: str, name: str = "Conclave"):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, TRACE_FILE)
+        self.pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._span_ids = itertools.count(1)
+        self._tids: Dict[tuple, int] = {}
+        self._busy: Dict[str, List[bool]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._separator = "[\n"
+        self._closed = False
+        self._write({"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0, "args": {"name": name}})
+        atexit.register(self.close)
+
+    @classmethod
+    def from_environ(cls) -> Optional["Tracer"]:
+        """Build a tracer writing to CONCLAVE_TRACE (directory), or None if it is unset."""
+        directory = os.environ.get("CONCLAVE_TRACE")
+        return cls(directory) if directory else None
+
+    @contextlib.contextmanager
+    def span(self, name: str, cat: str, lane: Optional[str] = None, **args) -> Iterator[None]:
+        """Trace the enclosed block as a span nested in the innermost open span."""
+        parent = _current.get()
+        if parent is not None and parent.tracer is not self:
+            parent = None
+        slot = None
+        if lane is None and parent is not None:
+            tid = parent.tid
+        else:
+            slot = self._acquire(lane or ROUNDS_LANE)
+            tid = slot[1]
+        span_id = next(self._span_ids)
+        token = _current.set(_Active(self, span_id, tid))
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            _current.reset(token)
+            if slot is not None:
+                self._release(lane or ROUNDS_LANE, slot[0])
+            self._complete(name, cat, start, end, tid, span_id, parent.span_id if parent else None, args)
+
+    def record(self, name: str, cat: str, start: float, end: float, **args) -> None:
+        """Record a span that already ended (perf_counter times) inside the innermost open span."""
+        parent = _current.get()
+        if parent is None or parent.tracer is not self:
+            return
+        self._complete(name, cat, start, end, parent.tid, next(self._span_ids), parent.span_id, args)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._file.write("\n]\n")
+            self._file.close()
+        atexit.unregister(self.close)
+
+    def _acquire(self, lane: str) -> tuple:
+        with self._lock:
+            busy = self._busy[lane]
+            index = busy.index(False) if False in busy else len(busy)
+            if index == len(busy):
+                busy.append(True)
+            busy[index] = True
+            key = (lane, index)
+            tid = self._tids.get(key)
+            if tid is None:
+                tid = self._tids[key] = len(self._tids) + 1
+                track = lane if index == 0 else f"{lane} ({index + 1})"
+                self._write({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": track}})
+                self._write({"name": "thread_sort_index", "ph": "M", "pid": self.pid, "tid": tid,
+                             "args": {"sort_index": tid}})
+        return index, tid
+
+    def _release(self, lane: str, index: int) -> None:
+        with self._lock:
+            self._busy[lane][index] = False
+
+    def _complete(self, name: str, cat: str, start: float, end: float, tid: int, span_id: int,
+                  parent_id: Optional[int], args: Dict) -> None:
+        args["span_id"] = span_id
+        if parent_id is not None:
+            args["parent_id"] = parent_id
+        with self._lock:
+            self._write({"name": name, "cat": cat, "ph": "X", "pid": self.pid, "tid": tid,
+                         "ts": round((start - self._origin) * 1e6, 1), "dur": round((end - start) * 1e6, 1),
+                         "args": args})
+            if cat == ROUND:
+                self._file.flush()
+
+    def _write(self, event: Dict) -> None:
+        # Called with the lock held, or before the tracer is shared
+        if self._closed:
+            return
+        try:
+            self._file.write(self._separator + json.dumps(event, ensure_ascii=False, default=str))
+            self._separator = ",\n"
+        except Exception as e:
+            # Losing spans must never take the conclave down with it
+            logger.error(f"Could not write a span to {self.path}: {e}")
+
+
+def read_trace(directory: str) -> List[Dict]:
+    """Spans of a trace, including one still being written or cut off by an interrupted run."""
+    spans = []
+    with open(os.path.join(directory, TRACE_FILE), encoding="utf-8") as f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            if line in ("", "[", "]"):
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                # The last event of a trace cut off mid-write
+                break
+            if event.get("ph") == "X":
+                spans.append(event)
+    return spans
+
+
+def critical_path(spans: List[Dict]) -> str:
+    """
+    Rounds with the duration of their phases and tallies, and the straggler of
+    each phase: the call that finished last, split into queue, network and backoff time.
+    """
+    children = defaultdict(list)
+    for span in spans:
+        children[span["args"].get("parent_id")].append(span)
+
+    def descendants(span: Dict) -> Iterator[Dict]:
+        for child in children[span["args"]["span_id"]]:
+            yield child
+            yield from descendants(child)
+
+    lines = []
+
+    def describe(span: Dict, depth: int) -> None:
+        label = span["name"] + (f" {span['args']['round']}" if "round" in span["args"] else "")
+        lines.append(f"{'  ' * depth}{label}: {span['dur'] / 1e6:.2f}s")
+        if span["cat"] == PHASE:
+            calls = [child for child in descendants(span) if child["cat"] == CALL]
+            if calls:
+                straggler = max(calls, key=lambda call: call["ts"] + call["dur"])
+                parts = defaultdict(float)
+                for child in descendants(straggler):
+                    parts[child["cat"]] += child["dur"] / 1e6
+                agent = straggler["args"].get("agent_id")
+                lines.append(f"{'  ' * (depth + 1)}{len(calls)} calls, straggler: {straggler['name']} of "
+                             f"{'the secretary' if agent is not None and agent < 0 else f'Cardinal {agent}'} "
+                             f"{straggler['dur'] / 1e6:.2f}s (queue {parts[QUEUE]:.2f}s, network "
+                             f"{parts[REQUEST]:.2f}s, backoff {parts[BACKOFF]:.2f}s)")
+        for child in sorted(children[span["args"]["span_id"]], key=lambda child: child["ts"]):
+            if child["cat"] in (ROUND, PHASE, TALLY):
+                describe(child, depth + 1)
+
+    for span in sorted(children[None], key=lambda span: span["ts"]):
+        if span["cat"] in (ROUND, PHASE, TALLY):
+            describe(span, 0)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the critical path of each round of a conclave trace")
+    parser.add_argument("directory", help="Trace directory (CONCLAVE_TRACE of the run)")
+    args = parser.parse_args()
+    print(critical_path(read_trace(args.directory)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+READ_WRITE = "read-write"
+READ_ONLY = "read-only"
+BYPASS = "bypass"
+MODES = (READ_WRITE, READ_ONLY, BYPASS)
+
+# Request fields that determine the response; everything else is ignored
+KEY_FIELDS = ("model", "messages", "tools", "tool_choice", "temperature", "seed")
+
+DEFAULT_PATH = "cache/responses.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Eviction frees space down to this share of max_bytes, so it runs once per many puts
+LOW_WATER_MARK = 0.9
+# Least recently used entries read per eviction query
+EVICTION_BATCH = 256
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of LLM responses.
+
+    Entries are keyed on a hash of the request fields that determine the
+    response, stored zlib-compressed in SQLite, and evicted least recently
+    used first once the total payload size exceeds max_bytes, down to
+    LOW_WATER_MARK of it.
+
+    Modes:
+        read-write: serve hits and store misses
+        read-only: serve hits but never write
+        bypass: behave as if the cache did not exist
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_bytes: int = DEFAULT_MAX_BYTES, mode: str = READ_WRITE):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}, expected one of {MODES}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+        if mode != BYPASS:
+            self._open()
+
+    @classmethod
+    def from_environ(cls) -> Optional["ResponseCache"]:
+        """
+        Build a cache from CONCLAVE_CACHE_MODE, CONCLAVE_CACHE_PATH and
+        CONCLAVE_CACHE_MAX_MB. Returns None when no mode is set.
+        """
+        mode = os.environ.get("CONCLAVE_CACHE_MODE")
+        if not mode:
+            return None
+        path = os.environ.get("CONCLAVE_CACHE_PATH", DEFAULT_PATH)
+        max_mb = os.environ.get("CONCLAVE_CACHE_MAX_MB")
+        max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+        return cls(path=path, max_bytes=max_bytes, mode=mode)
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(request_params: Dict) -> str:
+        """Hash the response-determining fields of a chat completion request."""
+        material = {field: request_params.get(field) for field in KEY_FIELDS}
+        encoded = json.dumps(material, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        if self.mode == BYPASS:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.mode == READ_WRITE:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key: str, value: Dict) -> None:
+        if self.mode != READ_WRITE:
+            return
+        blob = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time())
+            )
+            self._total_bytes += len(blob) - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries, a batch at a time, until the cache is down to its low-water mark."""
+        low_water = int(self.max_bytes * LOW_WATER_MARK)
+        evicted = 0
+        while self._total_bytes > low_water:
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC LIMIT ?",
+                                      (EVICTION_BATCH,)).fetchall()
+            if not rows:
+                break
+            doomed = []
+            for key, size in rows:
+                if self._total_bytes <= low_water:
+                    break
+                doomed.append((key,))
+                self._total_bytes -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            evicted += len(doomed)
+        self.evictions += evicted
+        logger.info(f"Evicted {evicted} cached responses ({self._total_bytes} bytes remain)")
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes
+        }
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,91 @@
+import asyncio
+import functools
+import importlib.util
+import os
+import threading
+import weakref
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Connection pool settings shared by every agent in the process
+MAX_CONNECTIONS = 512
+MAX_KEEPALIVE_CONNECTIONS = 256
+KEEPALIVE_EXPIRY = 60.0
+
+# One client per (event loop, base_url, api_key). httpx async connections are
+# bound to the loop that opened them, so clients are never shared across loops.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (httpx[http2])."""
+    return importlib.util.find_spec("h2") is not None
+
+
+@functools.lru_cache(maxsize=None)
+def load_dotenv_once() -> None:
+    """Load .env into the environment the first time it is needed, not at import time."""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def get_base_url() -> str:
+    load_dotenv_once()
+    return os.environ.get("OPENROUTER_BASE_URL", OPENROUTER_BASE_URL)
+
+
+def get_api_key() -> str:
+    load_dotenv_once()
+    api_key = os.environ.get("OPENROUTER_API_KEY")
+    if not api_key:
+        raise ValueError("OpenRouter API key not found")
+    return api_key
+
+
+def _build_client(base_url: str, api_key: str) -> "AsyncOpenAI":
+    # httpx and openai take a noticeable share of startup, so they load with the first client
+    import httpx
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(
+        http2=http2_available(),
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(120.0, connect=10.0)
+    )
+    # Retries are left to Agent._send_request so that every 429 reaches the shared rate limiter
+    return AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client, max_retries=0)
+
+
+def get_client(base_url: Optional[str] = None, api_key: Optional[str] = None) -> "AsyncOpenAI":
+    """
+    Return the shared client for the running event loop, creating it on first use.
+
+    Must be called from inside a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    key = (base_url or get_base_url(), api_key or get_api_key())
+    with _lock:
+        loop_clients = _clients.setdefault(loop, {})
+        client = loop_clients.get(key)
+        if client is None:
+            client = _build_client(*key)
+            loop_clients[key] = client
+        return client
+
+
+async def aclose_clients() -> None:
+    """Close the clients owned by the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        loop_clients = _clients.pop(loop, {})
+    for client in loop_clients.values():
+        await client.close()
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, AsyncContextManager, Awaitable, Iterable, List, Optional
+from tqdm import tqdm
+from llm.rate_limit import RateLimiter
+
+DEFAULT_MAX_CONCURRENCY = 256
+
+
+class AsyncEngine:
+    """
+    Runs agent coroutines on a single long-lived event loop.
+
+    All LLM requests issued through the engine share one rate limiter, so a
+    full round of calls is bounded by provider latency and rate limits rather
+    than by a thread pool size. The synchronous entry points of Agent and ConclaveEnv call
+    run() to drive their async counterparts to completion.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, rate_limiter: Optional[RateLimiter] = None):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter or RateLimiter(max_concurrency=max_concurrency)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop
+
+    def run(self, coro: Awaitable) -> Any:
+        """Run a coroutine to completion from synchronous code."""
+        return self.loop.run_until_complete(coro)
+
+    def limit(self, estimated_tokens: int = 0) -> AsyncContextManager[None]:
+        """
+        Return a context manager that holds one rate-limited request slot.
+
+        Args:
+            estimated_tokens: Prompt plus completion tokens charged to the
+                tokens-per-minute bucket
+        """
+        return self.rate_limiter.slot(estimated_tokens)
+
+    async def gather(self, coros: Iterable[Awaitable], desc: Optional[str] = None) -> List[Any]:
+        """
+        Run coroutines concurrently and return their results in submission order.
+
+        Args:
+            coros: Coroutines to schedule
+            desc: Optional tqdm progress bar description
+        """
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        with tqdm(total=len(tasks), desc=desc) as progress:
+            for task in tasks:
+                task.add_done_callback(lambda _: progress.update(1))
+            return await asyncio.gather(*tasks)
+
+    def close(self) -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            from llm.client import aclose_clients
+            self._loop.run_until_complete(aclose_clients())
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.close()
+        self._loop = None
@@ -0,0 +1,238 @@
+"""
+In-process metrics of every LLM call.
+
+CallMetrics counts calls, tokens, cost, retries and errors, and keeps latency
+histograms, broken down by call type (the forced tool name), round and agent.
+It renders a Prometheus text-format dump and a plain-text end-of-run report.
+"""
+
+import bisect
+import json
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, float("inf"))
+
+# USD per million (input, output, cached input) tokens
+DEFAULT_PRICES = {
+    "openai/gpt-4o-mini": (0.15, 0.60, 0.075),
+    "openai/gpt-4o": (2.50, 10.00, 1.25),
+}
+
+TOKEN_KINDS = ("prompt", "completion", "cached")
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus exposes them."""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+def _usage_tokens(usage) -> Tuple[int, int, int]:
+    if usage is None:
+        return 0, 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", None) or 0) if details else 0
+    return usage.prompt_tokens or 0, usage.completion_tokens or 0, cached
+
+
+class CallMetrics:
+    """
+    Registry of LLM call metrics for one env.
+
+    Args:
+        prices: USD per million (input, output, cached input) tokens by model;
+                models without a price count tokens but no cost
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, ...]]] = None):
+        self.prices = dict(DEFAULT_PRICES if prices is None else prices)
+        self.calls: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.tokens: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.cost: Dict[str, float] = defaultdict(float)
+        self.retries: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.latency: Dict[str, Histogram] = defaultdict(Histogram)
+        self.total_latency: Dict[str, Histogram] = defaultdict(Histogram)
+        # Per round and per agent: calls, tokens by kind and cost
+        self.by_round: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.by_agent: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    @classmethod
+    def from_environ(cls) -> "CallMetrics":
+        """
+        Build a registry with CONCLAVE_MODEL_PRICES, a JSON object (or the path of a JSON
+        file) of model: [input, output, cached input] USD per million tokens, added to the defaults.
+        """
+        spec = os.environ.get("CONCLAVE_MODEL_PRICES")
+        prices = dict(DEFAULT_PRICES)
+        if spec:
+            if os.path.exists(spec):
+                with open(spec, encoding="utf-8") as f:
+                    spec = f.read()
+            prices.update({model: tuple(price) for model, price in json.loads(spec).items()})
+        return cls(prices)
+
+    def call_cost(self, model: str, prompt: int, completion: int, cached: int) -> float:
+        price = self.prices.get(model)
+        if price is None:
+            return 0.0
+        input_price, output_price = price[0], price[1]
+        cached_price = price[2] if len(price) > 2 else input_price
+        return ((prompt - cached) * input_price + cached * cached_price + completion * output_price) / 1e6
+
+    def record_call(self, call_type: Optional[str], model: str, agent_id: int, round_index: int, usage,
+                    latency: float, total_latency: float, source: str = "api") -> None:
+        """
+        Record a completed call.
+
+        Args:
+            latency: Seconds of the successful attempt
+            total_latency: Seconds from the first attempt to the response, including
+                           waits for a request slot and retry backoff
+            source: "api", or "cache"/"replay" for responses that cost nothing
+        """
+        call_type = call_type or "other"
+        self.calls[(call_type, source)] += 1
+        if source != "api":
+            return
+        prompt, completion, cached = _usage_tokens(usage)
+        cost = self.call_cost(model, prompt, completion, cached)
+        for kind, count in zip(TOKEN_KINDS, (prompt, completion, cached)):
+            self.tokens[(call_type, kind)] += count
+        self.cost[call_type] += cost
+        self.latency[call_type].observe(latency)
+        self.total_latency[call_type].observe(total_latency)
+        for breakdown in (self.by_round[round_index], self.by_agent[agent_id]):
+            breakdown["calls"] += 1
+            breakdown["prompt"] += prompt
+            breakdown["completion"] += completion
+            breakdown["cached"] += cached
+            breakdown["cost"] += cost
+            breakdown["latency"] += latency
+
+    def record_retry(self, call_type: Optional[str], reason: str) -> None:
+        self.retries[(call_type or "other", reason)] += 1
+
+    def record_error(self, call_type: Optional[str], error: BaseException) -> None:
+        self.errors[(call_type or "other", type(error).__name__)] += 1
+
+    @property
+    def call_types(self) -> List[str]:
+        return sorted({call_type for call_type, _ in self.calls} | {call_type for call_type, _ in self.errors})
+
+    def total_cost(self) -> float:
+        return sum(self.cost.values())
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per call type totals, e.g. for ensemble records."""
+        return {
+            call_type: {
+                "calls": sum(count for (t, _), count in self.calls.items() if t == call_type),
+                "api_calls": self.calls.get((call_type, "api"), 0),
+                "prompt_tokens": self.tokens.get((call_type, "prompt"), 0),
+                "completion_tokens": self.tokens.get((call_type, "completion"), 0),
+                "cached_tokens": self.tokens.get((call_type, "cached"), 0),
+                "cost": round(self.cost.get(call_type, 0.0), 6),
+                "retries": sum(count for (t, _), count in self.retries.items() if t == call_type),
+                "errors": sum(count for (t, _), count in self.errors.items() if t == call_type),
+                "latency_p50": self.latency[call_type].quantile(0.5) if call_type in self.latency else 0.0,
+                "latency_p99": self.latency[call_type].quantile(0.99) if call_type in self.latency else 0.0,
+            }
+            for call_type in self.call_types
+        }
+
+    def prometheus(self, prefix: str = "conclave") -> str:
+        """The registry in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name: str, kind: str, help_text: str, samples: Iterable[Tuple[str, Dict, float]]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{prefix}_{name}{suffix}{{{label_text}}} {value:g}" if label_text
+                             else f"{prefix}_{name}{suffix} {value:g}")
+
+        def histogram_samples(histograms: Dict[str, Histogram]):
+            for call_type, histogram in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    yield "_bucket", {"call_type": call_type, "le": le}, cumulative
+                yield "_sum", {"call_type": call_type}, histogram.sum
+                yield "_count", {"call_type": call_type}, histogram.count
+
+        family("llm_calls_total", "counter", "LLM calls by call type and response source",
+               (("", {"call_type": t, "source": s}, v) for (t, s), v in sorted(self.calls.items())))
+        family("llm_tokens_total", "counter", "Tokens reported by the provider by call type and kind",
+               (("", {"call_type": t, "kind": k}, v) for (t, k), v in sorted(self.tokens.items())))
+        family("llm_cost_usd_total", "counter", "Estimated cost in USD by call type",
+               (("", {"call_type": t}, v) for t, v in sorted(self.cost.items())))
+        family("llm_retries_total", "counter", "Retried attempts by call type and reason",
+               (("", {"call_type": t, "reason": r}, v) for (t, r), v in sorted(self.retries.items())))
+        family("llm_errors_total", "counter", "Calls that failed for good by call type and error class",
+               (("", {"call_type": t, "error": e}, v) for (t, e), v in sorted(self.errors.items())))
+        family("llm_latency_seconds", "histogram", "Duration of the successful attempt of each call",
+               histogram_samples(self.latency))
+        family("llm_total_latency_seconds", "histogram", "Duration of each call including slot waits and retries",
+               histogram_samples(self.total_latency))
+        family("round_tokens_total", "counter", "Tokens by round and kind",
+               (("", {"round": r, "kind": k}, totals[k]) for r, totals in sorted(self.by_round.items())
+                for k in TOKEN_KINDS))
+        family("agent_tokens_total", "counter", "Tokens by agent and kind",
+               (("", {"agent_id": a, "kind": k}, totals[k]) for a, totals in sorted(self.by_agent.items())
+                for k in TOKEN_KINDS))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+    def report(self, top: int = 5) -> str:
+        """End-of-run report by call type, with the most expensive rounds and agents."""
+        lines = [f"{'call type':<28}{'calls':>7}{'errors':>8}{'retries':>9}{'prompt':>11}{'cached':>10}"
+                 f"{'completion':>12}{'cost $':>10}{'p50 s':>8}{'p99 s':>8}"]
+        for call_type, totals in self.summary().items():
+            lines.append(f"{call_type:<28}{totals['calls']:>7}{totals['errors']:>8}{totals['retries']:>9}"
+                         f"{totals['prompt_tokens']:>11}{totals['cached_tokens']:>10}{totals['completion_tokens']:>12}"
+                         f"{totals['cost']:>10.4f}{totals['latency_p50']:>8g}{totals['latency_p99']:>8g}")
+        lines.append(f"Total estimated cost: ${self.total_cost():.4f}")
+        for title, breakdown, label in (("rounds", self.by_round, "Round"), ("agents", self.by_agent, "Agent")):
+            ranked = sorted(breakdown.items(), key=lambda item: item[1]["cost"] or item[1]["prompt"], reverse=True)
+            if ranked:
+                lines.append(f"Most expensive {title}:")
+                for key, totals in ranked[:top]:
+                    lines.append(f"  {label} {key}: {int(totals['calls'])} calls, {int(totals['prompt'])} prompt + "
+                                 f"{int(totals['completion'])} completion tokens, ${totals['cost']:.4f}, "
+                                 f"{totals['latency'] / totals['calls']:.2f}s mean latency")
+        return "\n".join(lines)
@@ -0,0 +1,199 @@
+import asyncio
+import contextlib
+import email.utils
+import logging
+import os
+import random
+import time
+from typing import AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 6
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+# Minimum time between two multiplicative decreases, so that one burst of 429s
+# from requests that were already in flight only halves the limit once
+DECREASE_INTERVAL = 2.0
+# How often a request waiting for a slot of a cross-process budget checks again
+SHARED_SLOT_POLL_INTERVAL = 0.01
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+
+    Callers reserve capacity up front and are told how long to wait for it;
+    the balance may go negative, which queues later callers behind earlier ones.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """Take amount from the bucket and return the seconds to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Admission control shared by every agent of an env.
+
+    A request is admitted once the requests-per-minute and tokens-per-minute
+    buckets allow it, any Retry-After cooldown has passed, and a concurrency
+    slot is free. The concurrency limit adapts AIMD-style: it grows by one per
+    window of successful requests and is halved on a 429.
+
+    shared_slots is an optional multiprocessing semaphore that additionally
+    caps the requests in flight across several processes, e.g. the workers
+    of an ensemble.
+    """
+
+    def __init__(self, max_concurrency: int, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 min_concurrency: int = 1, max_retries: int = MAX_RETRIES,
+                 backoff_base: float = BACKOFF_BASE, backoff_cap: float = BACKOFF_CAP,
+                 shared_slots=None):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(max_concurrency)
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.shared_slots = shared_slots
+        self.in_flight = 0
+        self.rate_limited = 0
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+        self._condition_loop = None
+        # Jitter has its own RNG: retries must not advance the seeded global one,
+        # which orders candidates and picks speakers, or a replay would diverge
+        self._rng = random.Random()
+
+    @classmethod
+    def from_environ(cls, max_concurrency: int) -> Optional["RateLimiter"]:
+        """Build a limiter from CONCLAVE_RPM and CONCLAVE_TPM. Returns None when neither is set."""
+        rpm = os.environ.get("CONCLAVE_RPM")
+        tpm = os.environ.get("CONCLAVE_TPM")
+        if not rpm and not tpm:
+            return None
+        return cls(max_concurrency, rpm=float(rpm) if rpm else None, tpm=float(tpm) if tpm else None)
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily, and again for a new loop, so it binds to the running loop
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._condition_loop is not loop:
+            self._condition = asyncio.Condition()
+            self._condition_loop = loop
+            self.in_flight = 0
+        return self._condition
+
+    @contextlib.asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0) -> AsyncIterator[None]:
+        """Wait for admission, then hold a concurrency slot for the duration of the block."""
+        delay = 0.0
+        if self.request_bucket is not None:
+            delay = max(delay, self.request_bucket.reserve(1))
+        if self.token_bucket is not None:
+            delay = max(delay, self.token_bucket.reserve(estimated_tokens))
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        condition = self._get_condition()
+        async with condition:
+            while self.in_flight >= int(self.concurrency_limit):
+                await condition.wait()
+            self.in_flight += 1
+        shared_acquired = False
+        try:
+            if self.shared_slots is not None:
+                # A blocking acquire would stall the event loop, so poll instead
+                while not self.shared_slots.acquire(block=False):
+                    await asyncio.sleep(SHARED_SLOT_POLL_INTERVAL)
+                shared_acquired = True
+            # Sit out any Retry-After cooldown announced while we were queued
+            cooldown = self._resume_at - time.monotonic()
+            while cooldown > 0:
+                await asyncio.sleep(cooldown)
+                cooldown = self._resume_at - time.monotonic()
+            yield
+        finally:
+            if shared_acquired:
+                self.shared_slots.release()
+            async with condition:
+                self.in_flight -= 1
+                condition.notify(max(1, int(self.concurrency_limit) - self.in_flight))
+
+    def on_success(self) -> None:
+        # Additive increase: one extra slot per window of successful requests
+        if self.concurrency_limit < self.max_concurrency:
+            self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        self.rate_limited += 1
+        now = time.monotonic()
+        if now - self._last_decrease >= DECREASE_INTERVAL:
+            # Multiplicative decrease
+            self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+            self._last_decrease = now
+            logger.warning(f"Rate limited; concurrency limit lowered to {int(self.concurrency_limit)}")
+        if retry_after:
+            self._resume_at = max(self._resume_at, now + retry_after)
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Exponential backoff with full jitter, never shorter than the server's Retry-After."""
+        delay = self._rng.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    import openai
+    return isinstance(error, openai.RateLimitError) or _status_code(error) == 429
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Server errors, connection problems and timed-out attempts that are worth retrying."""
+    import openai
+    if isinstance(error, (openai.APIConnectionError, openai.InternalServerError, asyncio.TimeoutError)):
+        return True
+    status = _status_code(error)
+    return status is not None and status >= 500
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """Read the delay requested by a Retry-After (or retry-after-ms) response header."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
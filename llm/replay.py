@@ -0,0 +1,173 @@
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+
+
+def request_hash(request_params: Dict) -> str:
+    """Short fingerprint of a request, used to detect replay divergence."""
+    encoded = json.dumps(request_params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+class ReplayedError(RuntimeError):
+    """A call that failed in the recorded run, raised again on replay."""
+
+
+class ReplayedCancellation(ReplayedError):
+    """A call that was cut off by a deadline in the recorded run, failed at once on replay."""
+
+
+class _CallSequence:
+    """Per-(agent, call type) sequence numbers, handed out as calls are made."""
+
+    def __init__(self):
+        self._counters: Dict[Tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+
+    def next_seq(self, agent_id: int, call_type: Optional[str]) -> int:
+        """Reserve the sequence number of a call before its request is sent."""
+        with self._lock:
+            key = (agent_id, call_type or "")
+            seq = self._counters.get(key, 0)
+            self._counters[key] = seq + 1
+            return seq
+
+
+class TraceRecorder(_CallSequence):
+    """
+    Append-only recorder of every LLM response an agent receives.
+
+    The trace is gzip-compressed JSONL. The first line is a header carrying the
+    random seed of the run; every following line is one call, identified by
+    agent, call type (the tool name) and the per-agent sequence number of that
+    call type. Sequence numbers are reserved when a call is made, not when its
+    response arrives, so concurrent calls of one agent (the secretary's vote
+    batches and summaries) replay in the order they were made. Calls that
+    failed or were cut off by a deadline are recorded too, and fail the same
+    way on replay.
+    """
+
+    def __init__(self, path: str, seed: Optional[int] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        super().__init__()
+        self.path = path
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        # Seed the global RNG so candidate ordering and speaker selection replay identically
+        random.seed(self.seed)
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._closed = False
+        self._write({"version": TRACE_VERSION, "seed": self.seed})
+        # An interrupted run still ends its gzip stream; a killed one is read up to its last whole line
+        atexit.register(self.close)
+
+    def _write(self, entry: Dict) -> None:
+        if self._closed:
+            return
+        self._file.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def record(self, agent_id: int, call_type: Optional[str], seq: int, request_params: Dict, message) -> None:
+        self._record(agent_id, call_type, seq, request_params, response=message.model_dump(exclude_none=True))
+
+    def record_failure(self, agent_id: int, call_type: Optional[str], seq: int, request_params: Dict,
+                       error: BaseException) -> None:
+        """Record a call that raised, or was cancelled by a deadline, instead of returning a response."""
+        self._record(agent_id, call_type, seq, request_params, error=str(error) or type(error).__name__,
+                     error_type=type(error).__name__, cancelled=isinstance(error, asyncio.CancelledError))
+
+    def _record(self, agent_id: int, call_type: Optional[str], seq: int, request_params: Dict, **outcome) -> None:
+        with self._lock:
+            self._write({
+                "agent_id": agent_id,
+                "call": call_type,
+                "seq": seq,
+                "request_hash": request_hash(request_params),
+                **outcome
+            })
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._file.close()
+        atexit.unregister(self.close)
+
+
+class TraceReplayer(_CallSequence):
+    """
+    Serves responses from a trace written by TraceRecorder, with no network.
+
+    A call that failed in the recorded run raises ReplayedError; one that was
+    cut off by a deadline raises ReplayedCancellation right away, so its
+    cardinal is left without a vote as in the recorded run, without waiting
+    for the deadline again.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.seed = None
+        self.divergences = 0
+        self._responses: Dict[Tuple[int, str, int], Dict] = {}
+        self._load()
+        if self.seed is not None:
+            random.seed(self.seed)
+
+    def _load(self) -> None:
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    entry = json.loads(line)
+                    if "seed" in entry:
+                        self.seed = entry["seed"]
+                        continue
+                    key = (entry["agent_id"], entry["call"] or "", entry["seq"])
+                    self._responses[key] = entry
+            except (json.JSONDecodeError, EOFError, gzip.BadGzipFile):
+                # A run that was killed leaves a torn final line or an unterminated gzip stream
+                logger.warning(f"Stopped reading {self.path} at an incomplete record")
+        logger.info(f"Loaded {len(self._responses)} recorded responses from {self.path}")
+
+    async def replay(self, agent_id: int, call_type: Optional[str], seq: int, request_params: Dict):
+        """The recorded response of call `seq` of the agent's call type, or its recorded failure."""
+        entry = self._responses.get((agent_id, call_type or "", seq))
+        if entry is None:
+            raise KeyError(f"No recorded {call_type} response #{seq} for agent {agent_id} in {self.path}")
+        if entry["request_hash"] != request_hash(request_params):
+            self.divergences += 1
+            logger.warning(f"Replay diverged: agent {agent_id} {call_type} #{seq} was recorded with a different prompt")
+        if entry.get("cancelled"):
+            raise ReplayedCancellation(f"{call_type} #{seq} of agent {agent_id} was cut off in the recorded run")
+        if "error" in entry:
+            raise ReplayedError(entry["error"])
+        from openai.types.chat import ChatCompletionMessage
+        return ChatCompletionMessage.model_validate(entry["response"])
+
+
+def recorder_from_environ() -> Optional[TraceRecorder]:
+    """Build a recorder from CONCLAVE_RECORD (trace path) and optional CONCLAVE_SEED."""
+    path = os.environ.get("CONCLAVE_RECORD")
+    if not path:
+        return None
+    seed = os.environ.get("CONCLAVE_SEED")
+    return TraceRecorder(path, seed=int(seed) if seed else None)
+
+
+def replayer_from_environ() -> Optional[TraceReplayer]:
+    """Build a replayer from CONCLAVE_REPLAY (trace path)."""
+    path = os.environ.get("CONCLAVE_REPLAY")
+    return TraceReplayer(path) if path else None
@@ -0,0 +1,139 @@
+import asyncio
+import contextlib
+import json
+import os
+from typing import AsyncIterator, Callable, Dict, Optional
+
+DEFAULT_MODEL = "openai/gpt-4o-mini"
+DEFAULT_MAX_TOKENS = 1000
+DEFAULT_TEMPERATURE = 0.5
+
+# Fields a route may set, as accepted in CONCLAVE_MODEL_ROUTES
+ROUTE_FIELDS = ("model", "max_tokens", "temperature", "timeout", "max_concurrency")
+
+
+class CallRoute:
+    """
+    Model and request settings for one call type.
+
+    Args:
+        model: OpenRouter model id
+        max_tokens: Completion token allowance
+        temperature: Sampling temperature
+        timeout: Per-request timeout in seconds; None keeps the client default
+        max_concurrency: Requests of this call type allowed in flight at once,
+                         within the env's overall limit; None for no separate cap
+    """
+
+    def __init__(self, model: str = DEFAULT_MODEL, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 temperature: float = DEFAULT_TEMPERATURE, timeout: Optional[float] = None,
+                 max_concurrency: Optional[int] = None):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+
+    def replace(self, **changes) -> "CallRoute":
+        fields = {field: getattr(self, field) for field in ROUTE_FIELDS}
+        fields.update(changes)
+        return CallRoute(**fields)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in ROUTE_FIELDS)
+        return f"CallRoute({fields})"
+
+
+class ModelRouter:
+    """
+    Routes each LLM call to the settings of its call type.
+
+    The call type is the forced tool name (cast_vote, evaluate_speaking_urgency,
+    speak_message, ...). Call types without a route of their own use the
+    default route. Each route with a max_concurrency gets its own pool of
+    in-flight slots, so a flood of slow calls of one type cannot take every
+    slot of the shared rate limiter from quick calls of another.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, CallRoute]] = None, default: Optional[CallRoute] = None):
+        self.default = default or CallRoute()
+        self.routes = dict(routes or {})
+        self._pools: Dict[str, asyncio.Semaphore] = {}
+        self._pools_loop = None
+
+    @classmethod
+    def from_environ(cls) -> "ModelRouter":
+        """
+        Build a router from CONCLAVE_MODEL_ROUTES, a JSON object (or the path of
+        a JSON file) mapping call types to route fields. The "default" key
+        overrides the default route, which the other routes extend, e.g.
+        {"evaluate_speaking_urgency": {"max_tokens": 200}, "speak_message": {"model": "openai/gpt-4o"}}
+        """
+        spec = os.environ.get("CONCLAVE_MODEL_ROUTES")
+        if not spec:
+            return cls()
+        if os.path.exists(spec):
+            with open(spec, encoding="utf-8") as f:
+                spec = f.read()
+        config = json.loads(spec)
+        for call_type, fields in config.items():
+            unknown = set(fields) - set(ROUTE_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown route fields {sorted(unknown)} for {call_type!r}, expected {ROUTE_FIELDS}")
+        default = CallRoute(**config.pop("default", {}))
+        return cls({call_type: default.replace(**fields) for call_type, fields in config.items()}, default)
+
+    def use_model(self, model: str, replace: Optional[Callable[[str], bool]] = None) -> bool:
+        """
+        Send every call type to one model, keeping the other route settings.
+
+        Args:
+            replace: If given, only routes whose current model it accepts are switched
+
+        Returns:
+            Whether any route changed model
+        """
+        def switched(route: CallRoute) -> CallRoute:
+            if route.model == model or (replace is not None and not replace(route.model)):
+                return route
+            return route.replace(model=model)
+
+        default = switched(self.default)
+        routes = {call_type: switched(route) for call_type, route in self.routes.items()}
+        changed = default is not self.default or any(routes[call_type] is not self.routes[call_type]
+                                                     for call_type in routes)
+        self.default, self.routes = default, routes
+        return changed
+
+    def route(self, call_type: Optional[str]) -> CallRoute:
+        return self.routes.get(call_type or "", self.default)
+
+    def _get_pool(self, call_type: str, route: CallRoute) -> asyncio.Semaphore:
+        # Created lazily, and again for a new loop, so they bind to the running loop
+        loop = asyncio.get_running_loop()
+        if self._pools_loop is not loop:
+            self._pools = {}
+            self._pools_loop = loop
+        pool = self._pools.get(call_type)
+        if pool is None:
+            pool = asyncio.Semaphore(route.max_concurrency)
+            self._pools[call_type] = pool
+        return pool
+
+    @contextlib.asynccontextmanager
+    async def limit(self, call_type: Optional[str]) -> AsyncIterator[CallRoute]:
+        """Hold a slot of the call type's pool, if it has one, and yield its route."""
+        route = self.route(call_type)
+        if route.max_concurrency is None:
+            yield route
+            return
+        async with self._get_pool(call_type or "", route):
+            yield route
+
+
+def call_type_of(request_params: Dict) -> Optional[str]:
+    """The forced tool name of a chat completion request, if any."""
+    tool_choice = request_params.get("tool_choice")
+    if isinstance(tool_choice, dict):
+        return tool_choice.get("function", {}).get("name")
+    return None
@@ -0,0 +1,141 @@
+"""
+Streamed chat completions with incremental tool-argument parsing.
+
+A forced tool call streams its JSON arguments in fragments. ToolArgumentStream
+decodes one string field of those arguments as it arrives, so the text of a
+speech can be shown while it is still being generated, and the finished call
+is assembled into the same message object a non-streamed request returns.
+"""
+
+import json
+import re
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, Optional
+
+_SIMPLE_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class ToolArgumentStream:
+    """
+    Decodes one string field of streamed JSON tool arguments incrementally.
+
+    Args:
+        field: Name of the string field to decode, e.g. "message"
+        on_text: Called with each newly decoded piece of the field's value
+        on_start: Called when a request starts streaming into it, again on every retry
+    """
+
+    def __init__(self, field: str, on_text: Callable[[str], None], on_start: Optional[Callable[[], None]] = None):
+        self.field = field
+        self.on_text = on_text
+        self.on_start = on_start
+        self._start = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self.start()
+
+    def start(self) -> None:
+        """Discard anything streamed by an earlier attempt."""
+        self.arguments = ""
+        self.text = ""
+        self.first_text_at: Optional[float] = None
+        # Index in arguments where decoding resumes; None until the field's value starts
+        self._pos: Optional[int] = None
+        self._done = False
+
+    def feed(self, fragment: str) -> None:
+        self.arguments += fragment
+        if self._done:
+            return
+        if self._pos is None:
+            match = self._start.search(self.arguments)
+            if match is None:
+                return
+            self._pos = match.end()
+        decoded = self._decode()
+        if decoded:
+            if self.first_text_at is None:
+                self.first_text_at = time.perf_counter()
+            self.text += decoded
+            self.on_text(decoded)
+
+    def _decode(self) -> str:
+        """Decode from _pos up to the closing quote or the last complete escape."""
+        arguments, pos = self.arguments, self._pos
+        pieces = []
+        while pos < len(arguments):
+            char = arguments[pos]
+            if char == '"':
+                self._done = True
+                break
+            if char != "\\":
+                end = pos
+                while end < len(arguments) and arguments[end] not in '"\\':
+                    end += 1
+                pieces.append(arguments[pos:end])
+                pos = end
+                continue
+            if pos + 1 >= len(arguments):
+                break
+            escape = arguments[pos + 1]
+            if escape in _SIMPLE_ESCAPES:
+                pieces.append(_SIMPLE_ESCAPES[escape])
+                pos += 2
+                continue
+            # \uXXXX, possibly a surrogate pair of two escapes
+            length = 6
+            if len(arguments) >= pos + 6 and 0xD800 <= int(arguments[pos + 2:pos + 6], 16) < 0xDC00:
+                length = 12
+            if len(arguments) < pos + length:
+                break
+            pieces.append(json.loads('"' + arguments[pos:pos + length] + '"'))
+            pos += length
+        self._pos = pos
+        return "".join(pieces)
+
+
+async def stream_completion(client, request_params: Dict, stream: ToolArgumentStream, **options):
+    """
+    Send a streamed chat completion request and return it as a non-streamed response.
+
+    Tool-call argument fragments are fed to the stream as they arrive. The
+    result has the .choices[0].message and .usage of an ordinary response.
+    """
+    stream.start()
+    if stream.on_start is not None:
+        stream.on_start()
+    chunks = await client.chat.completions.create(**request_params, stream=True,
+                                                  stream_options={"include_usage": True}, **options)
+    content = []
+    tool_calls: Dict[int, Dict] = {}
+    usage = None
+    async for chunk in chunks:
+        if getattr(chunk, "usage", None) is not None:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content.append(delta.content)
+        for call in delta.tool_calls or []:
+            entry = tool_calls.setdefault(call.index, {"id": None, "name": "", "arguments": ""})
+            if call.id:
+                entry["id"] = call.id
+            if call.function is not None:
+                entry["name"] += call.function.name or ""
+                if call.function.arguments:
+                    entry["arguments"] += call.function.arguments
+                    if call.index == 0:
+                        stream.feed(call.function.arguments)
+
+    if not content and not tool_calls:
+        return None
+    message = {"role": "assistant", "content": "".join(content) or None}
+    if tool_calls:
+        message["tool_calls"] = [
+            {"id": entry["id"] or f"call_{index}", "type": "function",
+             "function": {"name": entry["name"], "arguments": entry["arguments"]}}
+            for index, entry in sorted(tool_calls.items())
+        ]
+    from openai.types.chat import ChatCompletionMessage
+    return SimpleNamespace(choices=[SimpleNamespace(message=ChatCompletionMessage.model_validate(message))],
+                           usage=usage)
@@ -0,0 +1,18 @@
+from typing import Dict, List, Union
+
+# Rough characters-per-token ratio for English prose with GPT-style tokenizers
+CHARS_PER_TOKEN = 4
+# Per-message overhead of the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate of the number of tokens in a piece of text."""
+    return len(text) // CHARS_PER_TOKEN + 1 if text else 0
+
+
+def estimate_prompt_tokens(prompt: Union[str, List[Dict]]) -> int:
+    """Estimate the input tokens of a prompt string or a list of chat messages."""
+    if isinstance(prompt, str):
+        return estimate_tokens(prompt) + MESSAGE_OVERHEAD_TOKENS
+    return sum(estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for message in prompt)
@@ -1,6 +1,18 @@
+from environments.budget import Budget
+from environments.checkpoint import Checkpointer
 from environments.conclave_env import ConclaveEnv
-from agents.base import Agent
-import pandas as pd
+from environments.events import EventStream
+from environments.feed import ProgressFeed
+from environments.roster import load_roster, seat_cardinals
+from environments.tracing import Tracer
+from llm.cache import ResponseCache
+from llm.client import load_dotenv_once
+from llm.engine import DEFAULT_MAX_CONCURRENCY
+from llm.metrics import CallMetrics
+from llm.rate_limit import RateLimiter
+from llm.replay import recorder_from_environ, replayer_from_environ
+from llm.routing import ModelRouter
+import argparse
 import logging
 import datetime
 import os
@@ -23,35 +35,57 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 def main():
+    load_dotenv_once()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the checkpoint in CONCLAVE_CHECKPOINT_DIR (default checkpoints/multi_round)")
+    args = parser.parse_args()
+    checkpointer = Checkpointer.from_environ("checkpoints/multi_round")
+
     # Create the environment
-    env = ConclaveEnv()
-
-    # Read cardinals from CSV file
-    cardinals_df = pd.read_csv('cardinal_electors_2025.csv')
-
-    # Create Agent instances and add them to env.agents
-    # counter = 0
-    for idx, row in cardinals_df.iterrows():
-        # counter += 1
-        # if counter > 10:
-        #     break
-        agent = Agent(
-            agent_id=idx,
-            name=row['Name'],
-            background=row['Background'],
-            env=env
-        )
-        env.agents.append(agent)
-
-    # Set the number of agents in the environment
-    env.num_agents = len(env.agents)
+    env = ConclaveEnv(
+        checkpointer=checkpointer,
+        response_cache=ResponseCache.from_environ(),
+        recorder=recorder_from_environ(),
+        replayer=replayer_from_environ(),
+        rate_limiter=RateLimiter.from_environ(DEFAULT_MAX_CONCURRENCY),
+        router=ModelRouter.from_environ(),
+        events=EventStream.from_environ(),
+        feed=ProgressFeed.from_environ(),
+        metrics=CallMetrics.from_environ(),
+        tracer=Tracer.from_environ(),
+        call_timeout=float(os.environ["CONCLAVE_CALL_TIMEOUT"]) if os.environ.get("CONCLAVE_CALL_TIMEOUT") else None,
+        ballot_deadline=float(os.environ["CONCLAVE_BALLOT_DEADLINE"]) if os.environ.get("CONCLAVE_BALLOT_DEADLINE") else None,
+        prompt_layout=os.environ.get("CONCLAVE_PROMPT_LAYOUT", "inline"),
+        prompt_token_budget=int(os.environ["CONCLAVE_PROMPT_TOKEN_BUDGET"]) if os.environ.get("CONCLAVE_PROMPT_TOKEN_BUDGET") else None
+    )
+
+    # Create an agent for every cardinal of the roster
+    seat_cardinals(env, load_roster())
+    if not (args.resume and checkpointer.load(env)):
+        checkpointer.reset()
     logger.info(f"\n{env.list_candidates_for_prompt(randomize=False)}")
-    winner_found = False
+    vote_batch_size = int(os.environ["CONCLAVE_VOTE_BATCH_SIZE"]) if os.environ.get("CONCLAVE_VOTE_BATCH_SIZE") else None
+    # Caps on tokens, cost, ballots and wall time; a deadlocked conclave stops with a checkpoint
+    budget = Budget.from_environ()
+    winner_found = env.winner is not None
     while not winner_found:
-        winner_found = env.run_voting_round()
+        plan = budget.plan_round(env, num_speakers=0)
+        if not plan.proceed:
+            budget.stop(env, plan)
+            break
+        winner_found = env.run_voting_round(batch_size=vote_batch_size)
         print(f"winner_found: {winner_found}")
 
-    print(f"Winner found: Cardinal {env.winner} - {env.agents[env.winner].name}")
+    if winner_found:
+        print(f"Winner found: Cardinal {env.winner} - {env.agents[env.winner].name}")
+
+    if env.response_cache is not None:
+        logger.info(f"Response cache: {env.response_cache.stats()}")
+
+    print(env.metrics.report())
+    if os.environ.get("CONCLAVE_METRICS_FILE"):
+        env.metrics.write_prometheus(os.environ["CONCLAVE_METRICS_FILE"])
 
 if __name__ == "__main__":
     main()
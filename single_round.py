@@ -1,6 +1,15 @@
 from environments.conclave_env import ConclaveEnv
-from agents.base import Agent
-import pandas as pd
+from environments.events import EventStream
+from environments.feed import ProgressFeed
+from environments.roster import load_roster, seat_cardinals
+from environments.tracing import Tracer
+from llm.cache import ResponseCache
+from llm.client import load_dotenv_once
+from llm.engine import DEFAULT_MAX_CONCURRENCY
+from llm.metrics import CallMetrics
+from llm.rate_limit import RateLimiter
+from llm.replay import recorder_from_environ, replayer_from_environ
+from llm.routing import ModelRouter
 import logging
 import datetime
 import os
@@ -23,31 +32,35 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 def main():
+    load_dotenv_once()
     # Create the environment
-    env = ConclaveEnv()
-
-    # Read cardinals from CSV file
-    cardinals_df = pd.read_csv('cardinal_electors_2025.csv')
-
-    # Create Agent instances and add them to env.agents
-    counter = 0
-    for idx, row in cardinals_df.iterrows():
-        counter += 1
-        if counter > 20:
-            break
-        agent = Agent(
-            agent_id=idx,
-            name=row['Name'],
-            background=row['Background'],
-            env=env
-        )
-        env.agents.append(agent)
-
-    # Set the number of agents in the environment
-    env.num_agents = len(env.agents)
+    env = ConclaveEnv(
+        response_cache=ResponseCache.from_environ(),
+        recorder=recorder_from_environ(),
+        replayer=replayer_from_environ(),
+        rate_limiter=RateLimiter.from_environ(DEFAULT_MAX_CONCURRENCY),
+        router=ModelRouter.from_environ(),
+        events=EventStream.from_environ(),
+        feed=ProgressFeed.from_environ(),
+        metrics=CallMetrics.from_environ(),
+        tracer=Tracer.from_environ(),
+        call_timeout=float(os.environ["CONCLAVE_CALL_TIMEOUT"]) if os.environ.get("CONCLAVE_CALL_TIMEOUT") else None,
+        ballot_deadline=float(os.environ["CONCLAVE_BALLOT_DEADLINE"]) if os.environ.get("CONCLAVE_BALLOT_DEADLINE") else None,
+        prompt_layout=os.environ.get("CONCLAVE_PROMPT_LAYOUT", "inline")
+    )
+
+    # Create an agent for each of the first 20 cardinals of the roster
+    seat_cardinals(env, load_roster(limit=20))
     logger.info(f"\n{env.list_candidates_for_prompt(randomize=False)}")
     env.run_voting_round()
 
+    if env.response_cache is not None:
+        logger.info(f"Response cache: {env.response_cache.stats()}")
+
+    print(env.metrics.report())
+    if os.environ.get("CONCLAVE_METRICS_FILE"):
+        env.metrics.write_prometheus(os.environ["CONCLAVE_METRICS_FILE"])
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the ensemble analytics: loading stored runs, vote
+transitions, time to consensus, leader margins and voting blocs.
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from analytics.metrics import (Runs, covote_matrix, leader_margins, summarize, tallies, time_to_consensus,
+                               transition_matrix, voting_blocs, win_probabilities)
+
+# Six electors in two blocs ({0, 1, 2} and {3, 4, 5}); bloc B joins bloc A's candidate on the third ballot
+RUN_A = [[0, 0, 0, 3, 3, 3],
+         [0, 0, 0, 3, 3, 3],
+         [0, 0, 0, 0, 0, 0]]
+# Bloc B holds out; no winner within two ballots, elector 5 abstains in the second
+RUN_B = [[0, 0, 0, 3, 3, 3],
+         [0, 0, 0, 3, 3, -1]]
+
+
+def build_runs():
+    return Runs([RUN_A, RUN_B], winners=[0, None], seeds=[1, 2])
+
+
+def test_padding_and_tallies():
+    runs = build_runs()
+    assert runs.votes.shape == (2, 3, 6)
+    assert (runs.votes[1, 2] == -1).all()
+    assert runs.lengths.tolist() == [3, 2]
+    counts = tallies(runs)
+    assert counts[0, 2, 0] == 6
+    assert counts[1, 1].tolist() == [3, 0, 0, 2, 0, 0]
+    assert counts[1, 2].sum() == 0
+
+
+def test_transitions_and_consensus():
+    runs = build_runs()
+    transitions = transition_matrix(runs)
+    # 0 -> 0: 3 + 3 (run A) + 3 (run B); 3 -> 3: 3 (run A) + 2 (run B); 3 -> 0: 3 (run A)
+    assert transitions[0, 0] == 9
+    assert transitions[3, 3] == 5
+    assert transitions[3, 0] == 3
+    assert transitions.sum() == 17
+    probabilities = transition_matrix(runs, normalize=True)
+    assert np.isclose(probabilities[3, 0], 3 / 8)
+    assert np.allclose(probabilities.sum(axis=1)[[0, 3]], 1.0)
+
+    assert time_to_consensus(runs).tolist() == [0, 0, 0, 1]
+    assert win_probabilities(runs)[0] == 0.5
+
+
+def test_leader_margins():
+    margins = leader_margins(build_runs())
+    assert np.isclose(margins[0, 0], 0.0)
+    assert np.isclose(margins[0, 2], 1.0)
+    assert np.isclose(margins[1, 1], 1 / 5)
+    assert np.isnan(margins[1, 2])
+
+
+def test_voting_blocs():
+    covote = covote_matrix(build_runs())
+    assert np.isclose(covote[0, 1], 1.0)
+    assert np.isclose(covote[0, 3], 1 / 5)
+    assert np.isclose(covote[3, 5], 1.0)  # Only counts ballots both voted in
+    blocs = voting_blocs(covote, threshold=0.8)
+    assert [bloc.tolist() for bloc in blocs] == [[0, 1, 2], [3, 4, 5]]
+    assert len(voting_blocs(covote, threshold=0.1)) == 1
+
+
+def test_load_ensemble():
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "results.jsonl"), "w", encoding="utf-8") as f:
+            f.write(json.dumps({"seed": 1, "winner": 0, "ballot_matrix": RUN_A}) + "\n")
+            f.write(json.dumps({"seed": 2, "winner": None, "ballot_matrix": RUN_B}) + "\n")
+            f.write(json.dumps({"seed": 3, "winner": 0, "trajectory": []}) + "\n")  # No ballot matrix
+            f.write('{"seed": 4, "winn')  # Torn final line
+        runs = Runs.from_ensemble(directory)
+    assert runs.seeds == [1, 2]
+    assert runs.winners.tolist() == [0, -1]
+    assert (runs.votes == build_runs().votes).all()
+    print(summarize(runs, {0: "First"}))
+
+
+def test_run_without_ballots():
+    runs = Runs([RUN_A, []], winners=[0, None])
+    assert runs.votes.shape == (2, 3, 6)
+    assert runs.lengths.tolist() == [3, 0]
+    assert (runs.votes[1] == -1).all()
+    assert np.isnan(leader_margins(runs)[1]).all()
+    assert "on the last" in summarize(runs)
+    loaded = Runs.from_results([{"seed": 1, "winner": 0, "ballot_matrix": RUN_A},
+                                {"seed": 2, "winner": None, "ballot_matrix": []}])
+    assert (loaded.votes == runs.votes).all()
+
+
+def test_large_ensemble_is_fast():
+    import time
+    rng = np.random.default_rng(0)
+    matrices = [rng.integers(0, 133, size=(int(rng.integers(3, 30)), 133), dtype=np.int16) for _ in range(1000)]
+    runs = Runs(matrices, winners=rng.integers(0, 133, size=1000))
+    start = time.perf_counter()
+    transition_matrix(runs)
+    leader_margins(runs)
+    voting_blocs(covote_matrix(runs))
+    elapsed = time.perf_counter() - start
+    print(f"Analysed 1000 runs in {elapsed:.2f}s")
+    assert elapsed < 30
+
+
+if __name__ == "__main__":
+    test_padding_and_tallies()
+    test_transitions_and_consensus()
+    test_leader_margins()
+    test_voting_blocs()
+    test_load_ensemble()
+    test_run_without_ballots()
+    test_large_ensemble_is_fast()
+    print("\nTest completed successfully!")
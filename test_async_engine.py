@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that the async engine runs a full voting round concurrently
+while respecting the in-flight request limit.
+"""
+
+import asyncio
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from openai.types.chat import ChatCompletionMessage
+
+from environments.conclave_env import ConclaveEnv
+from agents.base import Agent
+from llm.client import get_client
+
+
+class FakeCompletions:
+    """Stand-in for client.chat.completions that always votes for cardinal 0."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def tool_arguments(self, tool_name: str, request: dict) -> dict:
+        if tool_name == "evaluate_speaking_urgency":
+            return {"urgency_score": 50, "reasoning": "Test urgency"}
+        if tool_name == "speak_message":
+            return {"message": "Test speech"}
+        if tool_name == "summarize_discussion":
+            return {"summary": "Test summary"}
+        if tool_name == "evaluate_urgency_and_vote":
+            return {"candidate": 0, "explanation": "Test vote", "urgency_score": 50, "reasoning": "Test urgency"}
+        return {"candidate": 0, "explanation": "Test vote"}
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.latency)
+        self.in_flight -= 1
+        tool_name = kwargs.get("tool_choice", {}).get("function", {}).get("name", "cast_vote")
+        arguments = json.dumps(self.tool_arguments(tool_name, kwargs))
+        message = ChatCompletionMessage.model_validate({
+            "role": "assistant",
+            "tool_calls": [{"id": "call_0", "type": "function", "function": {"name": tool_name, "arguments": arguments}}]
+        })
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def build_env(num_agents: int, max_concurrency: int, latency: float, completions=None, **env_kwargs):
+    os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
+    env = ConclaveEnv(max_concurrency=max_concurrency, **env_kwargs)
+    completions = completions or FakeCompletions(latency)
+    for i in range(num_agents):
+        agent = Agent(agent_id=i, name=f"Cardinal {i}", background="Test background", env=env)
+        agent.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        env.agents.append(agent)
+    env.num_agents = len(env.agents)
+    return env, completions
+
+
+def test_voting_round_is_concurrent():
+    env, completions = build_env(num_agents=40, max_concurrency=100, latency=0.2)
+
+    start = time.perf_counter()
+    winner_found = env.run_voting_round()
+    elapsed = time.perf_counter() - start
+
+    print(f"40 votes collected in {elapsed:.2f}s (max in flight: {completions.max_in_flight})")
+    assert winner_found
+    assert env.votingHistory[0] == {0: 40}
+    assert completions.max_in_flight == 40
+    assert elapsed < 2.0
+
+
+def test_in_flight_limit_is_respected():
+    env, completions = build_env(num_agents=20, max_concurrency=5, latency=0.05)
+    env.run_voting_round()
+
+    print(f"Max in flight with limit 5: {completions.max_in_flight}")
+    assert completions.max_in_flight == 5
+    assert sum(env.votingHistory[0].values()) == 20
+
+
+def test_sync_wrapper():
+    env, completions = build_env(num_agents=3, max_concurrency=8, latency=0.0)
+    env.agents[1].cast_vote()
+
+    assert env.votingBuffer == {0: 1}
+    assert env.agents[1].vote_history[0]["vote"] == 0
+
+
+def test_agents_share_one_client():
+    env, _ = build_env(num_agents=2, max_concurrency=8, latency=0.0)
+
+    async def borrow():
+        return get_client(), get_client()
+
+    first, second = env.engine.run(borrow())
+    assert first is second
+
+    # A fresh loop gets a fresh client, since pooled connections are loop-bound
+    other_env, _ = build_env(num_agents=1, max_concurrency=8, latency=0.0)
+    third, _ = other_env.engine.run(borrow())
+    assert third is not first
+    env.engine.close()
+    other_env.engine.close()
+
+
+if __name__ == "__main__":
+    test_voting_round_is_concurrent()
+    test_in_flight_limit_is_respected()
+    test_sync_wrapper()
+    test_agents_share_one_client()
+    print("\nTest completed successfully!")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that a ballot finishes within its deadline when requests
+hang, that cardinals without a valid vote are re-asked in a batch, and that
+those who still have none are recorded as abstentions and left out of the
+2/3 supermajority.
+"""
+
+import asyncio
+import re
+import tempfile
+import time
+from collections import Counter
+
+from environments.checkpoint import Checkpointer
+from test_async_engine import FakeCompletions, build_env
+
+
+def cardinal_of(request: dict) -> int:
+    return int(request["messages"][0]["content"].split("You are Cardinal ")[1].split(".")[0])
+
+
+class FlakyCompletions(FakeCompletions):
+    """
+    Individual votes: `hang` cardinals never answer their first request, `invalid`
+    cardinals name an out-of-range candidate the first time, and `dead` cardinals
+    always fail. Batched re-asks vote for candidate 0.
+    """
+
+    def __init__(self, hang=(), invalid=(), dead=()):
+        super().__init__(latency=0.0)
+        self.hang, self.invalid, self.dead = set(hang), set(invalid), set(dead)
+        self.calls = Counter()
+        self.seen = Counter()
+
+    async def create(self, **kwargs):
+        tool_name = kwargs.get("tool_choice", {}).get("function", {}).get("name")
+        self.calls[tool_name] += 1
+        if tool_name == "cast_vote":
+            cardinal = cardinal_of(kwargs)
+            self.seen[cardinal] += 1
+            if cardinal in self.dead:
+                raise ValueError("model refused")
+            if cardinal in self.hang and self.seen[cardinal] == 1:
+                await asyncio.sleep(3600)
+        return await super().create(**kwargs)
+
+    def tool_arguments(self, tool_name: str, request: dict) -> dict:
+        if tool_name == "cast_votes":
+            prompt = request["messages"][-1]["content"]
+            cardinal_ids = [int(c) for c in re.findall(r"^=== Cardinal (\d+):", prompt, re.MULTILINE)]
+            return {"votes": [{"cardinal_id": c, "candidate": 0, "explanation": "Re-asked"}
+                              for c in cardinal_ids if c not in self.dead]}
+        if tool_name == "cast_vote" and cardinal_of(request) in self.invalid and self.seen[cardinal_of(request)] == 1:
+            return {"candidate": 999, "explanation": "Out of range"}
+        return super().tool_arguments(tool_name, request)
+
+
+def build(completions, **env_kwargs):
+    env, _ = build_env(num_agents=6, max_concurrency=16, latency=0.0, completions=completions, **env_kwargs)
+    env.secretary.client = env.agents[0].client
+    return env
+
+
+def test_hung_and_invalid_votes_are_reasked():
+    completions = FlakyCompletions(hang={3}, invalid={5})
+    env = build(completions, ballot_deadline=1.0)
+
+    start = time.perf_counter()
+    winner_found = env.run_voting_round()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 1.5, f"ballot took {elapsed:.2f}s"
+    # The first pass is cut off at 0.75s; cardinals 3 and 5 are re-asked in one batch
+    assert completions.calls == Counter({"cast_vote": 6, "cast_votes": 1})
+    assert env.votingHistory[0] == {0: 6}
+    assert env.ballots.abstentions[0] == {}
+    assert winner_found
+    print(f"Ballot with a hung request finished in {elapsed:.2f}s")
+
+
+def test_failed_votes_become_abstentions():
+    with tempfile.TemporaryDirectory() as directory:
+        env = build(FlakyCompletions(dead={1, 4}), checkpointer=Checkpointer(directory))
+        winner_found = env.run_voting_round()
+
+        assert env.votingHistory[0] == {0: 4}
+        assert set(env.ballots.abstentions[0]) == {1, 4}
+        assert "model refused" in env.ballots.abstentions[0][1]
+        # 4 of the 4 electors who voted is a supermajority; 4 of 6 would not have been
+        assert winner_found and env.winner == 0
+
+        restored = build(FlakyCompletions())
+        assert Checkpointer(directory).load(restored)
+        assert restored.ballots.abstentions[0] == env.ballots.abstentions[0]
+
+
+def test_low_turnout_cannot_elect():
+    env = build(FlakyCompletions(dead={0, 1, 2, 3}))
+    assert not env.run_voting_round()
+    assert env.votingHistory[0] == {0: 2}
+    assert len(env.ballots.abstentions[0]) == 4
+    assert env.winner is None
+
+
+def test_call_timeout_retries_hung_attempt():
+    completions = FlakyCompletions(hang={2})
+    env = build(completions, call_timeout=0.2)
+    assert env.run_voting_round()
+    # Cardinal 2's first attempt timed out and was retried within the same call
+    assert completions.seen[2] == 2
+    assert completions.calls["cast_votes"] == 0
+    assert env.votingHistory[0] == {0: 6}
+
+
+if __name__ == "__main__":
+    test_hung_and_invalid_votes_are_reasked()
+    test_failed_votes_become_abstentions()
+    test_low_turnout_cannot_elect()
+    test_call_timeout_retries_hung_attempt()
+    print("\nTest completed successfully!")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that the ballot store records individual votes per
+elector and derives tallies, winners and vote histories from its matrix.
+"""
+
+import numpy as np
+
+from environments.ballots import ABSTAINED, INITIAL_ROUNDS, BallotStore
+from test_async_engine import build_env
+
+
+def test_tallies_and_histories():
+    store = BallotStore(4)
+    for elector, candidate in enumerate([2, 2, 1, 2]):
+        store.record(elector, candidate, f"Reason {elector}")
+    first = store.close_round()
+    assert first.tolist() == [0, 1, 3, 0]
+    assert BallotStore.counts(first) == {1: 1, 2: 3}
+    assert store.supermajority_winner(first) == 2
+
+    # Elector 3 does not vote in the second ballot
+    for elector, candidate in enumerate([2, 1, 1]):
+        store.record(elector, candidate)
+    second = store.close_round()
+    assert store.supermajority_winner(second) is None
+    assert store.matrix.tolist() == [[2, 2, 1, 2], [2, 1, 1, ABSTAINED]]
+    assert store.tallies().tolist() == [[0, 1, 3, 0], [0, 2, 1, 0]]
+    assert store.switchers().tolist() == [1]
+    assert store.vote_history(0) == [{"round_index": 0, "vote": 2, "reasoning": "Reason 0"},
+                                     {"round_index": 1, "vote": 2, "reasoning": ""}]
+    assert store.vote_history(3) == [{"round_index": 0, "vote": 2, "reasoning": "Reason 3"}]
+
+    # Elector 3 votes again in the third ballot, which stays labelled as such
+    store.record(3, 1, "Back")
+    assert store.vote_history(3)[-1] == {"round_index": 2, "vote": 1, "reasoning": "Back"}
+    assert store.vote_history(-1) == []
+
+
+def test_store_grows():
+    store = BallotStore(2)
+    for round_index in range(INITIAL_ROUNDS * 3):
+        store.record(round_index % 5, 0)
+        store.close_round()
+    assert store.matrix.shape == (INITIAL_ROUNDS * 3, 5)
+    assert store.matrix.dtype == np.int16
+    assert store.tallies()[:, 0].sum() == INITIAL_ROUNDS * 3
+    print(f"{store.rounds} ballots of {store.num_electors} electors in {store.nbytes} bytes")
+
+
+def test_env_votes_go_to_the_store():
+    env, _ = build_env(num_agents=6, max_concurrency=8, latency=0.0)
+    assert env.run_voting_round()
+    assert env.ballots.matrix.tolist() == [[0] * 6]
+    assert env.votingHistory == [{0: 6}]
+    assert env.winner == 0
+    assert all(agent.vote_history == [{"round_index": 0, "vote": 0, "reasoning": "Test vote"}] for agent in env.agents)
+
+
+if __name__ == "__main__":
+    test_tallies_and_histories()
+    test_store_grows()
+    test_env_votes_go_to_the_store()
+    print("\nTest completed successfully!")
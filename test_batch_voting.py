@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script to verify batched ballots: votes are split back per cardinal, and
+cardinals with a missing or invalid vote fall back to individual calls.
+"""
+
+import re
+
+from environments.batch_voting import build_batch_prompt
+from test_async_engine import FakeCompletions, build_env
+
+
+class BatchCompletions(FakeCompletions):
+    """Votes for candidate 1 in batches, but drops each batch's last cardinal and gives cardinal 2 an out-of-range candidate."""
+
+    def __init__(self):
+        super().__init__(latency=0.0)
+        self.calls = {}
+
+    def tool_arguments(self, tool_name: str, request: dict) -> dict:
+        self.calls[tool_name] = self.calls.get(tool_name, 0) + 1
+        if tool_name != "cast_votes":
+            return super().tool_arguments(tool_name, request)
+        prompt = request["messages"][-1]["content"]
+        cardinal_ids = [int(c) for c in re.findall(r"^=== Cardinal (\d+):", prompt, re.MULTILINE)]
+        votes = [{"cardinal_id": c, "candidate": 1, "explanation": f"Batched vote of {c}"} for c in cardinal_ids[:-1]]
+        if 2 in cardinal_ids:
+            votes[cardinal_ids.index(2)]["candidate"] = 999
+        return {"votes": votes}
+
+
+def test_batched_voting_round():
+    completions = BatchCompletions()
+    env, _ = build_env(num_agents=10, max_concurrency=8, latency=0.0, completions=completions)
+    env.secretary.client = env.agents[0].client
+
+    env.run_voting_round(batch_size=4)
+
+    # Batches [0-3], [4-7], [8-9]: cardinals 2, 3, 7 and 9 are missing or invalid
+    assert completions.calls["cast_votes"] == 3
+    assert completions.calls["cast_vote"] == 4
+    assert env.votingHistory[0] == {1: 6, 0: 4}
+    assert env.agents[0].vote_history == [{"round_index": 0, "vote": 1, "reasoning": "Batched vote of 0"}]
+    assert env.agents[2].vote_history[0]["vote"] == 0
+    assert all(len(agent.vote_history) == 1 for agent in env.agents)
+
+
+def test_stable_layout_batches_share_prefix():
+    env, _ = build_env(num_agents=10, max_concurrency=8, latency=0.0, prompt_layout="stable", prompt_seed=3)
+    first = build_batch_prompt(env, env.agents[:4])
+    second = build_batch_prompt(env, env.agents[4:8])
+    prefix = first.split("\n\n")[0]
+    assert prefix.count("Cardinal ") == 10
+    assert second.split("\n\n")[0] == prefix
+    assert build_batch_prompt(env, env.agents[:4]) == first
+
+
+if __name__ == "__main__":
+    test_batched_voting_round()
+    test_stable_layout_batches_share_prefix()
+    print("\nTest completed successfully!")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that the budget guard stops a deadlocked conclave at its
+ballot and token limits with a checkpoint to resume from, and degrades rounds
+(fewer speakers, summarized history, a cheaper model) as the budget runs low.
+"""
+
+import os
+import tempfile
+
+from environments.budget import DEGRADED_SUMMARY_HORIZON, Budget
+from environments.checkpoint import Checkpointer
+from test_async_engine import build_env
+from test_ballot_deadline import cardinal_of
+from test_call_metrics import MeteredCompletions
+
+
+class DeadlockedCompletions(MeteredCompletions):
+    """Cardinals vote for 0 or 1 by parity, so no candidate ever reaches 2/3."""
+
+    def tool_arguments(self, tool_name: str, request: dict) -> dict:
+        if tool_name == "cast_vote":
+            return {"candidate": cardinal_of(request) % 2, "explanation": "Deadlock"}
+        return super().tool_arguments(tool_name, request)
+
+
+def play(env, budget):
+    """The ballot loop of multi_round.py."""
+    while True:
+        plan = budget.plan_round(env, num_speakers=0)
+        if not plan.proceed:
+            budget.stop(env, plan)
+            return plan
+        assert not env.run_voting_round()
+
+
+def test_round_limit_stops_deadlock():
+    env, _ = build_env(num_agents=4, max_concurrency=16, latency=0.0, completions=DeadlockedCompletions())
+    plan = play(env, Budget(max_rounds=3))
+    assert env.votingRound == 3
+    assert "rounds budget" in plan.reason
+
+
+def test_token_limit_stops_before_overrun():
+    with tempfile.TemporaryDirectory() as directory:
+        env, _ = build_env(num_agents=4, max_concurrency=16, latency=0.0, completions=DeadlockedCompletions(),
+                           checkpointer=Checkpointer(directory))
+        # Every ballot costs 4 x 1100 tokens; a third would overrun the limit
+        plan = play(env, Budget(max_tokens=10000))
+        print(plan.reason)
+        assert env.votingRound == 2
+        assert env.token_usage["prompt_tokens"] + env.token_usage["completion_tokens"] == 8800
+        assert "would exceed" in plan.reason
+        assert plan.tokens > 1200
+
+        # The stop left a snapshot to resume from
+        assert os.path.exists(env.checkpointer.snapshot_path)
+        restored, _ = build_env(num_agents=4, max_concurrency=16, latency=0.0)
+        assert Checkpointer(directory).load(restored)
+        assert restored.votingRound == 2
+
+
+def test_degrades_as_budget_runs_low():
+    env, _ = build_env(num_agents=4, max_concurrency=16, latency=0.0)
+    env.metrics.prices["cheap/model"] = (0.01, 0.02)
+    budget = Budget(max_tokens=1_000_000)
+
+    plan = budget.plan_round(env, num_speakers=5, polls_urgency=True)
+    assert plan.proceed and plan.num_speakers == 5 and not budget.degradations
+
+    env.token_usage["prompt_tokens"] = 600_000
+    plan = budget.plan_round(env, num_speakers=5)
+    assert plan.proceed and plan.num_speakers == 2
+    assert env.discussion_summary_horizon == DEGRADED_SUMMARY_HORIZON
+    assert env.router.route("speak_message").model != "cheap/model"
+
+    env.token_usage["prompt_tokens"] = 800_000
+    plan = budget.plan_round(env, num_speakers=5)
+    assert env.router.route("speak_message").model == "cheap/model"
+    assert len(budget.degradations) == 3
+
+    # The cheap model is only switched to once
+    assert not env.router.use_model("cheap/model")
+    budget.plan_round(env, num_speakers=5)
+    assert len(budget.degradations) == 3
+
+    # Only a ballot still fits
+    env.token_usage["prompt_tokens"] = 1_000_000 - budget.estimate_round(env, 0)[0]
+    plan = budget.plan_round(env, num_speakers=5)
+    assert plan.proceed and plan.num_speakers == 0
+
+
+def test_no_cheaper_model_no_degradation():
+    env, _ = build_env(num_agents=4, max_concurrency=16, latency=0.0)
+    model = env.router.route("cast_vote").model
+    # The default model is already the cheapest priced one
+    assert min(env.metrics.prices, key=lambda name: sum(env.metrics.prices[name][:2])) == model
+    budget = Budget(max_tokens=1_000_000)
+    env.token_usage["prompt_tokens"] = 800_000
+    budget.plan_round(env, num_speakers=5)
+    assert env.router.route("cast_vote").model == model
+    assert not any("cheaper" in degradation for degradation in budget.degradations)
+
+
+if __name__ == "__main__":
+    test_round_limit_stops_deadlock()
+    test_token_limit_stops_before_overrun()
+    test_degrades_as_budget_runs_low()
+    test_no_cheaper_model_no_degradation()
+    print("\nTest completed successfully!")
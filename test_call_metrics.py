@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that every LLM call is metered: tokens, cost, latency,
+retries and errors by call type, round and agent, the end-of-run report, and
+the Prometheus dump written to a file and served at /metrics of the live feed.
+"""
+
+import json
+import os
+import tempfile
+import urllib.request
+from types import SimpleNamespace
+
+from environments.feed import ProgressFeed
+from llm.metrics import CallMetrics, Histogram
+from llm.rate_limit import RateLimiter
+from test_async_engine import FakeCompletions, build_env
+from test_rate_limit import make_status_error
+
+
+class MeteredCompletions(FakeCompletions):
+    """Reports 1000 prompt tokens (400 cached) and 100 completion tokens per call; `fail` cardinals get a 429 first."""
+
+    def __init__(self, fail=()):
+        super().__init__(latency=0.01)
+        self.fail = set(fail)
+
+    async def create(self, **kwargs):
+        prompt = kwargs["messages"][0]["content"]
+        for cardinal in list(self.fail):
+            if f"You are Cardinal {cardinal}." in prompt:
+                self.fail.discard(cardinal)
+                raise make_status_error(429, {"retry-after": "0"})
+        response = await super().create(**kwargs)
+        response.usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=100,
+                                         prompt_tokens_details=SimpleNamespace(cached_tokens=400))
+        return response
+
+
+def build(**env_kwargs):
+    return build_env(num_agents=4, max_concurrency=16, latency=0.0,
+                     rate_limiter=RateLimiter(16, backoff_base=0.01), **env_kwargs)
+
+
+def test_histogram_quantiles():
+    histogram = Histogram()
+    for value in (0.05, 0.3, 0.3, 0.7, 3.0):
+        histogram.observe(value)
+    assert histogram.count == 5
+    assert histogram.quantile(0.5) == 0.5
+    assert histogram.quantile(0.99) == 4.0
+
+
+def test_calls_are_metered():
+    env, _ = build(completions=MeteredCompletions(fail={2}))
+    env.run_voting_round()
+
+    vote = env.metrics.summary()["cast_vote"]
+    assert vote["calls"] == vote["api_calls"] == 4
+    assert vote["prompt_tokens"] == 4000 and vote["cached_tokens"] == 1600 and vote["completion_tokens"] == 400
+    assert vote["retries"] == 1 and vote["errors"] == 0
+    # gpt-4o-mini: 600 uncached input, 400 cached input and 100 output tokens per call
+    assert abs(vote["cost"] - 4 * (600 * 0.15 + 400 * 0.075 + 100 * 0.60) / 1e6) < 1e-9
+    assert env.metrics.retries == {("cast_vote", "rate_limited"): 1}
+    assert set(env.metrics.by_agent) == {0, 1, 2, 3}
+    assert env.metrics.by_round[1]["calls"] == 4
+    # Cardinal 2's call waited out a retry, so its total latency exceeds its attempt latency
+    assert env.metrics.total_latency["cast_vote"].sum > env.metrics.latency["cast_vote"].sum
+
+    report = env.metrics.report()
+    print(report)
+    assert "cast_vote" in report and "Most expensive rounds:" in report
+
+
+def test_prices_from_environ():
+    os.environ["CONCLAVE_MODEL_PRICES"] = json.dumps({"openai/gpt-4o-mini": [1.0, 2.0]})
+    try:
+        metrics = CallMetrics.from_environ()
+    finally:
+        del os.environ["CONCLAVE_MODEL_PRICES"]
+    # Without a cached-input price, cached tokens cost as much as any input token
+    assert metrics.call_cost("openai/gpt-4o-mini", 1000, 500, 200) == (1000 * 1.0 + 500 * 2.0) / 1e6
+    assert metrics.call_cost("unknown/model", 1000, 500, 0) == 0.0
+    assert "openai/gpt-4o" in metrics.prices
+
+
+def test_prometheus_dump_and_endpoint():
+    feed = ProgressFeed(port=0)
+    try:
+        env, _ = build(completions=MeteredCompletions(), feed=feed)
+        env.run_voting_round()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "metrics", "run.prom")
+            env.metrics.write_prometheus(path)
+            with open(path, encoding="utf-8") as f:
+                dump = f.read()
+        assert '# TYPE conclave_llm_latency_seconds histogram' in dump
+        assert 'conclave_llm_tokens_total{call_type="cast_vote",kind="prompt"} 4000' in dump
+        assert 'conclave_llm_latency_seconds_bucket{call_type="cast_vote",le="+Inf"} 4' in dump
+        assert 'conclave_agent_tokens_total{agent_id="3",kind="completion"} 100' in dump
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{feed.port}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read().decode("utf-8") == dump
+    finally:
+        feed.close()
+
+
+if __name__ == "__main__":
+    test_histogram_quantiles()
+    test_calls_are_metered()
+    test_prices_from_environ()
+    test_prometheus_dump_and_endpoint()
+    print("\nTest completed successfully!")
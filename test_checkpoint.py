@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that a conclave checkpointed after every round resumes
+with identical state, including after compaction and a torn final delta.
+"""
+
+import os
+import tempfile
+
+from environments.checkpoint import Checkpointer
+from test_async_engine import build_env
+from test_replay import RandomCompletions
+
+
+def build_checkpointed_env(directory: str, compact_every: int = 10):
+    checkpointer = Checkpointer(directory, compact_every=compact_every)
+    env, _ = build_env(num_agents=6, max_concurrency=8, latency=0.0, completions=RandomCompletions(),
+                       checkpointer=checkpointer, discussion_summary_horizon=1)
+    env.secretary.client = env.agents[0].client
+    return env, checkpointer
+
+
+def run_rounds(env, rounds: int):
+    for _ in range(rounds):
+        env.run_discussion_round(num_speakers=2, random_selection=True)
+        env.run_voting_round()
+
+
+def assert_same_state(resumed, original):
+    assert resumed.votingRound == original.votingRound
+    assert resumed.discussionRound == original.discussionRound
+    assert resumed.winner == original.winner
+    assert resumed.votingHistory == original.votingHistory
+    assert resumed.discussionHistory == original.discussionHistory
+    assert resumed.discussionSummaries == original.discussionSummaries
+    assert resumed.agent_discussion_participation == original.agent_discussion_participation
+    assert resumed.token_usage == original.token_usage
+    assert [a.vote_history for a in resumed.agents] == [a.vote_history for a in original.agents]
+    for agent_id in range(len(original.agents)):
+        assert resumed.get_discussion_history(agent_id) == original.get_discussion_history(agent_id)
+    assert resumed.promptize_voting_results_history() == original.promptize_voting_results_history()
+
+
+def test_resume_restores_state():
+    with tempfile.TemporaryDirectory() as tmp:
+        original, checkpointer = build_checkpointed_env(tmp, compact_every=4)
+        run_rounds(original, 3)
+
+        # 6 rounds with compaction every 4: one snapshot plus 2 deltas
+        with open(checkpointer.deltas_path) as f:
+            assert len(f.readlines()) == 2
+        assert os.path.exists(checkpointer.snapshot_path)
+        assert not [name for name in os.listdir(tmp) if name.endswith(".tmp")]
+
+        resumed, resumed_checkpointer = build_checkpointed_env(tmp, compact_every=4)
+        assert resumed_checkpointer.load(resumed)
+        assert_same_state(resumed, original)
+        print(f"Resumed {resumed.votingRound} ballots and {resumed.discussionRound} discussion rounds")
+
+        # The resumed conclave keeps checkpointing where it left off
+        run_rounds(resumed, 1)
+        again, again_checkpointer = build_checkpointed_env(tmp)
+        assert again_checkpointer.load(again)
+        assert_same_state(again, resumed)
+        assert again.votingRound == 4
+
+
+def test_torn_delta_loses_only_last_round():
+    with tempfile.TemporaryDirectory() as tmp:
+        original, checkpointer = build_checkpointed_env(tmp)
+        run_rounds(original, 2)
+        with open(checkpointer.deltas_path, "a") as f:
+            f.write('{"seq": 5, "votingRound"')
+
+        resumed, resumed_checkpointer = build_checkpointed_env(tmp)
+        assert resumed_checkpointer.load(resumed)
+        assert_same_state(resumed, original)
+
+
+def test_load_without_checkpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        env, checkpointer = build_checkpointed_env(os.path.join(tmp, "empty"))
+        assert not checkpointer.load(env)
+        assert env.votingHistory == []
+
+
+if __name__ == "__main__":
+    test_resume_restores_state()
+    test_torn_delta_loses_only_last_round()
+    test_load_without_checkpoint()
+    print("\nTest completed successfully!")
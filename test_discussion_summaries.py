@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that discussion rounds older than the summary horizon are
+summarized once and shared, and that prompts respect the token budget.
+"""
+
+from llm.tokens import estimate_tokens
+from test_async_engine import FakeCompletions, build_env
+
+
+class CountingCompletions(FakeCompletions):
+    def __init__(self):
+        super().__init__(latency=0.0)
+        self.calls = {}
+
+    def tool_arguments(self, tool_name: str, request: dict) -> dict:
+        self.calls[tool_name] = self.calls.get(tool_name, 0) + 1
+        if tool_name == "speak_message":
+            return {"message": "A long speech about the future of the Church. " * 40}
+        return super().tool_arguments(tool_name, request)
+
+
+def test_old_rounds_are_summarized_once():
+    completions = CountingCompletions()
+    env, _ = build_env(num_agents=6, max_concurrency=8, latency=0.0, completions=completions,
+                       discussion_summary_horizon=1)
+    env.secretary.client = env.agents[0].client
+
+    for _ in range(4):
+        env.run_discussion_round(num_speakers=6, random_selection=True)
+
+    # Rounds 1-3 are behind the horizon, each summarized by exactly one call
+    assert sorted(env.discussionSummaries) == [0, 1, 2]
+    assert completions.calls["summarize_discussion"] == 3
+
+    history = env.get_discussion_history(agent_id=0)
+    assert history.count("(summary):\nTest summary") == 3
+    assert history.count("A long speech") == 6 * 40
+    print(f"Agent 0 discussion history is ~{estimate_tokens(history)} tokens")
+
+
+def test_prompt_history_fits_budget():
+    env, _ = build_env(num_agents=6, max_concurrency=8, latency=0.0, prompt_token_budget=900)
+    agent = env.agents[0]
+    for round_index in range(20):
+        agent.record_vote(1, "Because of his pastoral experience. " * 10)
+        env.ballots.close_round()
+        env.votingHistory.append({i: 1 for i in range(6)})
+
+    sections = agent.history_sections()
+    untrimmed = agent.promptize_vote_history() + env.promptize_voting_results_history()
+    available = 900 - agent._fixed_prompt_tokens
+    assert estimate_tokens(untrimmed) > available
+    assert sum(estimate_tokens(section) for section in sections) <= available
+    # The most recent round is the one kept
+    assert "In round 20," in sections[0] and "In round 1," not in sections[0]
+    assert "Round 20:" in sections[1]
+
+
+if __name__ == "__main__":
+    test_old_rounds_are_summarized_once()
+    test_prompt_history_fits_budget()
+    print("\nTest completed successfully!")
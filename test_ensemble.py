@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that an ensemble runs every seed across a process pool,
+streams results into its store, resumes by seed, and that the shared
+semaphore caps the requests in flight.
+"""
+
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+import environments.ensemble
+from environments.ensemble import (EnsembleStore, _init_worker, _run_in_worker, conclave_result, play_conclave,
+                                   run_ensemble, shared_slots)
+from llm.rate_limit import RateLimiter
+from test_async_engine import build_env
+from test_replay import RandomCompletions
+
+
+def run_fake_conclave(seed: int, config: dict) -> dict:
+    """Stand-in for run_conclave with six fake cardinals."""
+    random.seed(seed)
+    completions = RandomCompletions()
+    completions.rng.seed(seed)
+    env, _ = build_env(num_agents=6, max_concurrency=config["max_in_flight"], latency=0.0, completions=completions,
+                       rate_limiter=RateLimiter(config["max_in_flight"], shared_slots=shared_slots()))
+    start = time.perf_counter()
+    play_conclave(env, mode=config["mode"], max_ballots=config["max_ballots"], num_speakers=2)
+    return conclave_result(seed, env, time.perf_counter() - start)
+
+
+def test_ensemble_runs_and_resumes():
+    config = {"mode": "discussion", "max_ballots": 3, "max_in_flight": 4}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EnsembleStore(tmp)
+        assert run_ensemble(store, range(4), config, workers=2, run_fn=run_fake_conclave) == 4
+        assert store.completed_seeds() == {0, 1, 2, 3}
+        for result in store.results:
+            assert 1 <= result["ballots"] <= 3
+            assert len(result["trajectory"]) == result["ballots"]
+        assert sum(store.win_probabilities().values()) <= 1.0
+        print(store.summary())
+
+        # Reopening the store resumes: only the new seeds run
+        reopened = EnsembleStore(tmp)
+        assert len(reopened.results) == 4
+        assert run_ensemble(reopened, range(6), config, workers=2, run_fn=run_fake_conclave) == 2
+        assert reopened.completed_seeds() == set(range(6))
+        assert reopened.trajectories()[0] == store.trajectories()[0]
+
+
+def test_shared_slots_cap_in_flight():
+    slots = multiprocessing.get_context().BoundedSemaphore(3)
+    env, completions = build_env(num_agents=12, max_concurrency=8, latency=0.05,
+                                 rate_limiter=RateLimiter(8, shared_slots=slots))
+    env.run_voting_round()
+
+    print(f"Max in flight with 3 shared slots: {completions.max_in_flight}")
+    assert completions.max_in_flight == 3
+    assert sum(env.votingHistory[0].values()) == 12
+    # Every slot was given back
+    assert all(slots.acquire(block=False) for _ in range(3))
+
+
+def hold_slot_and_fail(seed: int, config: dict) -> dict:
+    """Takes a request slot it never gives back, then fails."""
+    assert shared_slots().acquire(block=False)
+    print(f"Conclave {seed} is noisy")
+    raise RuntimeError("Run failed mid-request")
+
+
+def test_failed_run_gives_back_its_slots():
+    slots = multiprocessing.get_context().BoundedSemaphore(2)
+    _init_worker(slots, None)
+    try:
+        _run_in_worker(hold_slot_and_fail, 0, {})
+        assert False, "the run's error was swallowed"
+    except RuntimeError:
+        pass
+    finally:
+        # This process is not a pool worker; leave it without a worker semaphore for the other tests
+        environments.ensemble._shared_slots = None
+    assert all(slots.acquire(block=False) for _ in range(2))
+
+
+def die_once(seed: int, config: dict) -> dict:
+    """The first attempt at seed 1 kills its worker."""
+    marker = os.path.join(config["directory"], "died")
+    if seed == 1 and not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return run_fake_conclave(seed, config)
+
+
+def test_dead_worker_is_replaced():
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {"mode": "multi", "max_ballots": 2, "max_in_flight": 4, "directory": tmp}
+        store = EnsembleStore(tmp)
+        assert run_ensemble(store, range(4), config, workers=2, run_fn=die_once) == 4
+        assert store.completed_seeds() == {0, 1, 2, 3}
+
+
+if __name__ == "__main__":
+    test_ensemble_runs_and_resumes()
+    test_shared_slots_cap_in_flight()
+    test_failed_run_gives_back_its_slots()
+    test_dead_worker_is_replaced()
+    print("\nTest completed successfully!")
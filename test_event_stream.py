@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that a conclave writes its calls, ballots, speeches,
+tally and winner to the event stream, with each prompt stored once by hash.
+"""
+
+import os
+import tempfile
+import threading
+
+from environments.events import (BALLOT, CALL_FINISHED, CALL_STARTED, SPEECH, TALLY, WINNER, EventStream,
+                                 read_events, read_prompts)
+from test_async_engine import build_env
+from test_ballot_deadline import FlakyCompletions, build
+
+
+def test_conclave_events():
+    with tempfile.TemporaryDirectory() as directory:
+        events = EventStream(directory)
+        env, _ = build_env(num_agents=6, max_concurrency=16, latency=0.0, events=events)
+        env.run_discussion_round(num_speakers=2, random_selection=True)
+        assert env.run_voting_round()
+        events.close()
+
+        by_type = {}
+        for event in read_events(directory):
+            by_type.setdefault(event["type"], []).append(event)
+        prompts = read_prompts(directory)
+
+    assert len(by_type[SPEECH]) == 2
+    assert all(event["round"] == 1 for event in by_type[SPEECH])
+    assert sorted(event["agent_id"] for event in by_type[BALLOT]) == list(range(6))
+    assert by_type[TALLY][0]["counts"] == {"0": 6} and by_type[TALLY][0]["total"] == 6
+    assert by_type[WINNER] == [dict(by_type[WINNER][0], round=1, candidate=0)]
+
+    started, finished = by_type[CALL_STARTED], by_type[CALL_FINISHED]
+    assert len(started) == len(finished) == 2 + 6
+    assert {event["call_id"] for event in started} == {event["call_id"] for event in finished}
+    assert all(event["ok"] and event["source"] == "api" for event in finished)
+    # Call events carry only the hash; every prompt text is stored exactly once
+    assert all("prompt" not in event for event in started)
+    assert {event["prompt_hash"] for event in started} == set(prompts)
+    print(f"{sum(len(v) for v in by_type.values())} events, {len(prompts)} distinct prompts")
+
+
+def test_cancelled_call_is_finished():
+    with tempfile.TemporaryDirectory() as directory:
+        events = EventStream(directory)
+        env = build(FlakyCompletions(hang={3}), ballot_deadline=1.0, events=events)
+        assert env.run_voting_round()
+        events.close()
+        started = [event for event in read_events(directory) if event["type"] == CALL_STARTED]
+        finished = [event for event in read_events(directory) if event["type"] == CALL_FINISHED]
+
+    # Cardinal 3's hung vote is cut off by the deadline and still gets its finish event
+    assert {event["call_id"] for event in started} == {event["call_id"] for event in finished}
+    cancelled = [event for event in finished if not event["ok"]]
+    assert [(event["agent_id"], event["error"]) for event in cancelled] == [(3, "cancelled")]
+
+
+def test_emit_does_not_wait_for_the_writer():
+    with tempfile.TemporaryDirectory() as directory:
+        events = EventStream(directory, compress=False, batch_size=100)
+        writer_thread = events._thread
+        emitted_on = set()
+        for i in range(1000):
+            events.emit(BALLOT, round=1, agent_id=i, vote=0, reasoning="x" * 100)
+            emitted_on.add(threading.get_ident())
+        events.close()
+        assert writer_thread.ident not in emitted_on
+        assert events.stats["events"] == 1000
+        assert events.stats["batches"] >= 10
+        assert os.path.exists(os.path.join(directory, "events.jsonl"))
+        assert [event["agent_id"] for event in read_events(directory)] == list(range(1000))
+
+        # Reopening appends, and prompts already stored are not stored again
+        events = EventStream(directory, compress=False)
+        events.emit(CALL_STARTED, call_id=0, agent_id=0, call="cast_vote", prompt="same prompt")
+        events.emit(CALL_STARTED, call_id=1, agent_id=1, call="cast_vote", prompt="same prompt")
+        events.close()
+        events = EventStream(directory, compress=False)
+        events.emit(CALL_STARTED, call_id=2, agent_id=2, call="cast_vote", prompt="same prompt")
+        events.close()
+        assert len(list(read_events(directory))) == 1003
+        assert len(read_prompts(directory)) == 1
+        with open(os.path.join(directory, "prompts.jsonl"), encoding="utf-8") as f:
+            assert len(f.readlines()) == 1
+
+
+if __name__ == "__main__":
+    test_conclave_events()
+    test_cancelled_call_is_finished()
+    test_emit_does_not_wait_for_the_writer()
+    print("\nTest completed successfully!")
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that a full voting and discussion round works end to end
+against the local fake OpenRouter server, including injected 429s and 500s.
+"""
+
+import os
+
+from agents.base import Agent
+from benchmarks.fake_openrouter import FakeOpenRouter, FakeServerConfig
+from environments.conclave_env import ConclaveEnv
+
+
+def test_rounds_against_fake_server():
+    config = FakeServerConfig(latency_ms=5, rate_limit_rate=0.05, error_rate=0.05, retry_after=0.01, seed=7)
+    with FakeOpenRouter(config) as server:
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
+        try:
+            env = ConclaveEnv()
+            for i in range(30):
+                env.agents.append(Agent(agent_id=i, name=f"Cardinal {i}", background="Test background", env=env))
+            env.num_agents = len(env.agents)
+
+            env.run_discussion_round(num_speakers=3, random_selection=False)
+            env.run_voting_round()
+            env.engine.close()
+        finally:
+            del os.environ["OPENROUTER_BASE_URL"]
+
+        print(f"Server stats: {server.stats.requests} requests, {server.stats.rate_limited} rate limited, "
+              f"{server.stats.errors} errors")
+        assert len(env.discussionHistory[0]) == 3
+        assert sum(env.votingHistory[0].values()) == 30
+        assert server.stats.completions == 30 + 3 + 30
+
+
+if __name__ == "__main__":
+    test_rounds_against_fake_server()
+    print("\nTest completed successfully!")
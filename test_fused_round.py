@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that a fused round polls urgency and a provisional vote
+in one call per cardinal, casts the non-speakers' provisional votes, and has
+only the speakers vote again.
+"""
+
+from collections import Counter
+
+from test_async_engine import FakeCompletions, build_env
+
+
+class FusedCompletions(FakeCompletions):
+    """Urgency follows the agent id; cardinal 2 returns an invalid provisional vote."""
+
+    def __init__(self):
+        super().__init__(latency=0.0)
+        self.calls = Counter()
+
+    async def create(self, **kwargs):
+        self.calls[kwargs.get("tool_choice", {}).get("function", {}).get("name")] += 1
+        return await super().create(**kwargs)
+
+    def tool_arguments(self, tool_name: str, request: dict) -> dict:
+        if tool_name == "evaluate_urgency_and_vote":
+            prompt = request["messages"][0]["content"]
+            agent_id = int(prompt.split("You are Cardinal ")[1].split(".")[0])
+            candidate = 99 if agent_id == 2 else 1
+            return {"candidate": candidate, "explanation": "Provisional vote",
+                    "urgency_score": 10 * (agent_id + 1), "reasoning": "Test urgency"}
+        return super().tool_arguments(tool_name, request)
+
+
+def test_fused_round():
+    env, completions = build_env(num_agents=8, max_concurrency=16, latency=0.0, completions=FusedCompletions())
+    winner_found = env.run_fused_round(num_speakers=2)
+
+    # The two most urgent cardinals spoke
+    assert {comment['agent_id'] for comment in env.discussionHistory[0]} == {6, 7}
+    # 8 fused calls, 2 speeches and re-votes from the 2 speakers plus cardinal 2
+    assert completions.calls == Counter({"evaluate_urgency_and_vote": 8, "speak_message": 2, "cast_vote": 3})
+    assert env.votingHistory[0] == {1: 5, 0: 3}
+    assert winner_found is False
+    assert env.agents[0].vote_history == [{"round_index": 0, "vote": 1, "reasoning": "Provisional vote"}]
+    assert env.agents[2].vote_history[0]["vote"] == 0
+    assert env.agents[7].vote_history[0]["vote"] == 0
+    assert all(len(agent.vote_history) == 1 for agent in env.agents)
+    print(f"Calls per fused round: {dict(completions.calls)}")
+
+
+if __name__ == "__main__":
+    test_fused_round()
+    print("\nTest completed successfully!")
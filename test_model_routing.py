@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that each call type is sent with its own model, token
+allowance, temperature and timeout, and is capped by its own in-flight pool.
+"""
+
+import asyncio
+import json
+import os
+from collections import defaultdict
+
+from llm.routing import DEFAULT_MODEL, CallRoute, ModelRouter
+from test_async_engine import FakeCompletions, build_env
+
+
+class RecordingCompletions(FakeCompletions):
+    """Keeps every request and the peak in-flight count per call type."""
+
+    def __init__(self):
+        super().__init__(latency=0.02)
+        self.requests = defaultdict(list)
+        self.in_flight_by_type = defaultdict(int)
+        self.max_in_flight_by_type = defaultdict(int)
+
+    async def create(self, **kwargs):
+        tool_name = kwargs.get("tool_choice", {}).get("function", {}).get("name")
+        self.requests[tool_name].append(kwargs)
+        self.in_flight_by_type[tool_name] += 1
+        self.max_in_flight_by_type[tool_name] = max(self.max_in_flight_by_type[tool_name],
+                                                    self.in_flight_by_type[tool_name])
+        try:
+            return await super().create(**kwargs)
+        finally:
+            self.in_flight_by_type[tool_name] -= 1
+
+
+def test_calls_follow_their_route():
+    router = ModelRouter({
+        "evaluate_speaking_urgency": CallRoute(model="cheap/model", max_tokens=50, temperature=0.0,
+                                               timeout=5.0, max_concurrency=2)
+    })
+    env, completions = build_env(num_agents=8, max_concurrency=32, latency=0.0,
+                                 completions=RecordingCompletions(), router=router)
+    env.run_discussion_round(num_speakers=2, random_selection=False)
+
+    urgency = completions.requests["evaluate_speaking_urgency"]
+    assert len(urgency) == 8
+    assert all(r["model"] == "cheap/model" and r["max_tokens"] == 50 and r["temperature"] == 0.0 for r in urgency)
+    assert all(r["timeout"] == 5.0 for r in urgency)
+    assert completions.max_in_flight_by_type["evaluate_speaking_urgency"] == 2
+
+    speeches = completions.requests["speak_message"]
+    assert len(speeches) == 2
+    assert all(r["model"] == DEFAULT_MODEL and r["max_tokens"] == 1000 and "timeout" not in r for r in speeches)
+    print(f"Peak in flight per call type: {dict(completions.max_in_flight_by_type)}")
+
+
+def test_router_from_environ():
+    os.environ["CONCLAVE_MODEL_ROUTES"] = json.dumps({
+        "default": {"temperature": 0.2},
+        "speak_message": {"model": "big/model", "timeout": 90}
+    })
+    try:
+        router = ModelRouter.from_environ()
+    finally:
+        del os.environ["CONCLAVE_MODEL_ROUTES"]
+
+    assert router.route("cast_vote").temperature == 0.2
+    assert router.route("cast_vote").model == DEFAULT_MODEL
+    speak = router.route("speak_message")
+    assert (speak.model, speak.temperature, speak.timeout, speak.max_tokens) == ("big/model", 0.2, 90, 1000)
+
+    os.environ["CONCLAVE_MODEL_ROUTES"] = json.dumps({"cast_vote": {"modle": "typo"}})
+    try:
+        ModelRouter.from_environ()
+        assert False, "unknown route fields should be rejected"
+    except ValueError:
+        pass
+    finally:
+        del os.environ["CONCLAVE_MODEL_ROUTES"]
+
+
+def test_pools_rebind_to_new_loop():
+    router = ModelRouter({"cast_vote": CallRoute(max_concurrency=1)})
+
+    async def use():
+        async with router.limit("cast_vote") as route:
+            return route.max_concurrency
+
+    assert asyncio.run(use()) == 1
+    assert asyncio.run(use()) == 1
+
+
+if __name__ == "__main__":
+    test_calls_follow_their_route()
+    test_router_from_environ()
+    test_pools_rebind_to_new_loop()
+    print("\nTest completed successfully!")
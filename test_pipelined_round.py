@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that a pipelined round collects the non-speakers'
+votes while the speeches are still being generated, and otherwise matches a
+discussion round followed by a ballot.
+"""
+
+import asyncio
+import tempfile
+import time
+
+from environments.checkpoint import Checkpointer
+from test_async_engine import FakeCompletions, build_env
+
+
+class SlowSpeechCompletions(FakeCompletions):
+    """Speeches take much longer than votes, and every call is logged in completion order."""
+
+    def __init__(self):
+        super().__init__(latency=0.0)
+        self.finished = []
+
+    async def create(self, **kwargs):
+        tool_name = kwargs.get("tool_choice", {}).get("function", {}).get("name")
+        if tool_name == "speak_message":
+            await asyncio.sleep(0.2)
+        response = await super().create(**kwargs)
+        self.finished.append(tool_name)
+        return response
+
+
+def test_non_speakers_vote_during_discussion():
+    env, completions = build_env(num_agents=10, max_concurrency=32, latency=0.0,
+                                 completions=SlowSpeechCompletions())
+    winner_found = env.run_pipelined_round(num_speakers=3, random_selection=True)
+
+    speakers = {comment['agent_id'] for comment in env.discussionHistory[0]}
+    assert len(speakers) == 3
+    assert winner_found
+    assert env.votingRound == 1 and env.discussionRound == 1
+    assert env.votingHistory[0] == {0: 10}
+    assert all(len(agent.vote_history) == 1 for agent in env.agents)
+
+    # The 7 non-speaker votes finish before the first speech; the speakers vote last
+    first_speech = completions.finished.index("speak_message")
+    assert completions.finished[:first_speech] == ["cast_vote"] * 7
+    assert completions.finished[-3:] == ["cast_vote"] * 3
+    print(f"Call completion order: {completions.finished}")
+
+
+def test_pipelined_round_checkpoints_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpointer = Checkpointer(tmp)
+        env, _ = build_env(num_agents=6, max_concurrency=8, latency=0.0, checkpointer=checkpointer)
+        env.run_pipelined_round(num_speakers=2, random_selection=True)
+
+        with open(checkpointer.deltas_path) as f:
+            assert len(f.readlines()) == 1
+        resumed, _ = build_env(num_agents=6, max_concurrency=8, latency=0.0, checkpointer=Checkpointer(tmp))
+        assert resumed.checkpointer.load(resumed)
+        assert resumed.votingHistory == env.votingHistory
+        assert resumed.discussionHistory == env.discussionHistory
+
+
+class SlowVoteCompletions(SlowSpeechCompletions):
+    """Speeches take 0.2s and votes 0.3s."""
+
+    async def create(self, **kwargs):
+        if kwargs.get("tool_choice", {}).get("function", {}).get("name") == "cast_vote":
+            await asyncio.sleep(0.3)
+        return await super().create(**kwargs)
+
+
+def test_speakers_share_the_ballot_deadline():
+    env, _ = build_env(num_agents=10, max_concurrency=32, latency=0.0, completions=SlowVoteCompletions(),
+                       ballot_deadline=0.6, reask_batch_size=1)
+    start = time.perf_counter()
+    env.run_pipelined_round(num_speakers=3, random_selection=True)
+    elapsed = time.perf_counter() - start
+
+    # The speakers' votes would arrive 0.5s into the ballot, past its 0.45s first pass;
+    # re-asked, they would not arrive before the 0.6s deadline either
+    print(f"Pipelined ballot with a 0.6s deadline took {elapsed:.2f}s")
+    assert elapsed < 0.7
+    speakers = {comment['agent_id'] for comment in env.discussionHistory[0]}
+    assert set(env.ballots.abstentions[0]) == speakers
+
+
+def test_failed_discussion_cancels_early_votes():
+    env, _ = build_env(num_agents=10, max_concurrency=32, latency=0.1)
+
+    async def failing_discussion(num_speakers, random_selection, on_speakers_selected, checkpoint):
+        on_speakers_selected(env.agents[:2])
+        await asyncio.sleep(0)
+        raise RuntimeError("Discussion failed")
+
+    env.run_discussion_round_async = failing_discussion
+    try:
+        env.run_pipelined_round(num_speakers=2, random_selection=True)
+        assert False, "the discussion error was swallowed"
+    except RuntimeError:
+        pass
+
+    # No vote lands in the ballot after the round has failed
+    env.engine.run(asyncio.sleep(0.2))
+    assert env.ballots.missing(list(range(10))) == list(range(10))
+
+
+if __name__ == "__main__":
+    test_non_speakers_vote_during_discussion()
+    test_pipelined_round_checkpoints_once()
+    test_speakers_share_the_ballot_deadline()
+    test_failed_discussion_cancels_early_votes()
+    print("\nTest completed successfully!")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that incrementally rendered prompt history matches the
+history rebuilt from scratch every round.
+"""
+
+import random
+from types import SimpleNamespace
+
+from environments.ballots import BallotStore
+from test_async_engine import build_env
+
+
+def reference_vote_history(agent) -> str:
+    if not agent.vote_history:
+        return ""
+    vote_history_str = "\n".join([f"In round {vote['round_index'] + 1}, you voted for {agent.env.agents[vote['vote']].name} for the following reason:\n{vote['reasoning']}" for vote in agent.vote_history])
+    return f"Your vote history:\n{vote_history_str}\n"
+
+
+def reference_voting_results_history(env) -> str:
+    def promptize_voting_results(results):
+        voting_results = sorted(results.items(), key=lambda x: x[1], reverse=True)
+        if results:
+            voting_results_str = "\n".join([f"Cardinal {i} - {env.agents[i].name}: {votes}" for i, votes in voting_results])
+            return f"\n{voting_results_str}\n"
+        return ""
+
+    if not env.votingHistory:
+        return ""
+    voting_results_history_str = "\n".join([f"Round {i+1}: {promptize_voting_results(result)}" for i, result in enumerate(env.votingHistory)])
+    return f"Previous ballot results:\n{voting_results_history_str}"
+
+
+def reference_discussion_history(env, agent_id=None) -> str:
+    def render(round_index, comments):
+        round_str = f"Discussion Round {round_index + 1}:\n"
+        for comment in comments:
+            round_str += f"Cardinal {comment['agent_id']} - {env.agents[comment['agent_id']].name}:\n{comment['message']}\n\n"
+        return round_str + "\n"
+
+    if agent_id is None:
+        return "".join(render(i, comments) for i, comments in enumerate(env.discussionHistory))
+    rounds = env.agent_discussion_participation.get(agent_id, [])
+    return "".join(render(i, env.discussionHistory[i]) for i in rounds if i < len(env.discussionHistory))
+
+
+def test_incremental_rendering_matches_reference():
+    rng = random.Random(3)
+    env, _ = build_env(num_agents=8, max_concurrency=8, latency=0.0)
+
+    for round_index in range(6):
+        # Simulate a discussion round with a random subset of speakers
+        speakers = rng.sample(range(env.num_agents), 3)
+        env.discussionHistory.append([{"agent_id": i, "message": f"Speech {round_index}/{i}"} for i in speakers])
+        for i in speakers:
+            env.agent_discussion_participation.setdefault(i, []).append(round_index)
+
+        # Simulate a ballot
+        results = {}
+        for agent in env.agents:
+            vote = rng.randrange(env.num_agents)
+            agent.record_vote(vote, f"Reason {round_index}")
+            results[vote] = results.get(vote, 0) + 1
+        env.ballots.close_round()
+        env.votingHistory.append(results)
+
+        # Query twice per round to exercise the memoized path
+        for _ in range(2):
+            assert env.promptize_voting_results_history() == reference_voting_results_history(env)
+            assert env.get_discussion_history() == reference_discussion_history(env)
+            for agent in env.agents:
+                assert agent.promptize_vote_history() == reference_vote_history(agent)
+                assert agent.promptize_voting_results_history() == reference_voting_results_history(env)
+                assert env.get_discussion_history(agent.agent_id) == reference_discussion_history(env, agent.agent_id)
+
+    # Replacing history wholesale (e.g. on resume) must not serve stale text
+    env.votingHistory = env.votingHistory[:2]
+    ballots = env.ballots
+    env.ballots = BallotStore(env.num_agents)
+    env.ballots.load_rounds(ballots.matrix[:1].tolist(), ballots.reasoning[:1])
+    assert len(env.agents[0].vote_history) == 1
+    assert env.promptize_voting_results_history() == reference_voting_results_history(env)
+    assert env.agents[0].promptize_vote_history() == reference_vote_history(env.agents[0])
+
+
+def test_vote_history_labels_rounds_after_an_abstention():
+    env, _ = build_env(num_agents=3, max_concurrency=8, latency=0.0)
+    agent = env.agents[0]
+    agent.record_vote(1, "First")
+    env.ballots.close_round()
+    env.ballots.record_abstention(agent.agent_id, "timed out")
+    env.ballots.close_round()
+    agent.record_vote(2, "Third")
+
+    history = agent.promptize_vote_history()
+    assert "In round 1, you voted for Cardinal 1" in history
+    assert "In round 3, you voted for Cardinal 2" in history
+    assert "In round 2" not in history
+
+
+def test_stable_layout_keeps_a_fixed_prefix():
+    env, _ = build_env(num_agents=8, max_concurrency=8, latency=0.0, prompt_layout="stable")
+    agent, other = env.agents[0], env.agents[1]
+
+    first = agent.build_prompt("Round one")
+    env.votingHistory.append({0: 8})
+    second = agent.build_prompt("Round two")
+
+    assert first[0]["role"] == "system" and first[1] == {"role": "user", "content": "Round one"}
+    assert first[0] == second[0]
+    assert agent.name in first[0]["content"]
+    assert other.build_prompt("Round two")[0] != first[0]
+
+    inline_env, _ = build_env(num_agents=8, max_concurrency=8, latency=0.0)
+    prompt = inline_env.agents[0].build_prompt("Body")
+    assert isinstance(prompt, str)
+    assert prompt.startswith("You are Cardinal 0.") and prompt.endswith("\n\nBody")
+
+
+def test_cached_tokens_are_recorded():
+    env, _ = build_env(num_agents=1, max_concurrency=8, latency=0.0)
+    usage = SimpleNamespace(prompt_tokens=1200, completion_tokens=50,
+                            prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+    env.record_usage(usage)
+    env.record_usage(SimpleNamespace(prompt_tokens=100, completion_tokens=10, prompt_tokens_details=None))
+
+    assert env.token_usage == {"requests": 2, "prompt_tokens": 1300, "completion_tokens": 60, "cached_tokens": 1024}
+    print(env.usage_summary())
+
+
+if __name__ == "__main__":
+    test_incremental_rendering_matches_reference()
+    test_vote_history_labels_rounds_after_an_abstention()
+    test_stable_layout_keeps_a_fixed_prefix()
+    test_cached_tokens_are_recorded()
+    print("\nTest completed successfully!")
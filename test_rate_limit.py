@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the shared rate limiter: token-bucket admission, AIMD
+concurrency adjustment, Retry-After parsing and that no ballots are lost when
+the provider answers with many 429s.
+"""
+
+import asyncio
+import os
+import random
+import time
+
+import httpx
+import openai
+
+from agents.base import Agent
+from benchmarks.fake_openrouter import FakeOpenRouter, FakeServerConfig
+from environments.conclave_env import ConclaveEnv
+from llm.rate_limit import RateLimiter, TokenBucket, is_rate_limit_error, is_transient_error, parse_retry_after
+
+
+def make_status_error(status: int, headers=None) -> openai.APIStatusError:
+    request = httpx.Request("POST", "http://test/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    error_class = openai.RateLimitError if status == 429 else openai.InternalServerError
+    return error_class(f"Error code: {status}", response=response, body=None)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(per_minute=60, burst=2)
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == 0.0
+    # The bucket is empty; the next request waits about one refill interval
+    wait = bucket.reserve(1)
+    print(f"Wait after burst: {wait:.2f}s")
+    assert 0.9 < wait <= 1.0
+
+
+def test_aimd_adjustment():
+    limiter = RateLimiter(max_concurrency=16)
+    limiter.on_rate_limited()
+    assert int(limiter.concurrency_limit) == 8
+    # A second 429 from the same burst does not halve the limit again
+    limiter.on_rate_limited(retry_after=0.5)
+    assert int(limiter.concurrency_limit) == 8
+    assert limiter.rate_limited == 2
+    assert limiter._resume_at > time.monotonic()
+
+    # Roughly one extra slot per window of limit-many successes
+    for _ in range(9):
+        limiter.on_success()
+    assert int(limiter.concurrency_limit) == 9
+    for _ in range(1000):
+        limiter.on_success()
+    assert limiter.concurrency_limit == 16
+
+
+def test_slot_respects_limit():
+    limiter = RateLimiter(max_concurrency=4)
+    limiter.concurrency_limit = 2
+    max_in_flight = 0
+
+    async def request():
+        nonlocal max_in_flight
+        async with limiter.slot():
+            max_in_flight = max(max_in_flight, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(10)))
+
+    asyncio.run(run())
+    print(f"Max in flight: {max_in_flight}")
+    assert max_in_flight == 2
+    assert limiter.in_flight == 0
+
+
+def test_backoff_and_retry_after():
+    limiter = RateLimiter(max_concurrency=4, backoff_base=0.5, backoff_cap=2.0)
+    for attempt in range(1, 10):
+        assert 0 <= limiter.backoff_delay(attempt) <= 2.0
+    assert limiter.backoff_delay(1, retry_after=5.0) == 5.0
+
+    # Jitter leaves the seeded global RNG alone, so retries do not change a replay's shuffles
+    random.seed(5)
+    expected = random.random()
+    random.seed(5)
+    limiter.backoff_delay(3)
+    assert random.random() == expected
+
+    assert parse_retry_after(make_status_error(429, {"Retry-After": "3"})) == 3.0
+    assert parse_retry_after(make_status_error(429, {"retry-after-ms": "250"})) == 0.25
+    assert parse_retry_after(make_status_error(429)) is None
+    assert is_rate_limit_error(make_status_error(429))
+    assert not is_transient_error(make_status_error(429))
+    assert is_transient_error(make_status_error(503))
+    assert not is_rate_limit_error(ValueError("Invalid vote"))
+    # Status codes come from the response, not from digits that happen to be in a message
+    assert not is_rate_limit_error(ValueError("Prompt of 1429 tokens"))
+    assert not is_transient_error(ValueError("No vote from cardinal 500"))
+
+
+def test_no_ballots_lost_under_rate_limits():
+    config = FakeServerConfig(latency_ms=5, rate_limit_rate=0.3, retry_after=0.01, seed=3)
+    with FakeOpenRouter(config) as server:
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
+        try:
+            limiter = RateLimiter(max_concurrency=32, max_retries=20, backoff_base=0.01, backoff_cap=0.05)
+            env = ConclaveEnv(rate_limiter=limiter)
+            for i in range(40):
+                env.agents.append(Agent(agent_id=i, name=f"Cardinal {i}", background="Test background", env=env))
+            env.num_agents = len(env.agents)
+
+            env.run_voting_round()
+            env.engine.close()
+        finally:
+            del os.environ["OPENROUTER_BASE_URL"]
+
+        print(f"Server stats: {server.stats.requests} requests, {server.stats.rate_limited} rate limited; "
+              f"concurrency limit now {limiter.concurrency_limit:.1f}")
+        assert server.stats.rate_limited > 0
+        assert limiter.rate_limited == server.stats.rate_limited
+        assert limiter.concurrency_limit < 32
+        assert sum(env.votingHistory[0].values()) == 40
+
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_aimd_adjustment()
+    test_slot_respects_limit()
+    test_backoff_and_retry_after()
+    test_no_ballots_lost_under_rate_limits()
+    print("\nTest completed successfully!")
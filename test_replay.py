@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that a recorded conclave replays identically with no network,
+including concurrent calls that finish out of order, calls that failed and
+calls that were cut off by the ballot deadline.
+"""
+
+import asyncio
+import os
+import random
+import re
+import tempfile
+import time
+
+from llm.replay import TraceRecorder, TraceReplayer
+from test_async_engine import FakeCompletions, build_env
+from test_ballot_deadline import FlakyCompletions, build
+
+
+class RandomCompletions(FakeCompletions):
+    """Fake completions whose answers vary from run to run, like a real model."""
+
+    def __init__(self):
+        super().__init__(latency=0.0)
+        self.rng = random.Random()
+
+    def tool_arguments(self, tool_name: str, request: dict) -> dict:
+        if tool_name == "evaluate_speaking_urgency":
+            return {"urgency_score": self.rng.randint(1, 100), "reasoning": "Test urgency"}
+        if tool_name == "speak_message":
+            return {"message": f"Speech {self.rng.random()}"}
+        return {"candidate": self.rng.randrange(6), "explanation": "Test vote"}
+
+
+def run_conclave(env, rounds: int = 3):
+    for _ in range(rounds):
+        env.run_discussion_round(num_speakers=2, random_selection=True)
+        env.run_discussion_round(num_speakers=2, random_selection=False)
+        env.run_voting_round()
+    return env
+
+
+def test_record_then_replay():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.jsonl.gz")
+
+        recorder = TraceRecorder(path, seed=1234)
+        recorded, _ = build_env(num_agents=6, max_concurrency=8, latency=0.0,
+                                completions=RandomCompletions(), recorder=recorder)
+        run_conclave(recorded)
+        recorder.close()
+
+        # Scramble the global RNG to prove the replay restores it from the trace
+        random.seed(99)
+        replayer = TraceReplayer(path)
+        replayed, _ = build_env(num_agents=6, max_concurrency=8, latency=0.0,
+                                completions=RandomCompletions(), replayer=replayer)
+        for agent in replayed.agents:
+            agent.client = None
+        run_conclave(replayed)
+
+        assert replayer.seed == 1234
+        assert replayer.divergences == 0
+        assert replayed.votingHistory == recorded.votingHistory
+        assert replayed.discussionHistory == recorded.discussionHistory
+        assert [a.vote_history for a in replayed.agents] == [a.vote_history for a in recorded.agents]
+        print(f"Replayed {len(recorded.votingHistory)} ballots identically")
+
+
+class OutOfOrderCompletions(RandomCompletions):
+    """
+    Answers the secretary's vote batches in reverse order of sending, and
+    fails the first vote of cardinal 3 for good, so it is re-asked.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.failed = False
+
+    async def create(self, **kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        if kwargs["tool_choice"]["function"]["name"] == "cast_votes":
+            first = int(re.search(r"^=== Cardinal (\d+):", prompt, re.MULTILINE).group(1))
+            await asyncio.sleep(0.05 * (6 - first) / 2)
+        elif "You are Cardinal 3." in kwargs["messages"][0]["content"] and not self.failed:
+            self.failed = True
+            raise ValueError("Invalid request")
+        return await super().create(**kwargs)
+
+    def tool_arguments(self, tool_name: str, request: dict) -> dict:
+        if tool_name != "cast_votes":
+            return super().tool_arguments(tool_name, request)
+        prompt = request["messages"][-1]["content"]
+        cardinal_ids = [int(c) for c in re.findall(r"^=== Cardinal (\d+):", prompt, re.MULTILINE)]
+        return {"votes": [{"cardinal_id": c, "candidate": self.rng.randrange(6), "explanation": f"Vote of {c}"}
+                          for c in cardinal_ids]}
+
+
+def test_replay_out_of_order_and_failed_calls():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.jsonl.gz")
+
+        recorder = TraceRecorder(path, seed=42)
+        recorded, _ = build_env(num_agents=6, max_concurrency=8, latency=0.0,
+                                completions=OutOfOrderCompletions(), recorder=recorder)
+        recorded.secretary.client = recorded.agents[0].client
+        recorded.agents[3].cast_vote()
+        assert 3 in recorded.vote_failures
+        for _ in range(2):
+            recorded.run_voting_round(batch_size=2)
+        recorder.close()
+
+        replayer = TraceReplayer(path)
+        replayed, _ = build_env(num_agents=6, max_concurrency=8, latency=0.0,
+                                completions=OutOfOrderCompletions(), replayer=replayer)
+        for agent in replayed.agents + [replayed.secretary]:
+            agent.client = None
+        replayed.agents[3].cast_vote()
+        assert replayed.vote_failures == recorded.vote_failures
+        for _ in range(2):
+            replayed.run_voting_round(batch_size=2)
+
+        assert replayer.divergences == 0
+        assert replayed.votingHistory == recorded.votingHistory
+        assert [a.vote_history for a in replayed.agents] == [a.vote_history for a in recorded.agents]
+
+
+def test_replay_interrupted_trace():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.jsonl.gz")
+        recorder = TraceRecorder(path, seed=7)
+        recorded, _ = build_env(num_agents=4, max_concurrency=8, latency=0.0,
+                                completions=RandomCompletions(), recorder=recorder)
+        recorded.run_voting_round()
+
+        # A killed run leaves the gzip stream without its end marker
+        killed = os.path.join(tmp, "killed.jsonl.gz")
+        with open(path, "rb") as source, open(killed, "wb") as target:
+            target.write(source.read())
+        recorder.close()
+
+        replayer = TraceReplayer(killed)
+        replayed, _ = build_env(num_agents=4, max_concurrency=8, latency=0.0,
+                                completions=RandomCompletions(), replayer=replayer)
+        replayed.run_voting_round()
+        assert replayed.votingHistory == recorded.votingHistory
+
+
+def test_replay_cut_off_call():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.jsonl.gz")
+        recorder = TraceRecorder(path, seed=3)
+        recorded = build(FlakyCompletions(hang={3}), ballot_deadline=1.0, recorder=recorder)
+        recorded.run_voting_round()
+        recorder.close()
+
+        # Cardinal 3's cut-off vote fails at once instead of waiting out the deadline again
+        replayed = build(FlakyCompletions(), ballot_deadline=1.0, replayer=TraceReplayer(path))
+        for agent in replayed.agents + [replayed.secretary]:
+            agent.client = None
+        start = time.perf_counter()
+        replayed.run_voting_round()
+        assert time.perf_counter() - start < 0.5
+        assert replayed.votingHistory == recorded.votingHistory
+
+
+if __name__ == "__main__":
+    test_record_then_replay()
+    test_replay_out_of_order_and_failed_calls()
+    test_replay_interrupted_trace()
+    test_replay_cut_off_call()
+    print("\nTest completed successfully!")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the on-disk response cache: keying, modes, LRU eviction
+and that agents skip the network on a cache hit.
+"""
+
+import os
+import tempfile
+
+from llm.cache import LOW_WATER_MARK, ResponseCache
+from test_async_engine import build_env
+
+
+def make_request(content: str) -> dict:
+    return {
+        "model": "openai/gpt-4o-mini",
+        "messages": [{"role": "user", "content": content}],
+        "max_tokens": 1000,
+        "temperature": 0.5
+    }
+
+
+def test_key_ignores_unrelated_fields():
+    first = make_request("hello")
+    second = dict(first, max_tokens=10)
+    third = dict(first, temperature=0.9)
+
+    assert ResponseCache.make_key(first) == ResponseCache.make_key(second)
+    assert ResponseCache.make_key(first) != ResponseCache.make_key(third)
+
+
+def test_modes_and_counters():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "responses.sqlite")
+        cache = ResponseCache(path=path)
+        key = cache.make_key(make_request("hello"))
+        assert cache.get(key) is None
+        cache.put(key, {"role": "assistant", "content": "hi"})
+        assert cache.get(key) == {"role": "assistant", "content": "hi"}
+        assert (cache.hits, cache.misses) == (1, 1)
+        cache.close()
+
+        read_only = ResponseCache(path=path, mode="read-only")
+        other = read_only.make_key(make_request("other"))
+        read_only.put(other, {"role": "assistant", "content": "nope"})
+        assert read_only.get(other) is None
+        assert read_only.get(key) is not None
+        read_only.close()
+
+        bypass = ResponseCache(path=path, mode="bypass")
+        assert bypass.get(key) is None
+
+
+def test_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(path=os.path.join(tmp, "responses.sqlite"), max_bytes=400)
+        keys = [cache.make_key(make_request(f"prompt {i}")) for i in range(20)]
+        for i, key in enumerate(keys):
+            evictions = cache.evictions
+            cache.put(key, {"role": "assistant", "content": os.urandom(16).hex() + str(i)})
+            if cache.evictions > evictions:
+                # Eviction frees space down to the low-water mark, not just enough for this put
+                assert cache.stats()["bytes"] <= 400 * LOW_WATER_MARK
+            # Keep the first entry hot so it survives eviction
+            cache.get(keys[0])
+
+        print(f"Cache stats after eviction: {cache.stats()}")
+        assert cache.evictions > 0
+        assert cache.stats()["bytes"] <= 400
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None
+
+
+def test_agent_cache_hit_skips_network():
+    with tempfile.TemporaryDirectory() as tmp:
+        env, completions = build_env(num_agents=1, max_concurrency=8, latency=0.0)
+        env.response_cache = ResponseCache(path=os.path.join(tmp, "responses.sqlite"))
+        agent = env.agents[0]
+
+        calls = []
+        original_create = completions.create
+
+        async def counting_create(**kwargs):
+            calls.append(kwargs)
+            return await original_create(**kwargs)
+
+        completions.create = counting_create
+        first = agent._invoke_claude("same prompt")
+        second = agent._invoke_claude("same prompt")
+
+        assert len(calls) == 1
+        assert second.tool_calls[0].function.arguments == first.tool_calls[0].function.arguments
+        assert env.response_cache.hits == 1
+
+
+def test_identical_runs_hit_the_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "responses.sqlite")
+        first, _ = build_env(num_agents=5, max_concurrency=8, latency=0.0,
+                             response_cache=ResponseCache(path=path))
+        # The default inline layout would reshuffle the candidates of every prompt
+        assert first.prompt_layout == "stable"
+        first.run_voting_round()
+
+        second, _ = build_env(num_agents=5, max_concurrency=8, latency=0.0,
+                              response_cache=ResponseCache(path=path))
+        second.run_voting_round()
+        assert second.response_cache.hits == 5 and second.response_cache.misses == 0
+        assert second.votingHistory == first.votingHistory
+
+
+if __name__ == "__main__":
+    test_key_ignores_unrelated_fields()
+    test_modes_and_counters()
+    test_lru_eviction()
+    test_agent_cache_hit_skips_network()
+    test_identical_runs_hit_the_cache()
+    print("\nTest completed successfully!")
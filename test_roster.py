@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that the roster is read without pandas, seats every
+cardinal in file order, and that importing the agents defers openai, httpx,
+pandas and dotenv until a request actually needs them.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from environments.conclave_env import ConclaveEnv
+from environments.roster import load_roster, seat_cardinals
+
+
+def test_roster_in_file_order():
+    roster = load_roster()
+    assert len(roster) == 133
+    assert roster[0].agent_id == 0 and roster[0].name == "Pietro Parolin"
+    assert [cardinal.agent_id for cardinal in roster] == list(range(133))
+    assert all(cardinal.background for cardinal in roster)
+    assert load_roster(limit=20) == roster[:20]
+
+
+def test_seat_full_conclave():
+    # Agents check for the key when they are built, though nothing is sent here
+    os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
+    start = time.perf_counter()
+    env = ConclaveEnv()
+    seat_cardinals(env, load_roster())
+    elapsed = time.perf_counter() - start
+    print(f"Seated {env.num_agents} cardinals in {elapsed * 1000:.1f}ms")
+    assert env.num_agents == 133
+    assert [agent.agent_id for agent in env.agents] == list(range(133))
+    assert env.agents[0].name == "Pietro Parolin"
+
+
+def test_agents_import_lazily():
+    probe = ("import sys, agents.base, environments.roster; "
+             "print(' '.join(m for m in ('openai', 'httpx', 'pandas', 'dotenv') if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout.split()
+    assert loaded == [], f"imported at startup: {loaded}"
+
+
+if __name__ == "__main__":
+    test_roster_in_file_order()
+    test_seat_full_conclave()
+    test_agents_import_lazily()
+    print("\nTest completed successfully!")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that speeches are streamed: their text reaches the live
+feed while it is being generated, the finished speech matches a non-streamed
+one, and observers of the server-sent-event feed receive it.
+"""
+
+import asyncio
+import json
+import urllib.request
+from types import SimpleNamespace
+
+from environments.feed import SPEECH_DELTA, SPEECH_STARTED, ProgressFeed
+from llm.streaming import ToolArgumentStream
+from test_async_engine import FakeCompletions, build_env
+
+SPEECH = 'Brothers, the Church needs a "shepherd"\nwho listens. Café talk is not enough.'
+
+
+class StreamingCompletions(FakeCompletions):
+    """Streams speeches in small argument fragments, one every few milliseconds."""
+
+    def __init__(self, fragment_size: int = 5, delay: float = 0.005):
+        super().__init__(latency=0.0)
+        self.fragment_size = fragment_size
+        self.delay = delay
+        self.streamed = 0
+
+    def tool_arguments(self, tool_name: str, request: dict) -> dict:
+        if tool_name == "speak_message":
+            return {"message": SPEECH}
+        return super().tool_arguments(tool_name, request)
+
+    async def create(self, **kwargs):
+        if not kwargs.get("stream"):
+            return await super().create(**kwargs)
+        assert kwargs["stream_options"] == {"include_usage": True}
+        self.streamed += 1
+        tool_name = kwargs["tool_choice"]["function"]["name"]
+        arguments = json.dumps(self.tool_arguments(tool_name, kwargs))
+        return self._chunks(tool_name, arguments)
+
+    async def _chunks(self, tool_name: str, arguments: str):
+        def chunk(**call):
+            delta = SimpleNamespace(content=None, tool_calls=[SimpleNamespace(index=0, **call)])
+            return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+        yield chunk(id="call_0", function=SimpleNamespace(name=tool_name, arguments=""))
+        for i in range(0, len(arguments), self.fragment_size):
+            await asyncio.sleep(self.delay)
+            yield chunk(id=None, function=SimpleNamespace(name=None, arguments=arguments[i:i + self.fragment_size]))
+        yield SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50,
+                                                                prompt_tokens_details=None))
+
+
+def test_tool_argument_stream_decodes_escapes():
+    pieces = []
+    stream = ToolArgumentStream("message", pieces.append)
+    arguments = json.dumps({"message": "Line one\nLine \"two\" é \U0001F54A", "other": "x"})
+    for i in range(len(arguments)):
+        stream.feed(arguments[i])
+    assert stream.text == json.loads(arguments)["message"]
+    assert "".join(pieces) == stream.text
+    assert len(pieces) > 10
+
+
+def test_speeches_stream_to_feed():
+    feed = ProgressFeed(port=0)
+    published = []
+    original_publish = feed.publish
+
+    def record(event_type, **fields):
+        published.append((event_type, fields))
+        original_publish(event_type, **fields)
+    feed.publish = record
+
+    try:
+        env, completions = build_env(num_agents=6, max_concurrency=16, latency=0.0,
+                                     completions=StreamingCompletions(), feed=feed)
+        assert env.stream_speeches
+        env.run_discussion_round(num_speakers=2, random_selection=True)
+
+        assert completions.streamed == 2
+        assert [comment["message"] for comment in env.discussionHistory[0]] == [SPEECH, SPEECH]
+        assert env.token_usage["completion_tokens"] == 100
+
+        types = [event_type for event_type, _ in published]
+        assert types.count(SPEECH_STARTED) == 2
+        for agent_id in {comment["agent_id"] for comment in env.discussionHistory[0]}:
+            deltas = [fields["text"] for event_type, fields in published
+                      if event_type == SPEECH_DELTA and fields["agent_id"] == agent_id]
+            assert len(deltas) > 5
+            assert "".join(deltas) == SPEECH
+        # The text arrives before the finished speech is published
+        assert types.index(SPEECH_DELTA) < types.index("speech")
+        speech_events = [fields for event_type, fields in published if event_type == "speech"]
+        assert all(fields["time_to_first_text"] is not None for fields in speech_events)
+
+        # A late observer is sent the history of the round
+        with urllib.request.urlopen(f"http://127.0.0.1:{feed.port}/events", timeout=5) as response:
+            assert response.headers["Content-Type"] == "text/event-stream"
+            lines = [response.readline().decode("utf-8") for _ in range(6)]
+        assert lines[0] == "event: discussion_started\n"
+        assert lines[3] == f"event: {SPEECH_STARTED}\n"
+    finally:
+        feed.close()
+
+
+def test_no_streaming_without_feed():
+    env, completions = build_env(num_agents=4, max_concurrency=16, latency=0.0,
+                                 completions=StreamingCompletions())
+    assert not env.stream_speeches
+    env.run_discussion_round(num_speakers=2, random_selection=True)
+    assert completions.streamed == 0
+    assert [comment["message"] for comment in env.discussionHistory[0]] == [SPEECH, SPEECH]
+
+
+if __name__ == "__main__":
+    test_tool_argument_stream_decodes_escapes()
+    test_speeches_stream_to_feed()
+    test_no_streaming_without_feed()
+    print("\nTest completed successfully!")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that rounds, phases and calls are traced as nested spans
+in the Chrome trace format, that concurrent spans never overlap on one track,
+and that the critical path names the straggler of each phase.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from collections import defaultdict
+
+from environments.tracing import CALL, PHASE, QUEUE, REQUEST, ROUND, TALLY, TRACE_FILE, Tracer, critical_path, read_trace
+from test_async_engine import FakeCompletions, build_env
+
+
+class StragglerCompletions(FakeCompletions):
+    """Answers every request at once, except cardinal 3's votes, which take 0.2s."""
+
+    async def create(self, **kwargs):
+        if kwargs["tool_choice"]["function"]["name"] == "cast_vote" and \
+                "You are Cardinal 3." in kwargs["messages"][0]["content"]:
+            await asyncio.sleep(0.2)
+        return await super().create(**kwargs)
+
+
+def assert_tracks_nest(spans):
+    """Spans on one track are either disjoint or nested."""
+    by_track = defaultdict(list)
+    for span in spans:
+        by_track[span["tid"]].append((span["ts"], span["ts"] + span["dur"]))
+    for intervals in by_track.values():
+        open_ends = []
+        for start, end in sorted(intervals, key=lambda interval: (interval[0], -interval[1])):
+            while open_ends and open_ends[-1] <= start:
+                open_ends.pop()
+            assert not open_ends or end <= open_ends[-1] + 1, "overlapping spans on one track"
+            open_ends.append(end)
+
+
+def test_pipelined_round_is_traced():
+    with tempfile.TemporaryDirectory() as directory:
+        tracer = Tracer(directory)
+        env, _ = build_env(num_agents=8, max_concurrency=16, latency=0.01,
+                           completions=StragglerCompletions(latency=0.01), tracer=tracer)
+        env.run_pipelined_round(num_speakers=2, random_selection=True)
+        tracer.close()
+
+        with open(os.path.join(directory, TRACE_FILE), encoding="utf-8") as f:
+            assert json.load(f)[0]["name"] == "process_name"
+        spans = read_trace(directory)
+
+    by_id = {span["args"]["span_id"]: span for span in spans}
+    rounds = [span for span in spans if span["cat"] == ROUND]
+    assert sorted(span["name"] for span in rounds) == ["discussion_round", "pipelined_round"]
+    phases = {span["name"] for span in spans if span["cat"] == PHASE}
+    assert phases == {"Collecting Discussion", "Collecting Non-Speaker Votes", "Collecting Speaker Votes"}
+    assert [span["name"] for span in spans if span["cat"] == TALLY] == ["tally"]
+
+    calls = [span for span in spans if span["cat"] == CALL]
+    assert sorted(span["name"] for span in calls).count("cast_vote") == 8
+    for call in calls:
+        # Every call sits in a phase, and its request in the call
+        assert by_id[call["args"]["parent_id"]]["cat"] == PHASE
+        parts = [span for span in spans if span["args"].get("parent_id") == call["args"]["span_id"]]
+        assert {span["cat"] for span in parts} == {QUEUE, REQUEST}
+        assert all(span["tid"] == call["tid"] for span in parts)
+    assert_tracks_nest(spans)
+
+    path = critical_path(spans)
+    print(path)
+    assert path.startswith("pipelined_round 1:")
+    assert "straggler: cast_vote of Cardinal 3" in path
+
+
+def test_no_tracer_no_spans():
+    env, _ = build_env(num_agents=4, max_concurrency=16, latency=0.0)
+    assert env.tracer is None
+    assert env.run_voting_round()
+
+
+if __name__ == "__main__":
+    test_pipelined_round_is_traced()
+    test_no_tracer_no_spans()
+    print("\nTest completed successfully!")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that sampled urgency polling asks only k cardinals per
+round and lets earlier scores compete after decay.
+"""
+
+import random
+
+from environments.speaker_selection import UrgencySampler
+from test_async_engine import build_env
+from test_fused_round import FusedCompletions
+
+
+class UrgencyByIdCompletions(FusedCompletions):
+    """The urgency of a cardinal is 10 times its id plus 10."""
+
+    def tool_arguments(self, tool_name: str, request: dict) -> dict:
+        if tool_name == "evaluate_speaking_urgency":
+            prompt = request["messages"][0]["content"]
+            agent_id = int(prompt.split("You are Cardinal ")[1].split(".")[0])
+            return {"urgency_score": 10 * (agent_id + 1), "reasoning": "Test urgency"}
+        return super().tool_arguments(tool_name, request)
+
+
+def build_sampled_env(sampler: UrgencySampler):
+    return build_env(num_agents=10, max_concurrency=16, latency=0.0, completions=UrgencyByIdCompletions(),
+                     urgency_sampler=sampler)
+
+
+def test_random_sampling_polls_k_agents():
+    random.seed(7)
+    sampler = UrgencySampler("random", sample_size=3, decay=0.5)
+    env, completions = build_sampled_env(sampler)
+
+    env.run_discussion_round(num_speakers=2, random_selection=False)
+    assert completions.calls["evaluate_speaking_urgency"] == 3
+    assert len(env.discussionHistory[0]) == 2
+    first_polled = set(sampler._scores)
+
+    env.run_discussion_round(num_speakers=2, random_selection=False)
+    assert completions.calls["evaluate_speaking_urgency"] == 6
+    assert sampler.stats["saved"] == 14
+    # Every speaker was scored, freshly or from the previous round
+    for comment in env.discussionHistory[1]:
+        assert comment['agent_id'] in sampler._scores
+    assert first_polled <= set(sampler._scores)
+    print(f"Sampling stats: {sampler.stats}")
+
+
+def test_decayed_scores_compete():
+    sampler = UrgencySampler("random", sample_size=10, decay=0.5)
+    env, _ = build_sampled_env(sampler)
+    env.run_discussion_round(num_speakers=2, random_selection=False)
+    assert {comment['agent_id'] for comment in env.discussionHistory[0]} == {8, 9}
+
+    # Only cardinal 0 is polled next: 10 fresh against 45 and 50 decayed
+    sampler.sample_size = 1
+    sampler.select_agents_to_poll = lambda env: [env.agents[0]]
+    env.run_discussion_round(num_speakers=2, random_selection=False)
+    assert {comment['agent_id'] for comment in env.discussionHistory[1]} == {8, 9}
+    assert sampler.stats["speakers_from_memory"] == 2
+
+
+def test_targeted_sampling_prefers_front_runners_and_switchers():
+    random.seed(3)
+    sampler = UrgencySampler("targeted", sample_size=4, front_runners=2)
+    env, _ = build_sampled_env(sampler)
+    # Cardinal 2 switches from 5 to 7; the rest keep their vote
+    first = [5, 5, 5, 5, 5, 5, 7, 7, 7, 1]
+    second = [5, 5, 7, 5, 5, 5, 7, 7, 7, 1]
+    for votes in (first, second):
+        for agent_id, candidate in enumerate(votes):
+            env.cast_vote(agent_id, candidate)
+        env.ballots.close_round()
+        env.votingHistory.append(env.ballots.counts(env.ballots.tally(env.ballots.rounds - 1)))
+
+    polled = [agent.agent_id for agent in sampler.select_agents_to_poll(env)]
+    assert len(polled) == 4 and len(set(polled)) == 4
+    assert polled[:3] == [5, 7, 2]
+
+
+if __name__ == "__main__":
+    test_random_sampling_polls_k_agents()
+    test_decayed_scores_compete()
+    test_targeted_sampling_prefers_front_runners_and_switchers()
+    print("\nTest completed successfully!")